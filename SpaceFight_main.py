@@ -4,10 +4,20 @@ Space Fight
 Last Updated: 22 May 2017
 """
 
-import math
+import os
+import time
+
 import pygame
-import random
+from assets import cache_stats, load_image, load_sound, render_text
 from highscores import *
+from layout import Layout, above, centered, fixed, over, spread, spread_x
+from memory import MemoryMonitor
+from metrics import MetricsSink, frame_record
+from profiler import FrameProfiler, SessionProfiler
+from renderer import DirtyRenderer, Hud, Interpolator, MenuCache
+from replay import Recorder
+from simulation import Inputs, World
+from starfield import Starfield
 
 SCREEN_HEIGHT = 768
 SCREEN_WIDTH = 1360
@@ -19,556 +29,72 @@ GREEN = (0, 255,  0)
 GREY = (105, 105, 105)
 RED = (255,  0,  0)
 
-
-def main():
+TEXT_CACHE_SIZE = 256
+BULLET_POOL_SIZE = 64
+ALIEN_COUNT = 30
+COLLISION_CELL_SIZE = 128
+USE_ALIEN_ENGINE = True
+
+# (count, min speed, max speed) for each layer of background stars.
+STAR_LAYERS = [(int(SCREEN_WIDTH / 2), -5, -1)]
+
+# Repaint and push only the changed parts of the screen instead of a full
+# fill and flip every frame (for software-only display paths.)
+DIRTY_RECTS = False
+
+# Draw menus from a composite that is only rebuilt when a widget changes.
+USE_MENU_CACHE = True
+
+# Save the inputs of every game to REPLAY_DIR (play them back with replay.py.)
+RECORD_REPLAYS = False
+REPLAY_DIR = "replays"
+
+# The game runs at TICK_RATE ticks per second whatever the frame rate is.
+# MAX_FPS caps the frame rate (0 for uncapped, 30 for a low-power mode.) A
+# slow frame runs up to MAX_TICKS_PER_FRAME ticks to catch up; anything
+# past that is dropped so the game slows down instead of stalling.
+TICK_RATE = 60
+MAX_FPS = 60
+MAX_TICKS_PER_FRAME = 5
+
+# Time every phase of the frame and show it in an overlay (F3 toggles it.)
+PROFILE = False
+
+# cProfile the main loop when this environment variable is set (F4 starts
+# and stops a capture at any time.) Captures and their summaries go to
+# CPROFILE_DIR.
+CPROFILE_ENV = "SPACEFIGHT_CPROFILE"
+CPROFILE_DIR = "profiles"
+
+# Take tracemalloc snapshots on every screen change and every MEMORY_EVERY
+# frames, and log the top growing allocation sites and the live Surfaces
+# to a file in MEMORY_DIR.
+MEMORY_MONITOR = False
+MEMORY_DIR = "memory"
+MEMORY_EVERY = 3600
+
+# Write the timings, sprite counts, asset cache stats and screen of one
+# frame in every METRICS_EVERY to a JSON Lines file in METRICS_DIR.
+METRICS = False
+METRICS_DIR = "metrics"
+METRICS_EVERY = 1
+
+# Draw moving things between their last two ticks' positions (the stars
+# only when DIRTY_RECTS is off.)
+INTERPOLATE = True
+
+
+def main(on_frame=None, clock=None):
     """ Entire program.
 
-    """
-
-    class Player(pygame.sprite.Sprite):
-
-        """ The player-controlled main character of the game.
-
-        Args:
-                image_string (str): Human readable name of the picture used to make
-                        the player sprite.
-
-        Attributes:
-                image (pygame image): Image used for the sprite.
-                original (image): A copy of the original image. This image is rotated
-                        every update.
-                rect (rect): Rect attributes for the player sprite.
-                velx (int): The player's x axis velocity.
-                vely (int): The player's y axis velocity.
-                lives (int): Number of lives the player begins with.
-                ammo (int): Number of bullets the player begins with.
-
-        """
-
-        def __init__(self, image_string):
-
-            super(Player, self).__init__()
-
-            self.image = pygame.image.load(image_string).convert()
-            self.image.set_colorkey(BLACK)
-            self.original = self.image
-            self.rect = self.image.get_rect()
-            self.rect.x = (SCREEN_WIDTH / 2) - (self.rect.width / 2)
-            self.rect.y = (SCREEN_HEIGHT / 2) - (self.rect.height / 2)
-            self.velx = 0
-            self.vely = 0
-            self.lives = 0
-            self.ammo = 100
-            self.speed = 5
-
-        def change_speed(self, x, y):
-            """ Adds an int value to the velx and vely attributes.
-
-            Args:
-                    x (int): Amount to be added to the velx attribute.
-                    y (int): Amount to be added to the vely attribute.
-
-            """
-
-            self.velx += x
-            self.vely += y
-
-        def update(self):
-            """ Checks edge-of-screen collision, move and rotate player, and
-            adjust the ammo counter color based on how many bullets we have.
-            Check if the player is going off the screen. If they are,
-            set the proper rect attribute to the corresponding side.
-            Add the velx and vely to the rect.x and rect.y attributes,
-            respectively. Rotate the player based on the formulas. Set the
-            appropriate ammo counter color.
-
-            """
-
-            if self.rect.x + self.rect.width >= SCREEN_WIDTH:
-
-                self.rect.right = SCREEN_WIDTH
-
-            if self.rect.x <= 0:
-
-                self.rect.left = 0
-
-            if self.rect.y <= 0:
-
-                self.rect.top = 0
-
-            if self.rect.y + self.rect.height >= SCREEN_HEIGHT:
-
-                self.rect.bottom = SCREEN_HEIGHT
-
-            self.rect.x += self.velx
-            self.rect.y += self.vely
-
-            (mouse_x, mouse_y) = pygame.mouse.get_pos()
-            angle = 360 - (math.degrees(math.atan2(self.rect.center[1] - mouse_y,
-                                                   self.rect.center[0] - mouse_x)) + 180)
-
-            self.image = pygame.transform.rotate(self.original, angle)
-            self.rect = self.image.get_rect(center=self.rect.center)
-
-            if self.ammo < 50 and self.ammo > 25:
-
-                game.ammo_count_color = YELLOW
-
-            elif self.ammo <= 25:
-
-                game.ammo_count_color = RED
-
-            else:
-
-                game.ammo_count_color = GREEN
-
-    class Alien(pygame.sprite.Sprite):
-
-        """ Aliens that follow the player and explode.
-
-        Attributes:
-                image_string (str): Picture of the alien (corresponds to lives.)
-                explode_sound (pygame mixer): Sound played when the alien has 0 lives.
-                image (pygame sprite image): Sprite image.
-
-                rect (pygame sprite rect): Rect attributes for sprite image.
-                e1 (image): First image in explosion sequence.
-                e2 (image): Second image in explosion sequence.
-                e3 (image): Third image in explosion sequence.
-                e4 (image): Fourth image in explosion sequence.
-                e5 (image): Fifth image in explosion sequence.
-                velx (int): Aliens x axis velocity.
-                vely (int): Aliens y axis velocity.
-                frame (int): Counter for number of frames in explosion.
-                exp_num (int): Counter for the explosion image list.
-
-                heartdrop (int): Random value for heart carrier.
-                ammo_drop (int): Random value for ammo carrier.
-                freeze_drop (int): Random value for freeze carrier.
-
-                heart_dropped (bool): Has a heart carrier been killed.
-                ammo_dropped (bool): Has an ammo carrir been killed.
-                freeze_dropped (bool): Has a freeze carrier been killed.
-                full_freeze (bool): Is there an active freeze.
-                exploding (bool): Is the alien in the exploding loop.
-
-                dropped_frames (int): Number of frames the alien has been dead for.
-                lives (int): NUmber of lives the alien has (corresponds to image.)
-                speed_multiplier (int): Multiplys to velx and vely to increase speed of approach.
-
-        """
-
-        def __init__(self):
-
-            super(Alien, self).__init__()
-
-            self.image_string = "Alien.png"
-            self.explode_sound = pygame.mixer.Sound("explosion.ogg")
-            self.image = pygame.image.load(self.image_string).convert()
-            self.image.set_colorkey(BLACK)
-
-            self.rect = self.image.get_rect()
-            self.e1 = pygame.image.load("e1.png").convert()
-            self.e2 = pygame.image.load("e2.png").convert()
-            self.e3 = pygame.image.load("e3.png").convert()
-            self.e4 = pygame.image.load("e4.png").convert()
-            self.e5 = pygame.image.load("e5.png").convert()
-
-            self.e1.set_colorkey(BLACK)
-            self.e2.set_colorkey(BLACK)
-            self.e3.set_colorkey(BLACK)
-            self.e4.set_colorkey(BLACK)
-            self.e5.set_colorkey(BLACK)
-
-            lr = random.randrange(0, 2)
-            tb = random.randrange(0, 2)
-
-            if lr == 0:
-
-                self.rect.x = random.randrange(-2100, -100)
-
-            elif lr == 1:
-
-                self.rect.x = random.randrange(SCREEN_WIDTH + 100, SCREEN_WIDTH + 2100)
-
-            if tb == 0:
-
-                self.rect.y = random.randrange(-2100, -100)
-
-            elif tb == 1:
-
-                self.rect.y = random.randrange(SCREEN_HEIGHT + 100, SCREEN_HEIGHT + 2100)
-
-            self.velx = 0
-            self.vely = 0
-            self.frame = 0
-            self.exp_num = 0
-
-            self.heartdrop = random.randrange(0, 40)
-            self.ammo_drop = random.randrange(5, 16)
-            self.freeze_drop = random.randrange(0, 30)
-            self.coin_drop = random.randrange(10, 20)
-
-            self.heart_dropped = False
-            self.ammo_dropped = False
-            self.freeze_dropped = False
-            self.coin_dropped = False
-            self.full_freeze = False
-            self.exploding = False
-
-            self.dropped_frames = 0
-            self.lives = 1
-            self.speed_multiplier = 1
-
-        def update(self):
-            """ Stop motion if the alien has been shot. Set the other attributes
-            as False to prevent dual-drop. Drop priorities: Ammo, heart, then
-            freeze. Change the image to the corresponding drop image. Add one
-            to dropped_frames. If the dropped_frames reaches the drop time
-            threshold, reset it's attributes and tag it for explosion in the next
-            update. Run collision detection with player to test of the player
-            picks up the drop. If so, tag the alien for respawn and execute the
-            respective drop effects (give ammo, freeze aliens, or give life.)
-            If the alien is still alive, set the image to the corresponding life
-            number. If there is an active freeze, stop movement. If there is not
-            an active freeze, calculate the triange of trajectory towards the
-            player and move along the hypotenuse of that triangle. Check for
-            collision with player and bullet. If player collision, subtract from
-            the players lives the corresponding aliens number of lives. If
-            bullet collision, subtract one life from the alien. Revoke any lucky
-            carrier attributes from the alien if there is a player collision. If
-            the alien is exploding. Send it to the explode method.
-
-            """
-
-            if self.ammo_dropped == True or self.heart_dropped == True or \
-                    self.freeze_dropped == True or self.coin_dropped == True:
-
-                self.velx = 0
-                self.vely = 0
-
-                if self.ammo_dropped == True:
-
-                    self.freeze_dropped = False
-                    self.heart_dropped = False
-                    self.coin_dropped = False
-                    self.freeze_drop = 0
-                    self.heartdrop = 0
-                    self.coin_drop = 0
-
-                elif self.heart_dropped == True:
-
-                    self.freeze_dropped = False
-                    self.ammo_dropped = False
-                    self.coin_dropped = False
-                    self.freeze_drop = 0
-                    self.ammo_drop = 0
-                    self.coin_drop = 0
-
-                elif self.freeze_dropped == True:
-
-                    self.heart_dropped = False
-                    self.ammo_dropped = False
-                    self.coin_dropped = False
-                    self.ammo_drop = 0
-                    self.heartdrop = 0
-                    self.coin_drop = 0
-
-                elif self.coin_dropped == True:
-
-                    self.heart_dropped = False
-                    self.ammo_dropped = False
-                    self.freeze_dropped = False
-                    self.ammo_drop = 0
-                    self.heartdrop = 0
-                    self.freeze_drop = 0
-
-                if self.ammo_dropped == True:
-
-                    self.image = pygame.image.load("ammo_drop.png").convert()
-
-                elif self.heart_dropped == True:
-
-                    self.image = pygame.image.load("heart.png").convert()
-
-                elif self.freeze_dropped == True:
-
-                    self.image = pygame.image.load("freeze_powerup.png").convert()
-
-                elif self.coin_dropped == True:
-
-                    self.image = pygame.image.load("Coin.png")
-
-                self.image.set_colorkey(BLACK)
-
-                self.dropped_frames += 1
-
-                if self.dropped_frames == 360:
-
-                    self.exploding = True
-                    self.freeze_drop = 0
-                    self.heartdrop = 0
-                    self.ammo_drop = 0
-                    self.coin_drop = 0
-                    self.exp_num = 0
-                    self.frame = 0
-
-                player_collect = pygame.sprite.spritecollide(self, game.players, False)
-
-                for pickup in player_collect:
-
-                    if self.ammo_dropped == True:
-
-                        game.player.ammo += 25
-                        self.ammo_drop = 0
-
-                    if self.heart_dropped == True:
-
-                        game.player.lives += 1
-                        self.heartdrop = 0
-
-                    if self.freeze_dropped == True:
-
-                        game.freeze_pickup = True
-                        self.freeze_drop = 0
-                        game.freeze_hit = True
-
-                    if self.coin_dropped == True:
-
-                        game.coins += 1
-                        self.coin_drop = 0
-
-                    self.respawn()
-
-            elif self.ammo_dropped == False and self.freeze_dropped == False and \
-                    self.exploding == False and self.heart_dropped == False and \
-                    self.coin_dropped == False:
-
-                if self.lives == 3:
-
-                    self.image = pygame.image.load("alien_level3.png").convert()
-                    self.image.set_colorkey(BLACK)
-
-                elif self.lives == 2:
-
-                    self.image = pygame.image.load("alien_level2.png").convert()
-                    self.image.set_colorkey(BLACK)
-
-                elif self.lives == 1:
-
-                    self.image = pygame.image.load("Alien.png").convert()
-                    self.image.set_colorkey(BLACK)
-
-                if self.full_freeze == True:
-
-                    self.velx = 0
-                    self.vely = 0
-
-                elif not self.full_freeze:
-
-                    speed = 2 * self.speed_multiplier
-
-                    x_diff = game.player.rect.center[0] - self.rect.center[0]
-                    y_diff = game.player.rect.center[1] - self.rect.center[1]
-                    angle = math.atan2(y_diff, x_diff)
-
-                    self.velx = math.cos(angle) * speed
-                    self.vely = math.sin(angle) * speed
+    Args:
+            on_frame (function): Called with the game after every frame; the
+            program ends when it returns True (for benchmarks and other
+            automated runs.)
+            clock (Clock): Used instead of a pygame.time.Clock (e.g. one
+            that never waits, for automated runs.)
 
-                    self.rect.x += self.velx
-                    self.rect.y += self.vely
-
-                bullet_alien_collision = pygame.sprite.spritecollide(self, game.bullets, True)
-                player_alien_collision = pygame.sprite.spritecollide(self, game.players, False)
-
-                for alien in bullet_alien_collision:
-
-                    self.lives -= 1
-
-                    if self.lives <= 0:
-
-                        game.score += 1
-                        self.explode_sound.play()
-                        self.exploding = True
-
-                for alien in player_alien_collision:
-
-                    self.explode_sound.play()
-
-                    self.heartdrop = 0
-                    self.ammo_drop = 0
-                    self.freeze_drop = 0
-                    self.coin_drop = 0
-
-                    game.player.lives -= self.lives
-
-                    self.exploding = True
-
-            if self.exploding == True:
-
-                self.explode()
-
-        def respawn(self):
-            """ The first four if statements don't respawn the alien. They
-            check the alien for the lucky number and set the corresponding
-            drop attribute to True if they match. If there is no active drop
-            attributes, increase the speed multiplier and calculate a new,
-            random a and y position. Set the image to the corresponding life
-            number. Reset all the attributes.
-
-            """
-
-            if self.heartdrop == 15:
-
-                self.heart_dropped = True
-                self.speed_multiplier *= 1.05
-
-            if self.ammo_drop == 15:
-
-                self.speed_multiplier *= 1.05
-                self.ammo_dropped = True
-
-            if self.freeze_drop == 15:
-
-                self.speed_multiplier *= 1.05
-                self.freeze_dropped = True
-
-            if self.coin_drop == 15:
-
-                self.speed_multiplier *= 1.05
-                self.coin_dropped = True
-
-            if self.heartdrop != 15 and self.ammo_drop != 15 and \
-                    self.freeze_drop != 15 and self.coin_drop != 15:
-
-                lr = random.randrange(0, 2)
-                tb = random.randrange(0, 2)
-
-                self.speed_multiplier *= 1.05
-
-                if lr == 0:
-
-                    self.rect.x = random.randrange(-2600, -100)
-
-                elif lr == 1:
-
-                    self.rect.x = random.randrange(SCREEN_WIDTH + 100, SCREEN_WIDTH + 2600)
-
-                if tb == 0:
-
-                    self.rect.y = random.randrange(-2600, -100)
-
-                elif tb == 1:
-
-                    self.rect.y = random.randrange(SCREEN_HEIGHT + 100, SCREEN_HEIGHT + 2600)
-
-                if game.score % 10 == 0:
-
-                    self.image = pygame.image.load("alien_level3.png").convert()
-                    self.lives = 3
-
-                elif game.score % 3 == 0 and self.lives != 3:
-
-                    self.image = pygame.image.load("alien_level2.png").convert()
-                    self.lives = 2
-
-                else:
-
-                    self.image = pygame.image.load("Alien.png").convert()
-                    self.lives = 1
-
-                self.freeze_dropped = False
-                self.dropped_frames = 0
-                self.heart_dropped = False
-                self.ammo_dropped = False
-                self.coin_dropped = False
-                self.freeze_drop = random.randrange(0, 30)
-                self.heartdrop = random.randrange(0, 40)
-                self.ammo_drop = random.randrange(0, 20)
-                self.coin_drop = random.randrange(10, 20)
-                self.exploding = False
-                self.exp_num = 0
-                self.frame = 0
-                self.image.set_colorkey(BLACK)
-
-        def explode(self):
-            """ Stop movement. If the frame attribute reaches the explosion
-            frame threshold, revoke the exploding attribute and tag it for
-            respawn in the next update. If the frame attribute reaches the
-            individual explosion frame threshold, move to the next frame.
-            Always add one to frame attribute and set image to the corresponding
-            explosion image for that frame number.
-
-            """
-
-            exp_list = [self.e1, self.e2, self.e3, self.e4, self.e5]
-
-            self.velx = 0
-            self.vely = 0
-
-            if self.frame == 25:
-
-                self.exploding = False
-                self.respawn()
-
-            elif self.frame % 5 == 0:
-
-                self.exp_num += 1
-
-                if self.exp_num == 5:
-
-                    self.exp_num = 4
-
-            if self.exploding == True:
-
-                self.frame += 1
-                self.image = exp_list[self.exp_num]
-
-    class Bullet(pygame.sprite.Sprite):
-
-        """ Bullets that spawn from the player position and move towards the cursor.
-
-        Args:
-                image_string (str): Picture of the bullet (can change color).
-
-        Attributes:
-                image (pygame sprite): Pygame sprite image that uses the
-                image_string arg.
-                rect (pygame sprite rect): Rect attributes for sprite image.
-                velx (int): Aliens x axis velocity.
-                vely (int): Aliens y axis velocity.
-
-        """
-
-        def __init__(self, image_string):
-
-            super(Bullet, self).__init__()
-
-            self.image = pygame.image.load(image_string).convert()
-            self.image.set_colorkey(BLACK)
-            self.rect = self.image.get_rect()
-
-            self.rect.x = 0
-            self.rect.y = 0
-            self.velx = 0
-            self.vely = 0
-
-        def update(self):
-            """ Add the velx and vely attributes to the rect.x and rect.y
-            positions, respectively. If the bullet goes off the screen, kill it.
-
-            """
-
-            self.rect.y += self.vely
-            self.rect.x += self.velx
-
-            if self.rect.x + self.rect.width < 0 or self.rect.y + self.rect.height < 0:
-
-                self.kill()
-
-            elif self.rect.y > SCREEN_HEIGHT or self.rect.x > SCREEN_WIDTH:
-
-                self.kill()
+    """
 
     class Cursor(pygame.sprite.Sprite):
         """ Cursor that is blitted in place of the windows cursor.
@@ -587,8 +113,7 @@ def main():
 
             super(Cursor, self).__init__()
 
-            self.image = pygame.image.load(image_string).convert()
-            self.image.set_colorkey(BLACK)
+            self.image = load_image(image_string)
 
             self.rect = self.image.get_rect()
 
@@ -627,6 +152,9 @@ def main():
                 rect (pygame sprite rect): Rect attributes for sprite image.
                 highlight (bool): Boolean for weather or not the text should
                 highlight when the cursor moves over it.
+                default_color (color): Color of the text when not highlighted.
+                rendered (tuple): The (text, color) the image was last rendered
+                with.
 
         """
 
@@ -637,16 +165,44 @@ def main():
             self.font = font
             self.color = default_color
             self.text = str(text)
-            self.image = self.font.render(self.text, False, self.color)
+            self.image = render_text(self.font, self.text, self.color, False, TEXT_CACHE_SIZE)
             self.rect = self.image.get_rect()
             self.highlight = highlight
+            self.default_color = default_color
+            self.rendered = (self.text, self.color)
 
         def update(self):
-            """ Update the image (in case of color change.)
+            """ Update the image (in case of text or color change.) Nothing is
+            rendered if neither changed since the last render.
 
             """
 
-            self.image = self.font.render(self.text, False, self.color)
+            if self.rendered == (self.text, self.color):
+
+                return
+
+            self.image = render_text(self.font, self.text, self.color, False, TEXT_CACHE_SIZE)
+            self.rect.size = self.image.get_size()
+            self.rendered = (self.text, self.color)
+
+        def set_text(self, text):
+            """ Change the text in place, keeping the sprite's position.
+
+            Args:
+                    text (str/int/float): The new text.
+
+            """
+
+            self.text = str(text)
+            self.update()
+
+        def base_image(self):
+            """ The text rendered in its default color (how it looks when not
+            highlighted.)
+
+            """
+
+            return render_text(self.font, self.text, self.default_color, False, TEXT_CACHE_SIZE)
 
         def draw(self, screen):
             """ Blit the text to the screen.
@@ -671,11 +227,17 @@ def main():
 
             super(Picture, self).__init__()
 
-            self.image = pygame.image.load(image_string).convert()
-            self.image.set_colorkey(BLACK)
+            self.image = load_image(image_string)
 
             self.rect = self.image.get_rect()
 
+        def base_image(self):
+            """ The image the picture always shows.
+
+            """
+
+            return self.image
+
         def draw(self, screen):
             """ Draws the image to the screen.
 
@@ -686,44 +248,6 @@ def main():
 
             screen.blit(self.image, [self.rect.x, self.rect.y])
 
-    class Star(pygame.sprite.Sprite):
-        """ Star sprite images used for background.
-
-        Args:
-                image_string (str): Star image.
-
-        Attribues:
-                image (sprite image): Load image for the sprite.
-                rect (pygame sprite rect): Rect attributes for sprite image.
-                velx (int): Aliens x axis velocity.
-                vely (int): Aliens y axis velocity.
-
-        """
-
-        def __init__(self, image_string):
-
-            super(Star, self).__init__()
-
-            self.image = pygame.image.load(image_string).convert()
-            self.image.set_colorkey(BLACK)
-            self.rect = self.image.get_rect()
-            self.velx = 0
-            self.vely = 0
-
-        def update(self):
-            """ Add the velx and vely attributes to the rect.x and rect.y
-            positions, respectively. If the star goes off the top of the screen,
-            reset the posiiton to the bottom of the screen.
-
-            """
-
-            self.rect.x += self.velx
-            self.rect.y += self.vely
-
-            if self.rect.y + self.rect.height < 0:
-
-                self.rect.y = SCREEN_HEIGHT
-
     class Game(object):
         """ Instance of the game.
         '04B_30_' is font name for windows. '04B' is font name for ubuntu.
@@ -760,11 +284,11 @@ def main():
                         title_screen_items (sprite group): Holds items for title screen screen.
                         game_over_items (sprite group): Holds items for game over screen.
                         pause_items (sprite group): Holds items for paused screen.
-                        game_items (sprite group): Holds items for the game itself.
                         new_highscore_items (sprite group): Holds items for new highscore screen.
-                        bullets (sprite group): Holds list of bullets.
-                        players (sprite group): Holds list of player(s).
-                        aliens (sprite group): Holds list pf aliens.
+                        bullets (sprite group): Holds list of bullets (the world's.)
+                        menu_cache (MenuCache): Pre-composited menu screens.
+                        players (sprite group): Holds list of player(s) (the world's.)
+                        aliens (sprite group): Holds list pf aliens (the world's.)
                         highscore_items (sprite group): Holds items for highscores screen.
                         highscore_name_items (sprite group): Holds list of names for highscore screen.
                         keyboard (sprite group): Holds all keys on the keyboard.
@@ -776,7 +300,13 @@ def main():
                         [All Text Sprites] (sprite): Misc text sprites.
 
                 Misc:
+                        world (World): The game rules and everything in play.
+                        profiler (FrameProfiler): Frame timings and their overlay.
+                        capture (SessionProfiler): cProfile capture of the main loop.
                         score (int): Number of aliens the player has killed.
+                        move (list): (x, y) direction the movement keys push the ship.
+                        shots (int): Shots fired since the last tick.
+                        recorder (Recorder): Records the current game (with RECORD_REPLAYS.)
                         ammo_number (int): Numerical value for corresponding ammo type.
                         player_number (int): Numerical value for corresponding player type.
                         main_music (audio): Main track for the game.
@@ -787,6 +317,15 @@ def main():
 
         def __init__(self):
 
+            self.profiler = FrameProfiler(PROFILE, timing=METRICS)
+            self.capture = SessionProfiler(CPROFILE_DIR)
+            self.world = World(SCREEN_WIDTH, SCREEN_HEIGHT, None, "original.png", ALIEN_COUNT,
+                               BULLET_POOL_SIZE, COLLISION_CELL_SIZE, USE_ALIEN_ENGINE,
+                               profiler=self.profiler)
+            self.move = [0, 0]
+            self.shots = 0
+            self.recorder = None
+
             self.title_screen = True
             self.game_over = False
             self.game = False
@@ -802,8 +341,6 @@ def main():
             self.lives_with_upgrades = 3
             self.ammo_with_upgrades = 100
 
-            self.score = 0
-            self.coins = 0
             self.highscores_list = get_highscores()
             self.highscore_names = get_names()
 
@@ -817,13 +354,13 @@ def main():
             self.player_number = 0
 
             self.ammo_type = self.green_ammo
+            self.menu_cache = MenuCache()
+            self.hud = Hud((SCREEN_WIDTH, SCREEN_HEIGHT))
+            self.ammo_count_color = GREEN
 
-            self.main_music = pygame.mixer.Sound("main_music.ogg")
-            self.shoot = pygame.mixer.Sound("shoot_sound.ogg")
-
-            self.freeze_pickup = False
-            self.freeze_hit = False
-            self.frozen_frames = 0
+            self.main_music = load_sound("main_music.ogg")
+            self.shoot = load_sound("shoot_sound.ogg")
+            self.sounds = {"shoot": self.shoot, "explosion": load_sound("explosion.ogg")}
 
             menu_font_size = int(round(SCREEN_HEIGHT / 13.5))
             game_font_size = int(round(SCREEN_HEIGHT / 17.5))
@@ -838,11 +375,10 @@ def main():
             self.title_screen_items = pygame.sprite.LayeredUpdates([pygame.sprite.Group()])
             self.game_over_items = pygame.sprite.LayeredUpdates([pygame.sprite.Group()])
             self.pause_items = pygame.sprite.LayeredUpdates([pygame.sprite.Group()])
-            self.game_items = pygame.sprite.LayeredUpdates([pygame.sprite.Group()])
             self.new_highscore_items = pygame.sprite.LayeredUpdates([pygame.sprite.Group()])
-            self.bullets = pygame.sprite.Group()
-            self.players = pygame.sprite.Group()
-            self.aliens = pygame.sprite.LayeredUpdates([pygame.sprite.Group()])
+            self.bullets = self.world.bullets
+            self.players = self.world.players
+            self.aliens = self.world.aliens
             self.highscore_items = pygame.sprite.LayeredUpdates([pygame.sprite.Group()])
             self.highscore_name_items = pygame.sprite.LayeredUpdates([pygame.sprite.Group()])
             self.keyboard = pygame.sprite.LayeredUpdates([pygame.sprite.Group()])
@@ -850,20 +386,12 @@ def main():
 
             """ - - - Create sprites - - - """
 
-            self.player = Player("original.png")
             self.player.lives = self.lives_with_upgrades
             self.player.ammo = self.ammo_with_upgrades
-            self.game_items.add(self.player)
-            self.players.add(self.player)
 
             self.alphabet = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "J", "K",
                              "L", "M", "N", "O", "P", "Q", "R", "S", "T", "U", "V", "W", "X", "Y", "Z"]
 
-            for i in range(30):
-
-                alien = Alien()
-                self.aliens.add(alien)
-
             self.cursor = Cursor("red_cursor.png")
 
             self.blue_player_pic = Picture("big_blue.png")
@@ -970,11 +498,6 @@ def main():
             self.pause_items.add(self.go_home_word)
             self.pause_items.add(self.quit_word)
 
-            self.game_items.add(self.score_word)
-            self.game_items.add(self.number_score)
-            self.game_items.add(self.ammo_counter)
-            self.game_items.add(self.player)
-
             self.highscore_items.add(self.highscore_word)
 
             for i in range(0, 5):
@@ -998,50 +521,157 @@ def main():
                 letter = Text(character, self.font, WHITE, True)
                 self.keyboard.add(letter)
 
-        def spawn_bullet(self, mouse_x, mouse_y):
-            """ Spawn a bullet from the player position and set its trajectory
-            towards the cursor position.
+            self.layouts = self.build_layouts(SCREEN_WIDTH, SCREEN_HEIGHT)
+            self.layout_name = None
+
+        @property
+        def player(self):
+            """ The player's ship (kept by the world.)
+
+            """
+
+            return self.world.player
+
+        @property
+        def score(self):
+            """ Number of aliens the player has killed (kept by the world.)
+
+            """
+
+            return self.world.score
+
+        @score.setter
+        def score(self, value):
+
+            self.world.score = value
+
+        @property
+        def coins(self):
+            """ Coins the player has to spend (kept by the world.)
+
+            """
+
+            return self.world.coins
+
+        @coins.setter
+        def coins(self, value):
+
+            self.world.coins = value
+
+        @property
+        def ammo_type(self):
+            """ Picture of the bullets the player fires (kept by the world.)
+
+            """
+
+            return self.world.ammo_type
+
+        @ammo_type.setter
+        def ammo_type(self, value):
+
+            self.world.ammo_type = value
+
+        def start_game(self):
+            """ Start a new game with a fresh seed (and start recording it.)
+
+            """
+
+            self.world.new_game()
+
+            if RECORD_REPLAYS:
+
+                self.recorder = Recorder(self.world)
+
+            return
+
+        def end_game(self):
+            """ Save the recording of the game that just ended, if there is one.
 
             """
 
-            self.shoot.play()
-            self.player.ammo -= 1
+            if self.recorder is not None:
 
-            bullet_speed = 20
-            angle = math.atan2(self.player.rect.center[1]-mouse_y,
-                               self.player.rect.center[0]-mouse_x)
-            x_vel = math.cos(angle) * (-1 * bullet_speed)
-            y_vel = math.sin(angle) * (-1 * bullet_speed)
-            bullet = Bullet(self.ammo_type)
-            bullet.rect.x = self.player.rect.center[0] - (bullet.rect.width / 2)
-            bullet.rect.y = self.player.rect.center[1] - (bullet.rect.height / 2)
-            bullet.velx = x_vel
-            bullet.vely = y_vel
+                self.recorder.save(REPLAY_DIR, self.score)
+                self.recorder = None
 
-            self.game_items.add(bullet)
-            self.bullets.add(bullet)
+            return
+
+        def step_world(self):
+            """ Run one tick of the game with this frame's input, play the
+            sounds for what happened and pick the ammo counter color.
+
+            """
+
+            inputs = Inputs(self.move, pygame.mouse.get_pos(), self.shots)
+            self.shots = 0
+
+            if self.recorder is not None:
+
+                self.recorder.record(inputs)
+
+            for event in self.world.step(inputs):
+
+                self.sounds[event].play()
+
+            if self.player.ammo < 50 and self.player.ammo > 25:
+
+                self.ammo_count_color = YELLOW
+
+            elif self.player.ammo <= 25:
+
+                self.ammo_count_color = RED
+
+            else:
+
+                self.ammo_count_color = GREEN
 
             return
 
         def update_changing_items(self):
-            """ Update the items that need to refresh every frame.
+            """ Update the score and ammo counter text (and the ammo counter's
+            color) to the current values.
 
             """
 
-            self.game_items.remove(self.number_score)
-            self.game_items.remove(self.ammo_counter)
+            self.ammo_counter.color = self.ammo_count_color
+            self.number_score.set_text(self.score)
+            self.ammo_counter.set_text(self.player.ammo)
 
-            self.number_score = Text(str(self.score), self.small_font, WHITE, False)
-            self.ammo_counter = Text(str(self.player.ammo), self.small_font, GREEN, False)
+            return
 
-            self.ammo_counter.rect.y = self.heart_pic.rect.y + self.heart_pic.rect.height + 10
-            self.ammo_counter.rect.x = 10
+        def update_coin_count(self):
+            """ Show the current coin count on the title and upgrade screens.
 
-            self.number_score.rect.x = self.score_word.rect.x + self.score_word.rect.width + 10
-            self.number_score.rect.y = 10
+            """
 
-            self.game_items.add(self.number_score)
-            self.game_items.add(self.ammo_counter)
+            self.coin_count_word.set_text(self.coins)
+            self.coin_count_word2.set_text(self.coins)
+
+            return
+
+        def hud_state(self):
+            """ Return the values the HUD shows and where its widgets sit. The
+            HUD is only rendered again when these change.
+
+            """
+
+            return (self.score, self.player.ammo, self.player.lives, self.ammo_count_color,
+                    self.score_word.rect.topleft, self.number_score.rect.topleft,
+                    self.ammo_counter.rect.topleft)
+
+        def draw_hud(self, screen):
+            """ Draw the score, ammo counter and lives.
+
+            """
+
+            with self.profiler.phase("hud"):
+
+                Game.update_changing_items(game)
+
+                self.score_word.draw(screen)
+                self.number_score.draw(screen)
+                self.ammo_counter.draw(screen)
+                Game.draw_lives(game, screen)
 
             return
 
@@ -1137,9 +767,9 @@ def main():
 
             if self.player.lives <= 0 and self.game == True:
 
-                self.new_highscore_items.remove(self.new_highscore_score_word)
-                self.new_highscore_score_word = Text(str(self.score), self.font, WHITE, False)
-                self.new_highscore_items.add(self.new_highscore_score_word)
+                Game.end_game(game)
+
+                self.new_highscore_score_word.set_text(self.score)
 
                 self.game = False
 
@@ -1193,30 +823,25 @@ def main():
 
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
 
-                    (mouse_x, mouse_y) = pygame.mouse.get_pos()
-
                     if self.game:
 
                         if self.player.ammo > 0 and not self.paused:
 
-                            Game.spawn_bullet(game, mouse_x, mouse_y)
+                            self.shots += 1
 
                         if self.paused:
 
                             if Game.check_cursor_overlap(game, self.go_home_word) is True:
 
+                                Game.end_game(game)
+
                                 self.score = 0
                                 self.lives = 3
                                 self.game = False
                                 self.paused = False
                                 self.title_screen = True
 
-                                self.aliens.empty()
-
-                                for i in range(30):
-
-                                    alien = Alien()
-                                    self.aliens.add(alien)
+                                self.world.reset_aliens()
 
                                 self.player.rect.x = (SCREEN_WIDTH / 2) - \
                                     (self.player.rect.width / 2)
@@ -1225,16 +850,7 @@ def main():
 
                                 self.paused_word.color = WHITE
 
-                                self.upgrade_screen_items.remove(self.coin_count_word2)
-                                self.title_screen_items.remove(self.coin_count_word)
-
-                                self.coin_count_word = Text(
-                                    str(self.coins), self.font, WHITE, False)
-                                self.coin_count_word2 = Text(
-                                    str(self.coins), self.font, WHITE, False)
-
-                                self.upgrade_screen_items.add(self.coin_count_word2)
-                                self.title_screen_items.add(self.coin_count_word)
+                                Game.update_coin_count(game)
 
                     elif self.title_screen:
 
@@ -1244,7 +860,7 @@ def main():
                             self.highscore_screen = False
                             self.title_screen = False
                             self.start_word.color = WHITE
-                            self.bullets.empty()
+                            Game.start_game(game)
 
                         if Game.check_cursor_overlap(game, self.settings_word) is True:
 
@@ -1271,15 +887,13 @@ def main():
                             if Game.check_cursor_overlap(game, item) is True:
 
                                 self.entered_name_string += item.text
-                                self.entered_name = Text(
-                                    self.entered_name_string, self.font, WHITE, False)
+                                self.entered_name.set_text(self.entered_name_string)
 
                         if Game.check_cursor_overlap(game, self.backspace_word) is True:
 
                             self.entered_name_string = self.entered_name_string[0:len(
                                 self.entered_name_string) - 1]
-                            self.entered_name = Text(
-                                self.entered_name_string, self.font, WHITE, False)
+                            self.entered_name.set_text(self.entered_name_string)
 
                         if Game.check_cursor_overlap(game, self.done_word) is True and \
                                 len(self.entered_name_string) > 1 and len(self.entered_name_string) < 10:
@@ -1289,26 +903,13 @@ def main():
                             self.highscores_list = get_highscores()
                             self.highscore_names = get_names()
 
-                            self.highscore_items.empty()
-                            self.highscore_name_items.empty()
-
-                            self.highscore_items.add(self.highscore_word)
-
-                            for i in range(0, 5):
-
-                                score = self.highscores_list[i]
-
-                                sprite_score = Text(score, self.font, WHITE, False)
-
-                                self.highscore_items.add(sprite_score)
+                            score_sprites = self.highscore_items.sprites()
+                            name_sprites = self.highscore_name_items.sprites()
 
                             for i in range(0, 5):
 
-                                name = self.highscore_names[i]
-
-                                sprite_name = Text(name, self.font, WHITE, False)
-
-                                self.highscore_name_items.add(sprite_name)
+                                score_sprites[i + 1].set_text(self.highscores_list[i])
+                                name_sprites[i].set_text(self.highscore_names[i])
 
                             self.game = False
                             self.enter_name_screen = False
@@ -1318,29 +919,16 @@ def main():
                             self.player.lives = self.lives_with_upgrades
                             self.score = 0
                             self.player.ammo = 100
-                            self.aliens.empty()
-
-                            for i in range(30):
-
-                                alien = Alien()
-                                self.aliens.add(alien)
+                            self.world.reset_aliens()
 
                             self.player.rect.x = (SCREEN_WIDTH / 2) - (self.player.rect.width / 2)
                             self.player.rect.y = (SCREEN_HEIGHT / 2) - (self.player.rect.height / 2)
 
                             self.entered_name_string = ""
-                            self.entered_name = Text(
-                                self.entered_name_string, self.font, WHITE, False)
+                            self.entered_name.set_text(self.entered_name_string)
                             self.continue_word.color = WHITE
 
-                            self.upgrade_screen_items.remove(self.coin_count_word2)
-                            self.title_screen_items.remove(self.coin_count_word)
-
-                            self.coin_count_word = Text(str(self.coins), self.font, WHITE, False)
-                            self.coin_count_word2 = Text(str(self.coins), self.font, WHITE, False)
-
-                            self.upgrade_screen_items.add(self.coin_count_word2)
-                            self.title_screen_items.add(self.coin_count_word)
+                            Game.update_coin_count(game)
                             self.done_word.color = WHITE
 
                     elif self.settings:
@@ -1375,29 +963,17 @@ def main():
 
                             if Game.check_cursor_overlap(game, self.original_player_pic) is True:
 
-                                self.game_items.remove(self.player)
-                                self.players.remove(self.player)
-                                self.player = Player("original.png")
-                                self.game_items.add(self.player)
-                                self.players.add(self.player)
+                                self.world.set_player("original.png")
                                 self.player_number = 0
 
                             if Game.check_cursor_overlap(game, self.blue_player_pic) is True:
 
-                                self.game_items.remove(self.player)
-                                self.players.remove(self.player)
-                                self.player = Player("blue_ship.png")
-                                self.game_items.add(self.player)
-                                self.players.add(self.player)
+                                self.world.set_player("blue_ship.png")
                                 self.player_number = 1
 
                             if Game.check_cursor_overlap(game, self.yellow_player_pic) is True:
 
-                                self.game_items.remove(self.player)
-                                self.players.remove(self.player)
-                                self.player = Player("yellow_ship.png")
-                                self.game_items.add(self.player)
-                                self.players.add(self.player)
+                                self.world.set_player("yellow_ship.png")
                                 self.player_number = 2
 
                             self.player.lives = self.lives_with_upgrades
@@ -1458,16 +1034,7 @@ def main():
                                 self.player.speed += 1
                                 self.coins -= 10
 
-                                self.upgrade_screen_items.remove(self.coin_count_word2)
-                                self.title_screen_items.remove(self.coin_count_word)
-
-                                self.coin_count_word = Text(
-                                    str(self.coins), self.font, WHITE, False)
-                                self.coin_count_word2 = Text(
-                                    str(self.coins), self.font, WHITE, False)
-
-                                self.upgrade_screen_items.add(self.coin_count_word2)
-                                self.title_screen_items.add(self.coin_count_word)
+                                Game.update_coin_count(game)
 
                             if Game.check_cursor_overlap(game, self.add_start_life_word) is True and self.coins >= 20:
 
@@ -1475,16 +1042,7 @@ def main():
                                 self.player.lives = self.lives_with_upgrades
                                 self.coins -= 20
 
-                                self.upgrade_screen_items.remove(self.coin_count_word2)
-                                self.title_screen_items.remove(self.coin_count_word)
-
-                                self.coin_count_word = Text(
-                                    str(self.coins), self.font, WHITE, False)
-                                self.coin_count_word2 = Text(
-                                    str(self.coins), self.font, WHITE, False)
-
-                                self.upgrade_screen_items.add(self.coin_count_word2)
-                                self.title_screen_items.add(self.coin_count_word)
+                                Game.update_coin_count(game)
 
                             if Game.check_cursor_overlap(game, self.ammo_upgrade_word) is True and self.coins >= 30:
 
@@ -1492,16 +1050,7 @@ def main():
                                 self.player.ammo = self.ammo_with_upgrades
                                 self.coins -= 30
 
-                                self.upgrade_screen_items.remove(self.coin_count_word2)
-                                self.title_screen_items.remove(self.coin_count_word)
-
-                                self.coin_count_word = Text(
-                                    str(self.coins), self.font, WHITE, False)
-                                self.coin_count_word2 = Text(
-                                    str(self.coins), self.font, WHITE, False)
-
-                                self.upgrade_screen_items.add(self.coin_count_word2)
-                                self.title_screen_items.add(self.coin_count_word)
+                                Game.update_coin_count(game)
 
                         else:
 
@@ -1536,16 +1085,9 @@ def main():
 
                         if Game.check_cursor_overlap(game, self.restart_word) is True:
 
-                            self.aliens.empty()
-
-                            for i in range(30):
-
-                                alien = Alien()
-                                self.aliens.add(alien)
-
-                            self.score = 0
                             self.player.lives = self.lives_with_upgrades
                             self.player.ammo = 100
+                            Game.start_game(game)
                             self.game = True
                             self.game_over = False
 
@@ -1568,21 +1110,9 @@ def main():
                             self.player.rect.x = (SCREEN_WIDTH / 2) - (self.player.rect.width / 2)
                             self.player.rect.y = (SCREEN_HEIGHT / 2) - (self.player.rect.height / 2)
 
-                            self.aliens.empty()
-
-                            for i in range(30):
+                            self.world.reset_aliens()
 
-                                alien = Alien()
-                                self.aliens.add(alien)
-
-                            self.upgrade_screen_items.remove(self.coin_count_word2)
-                            self.title_screen_items.remove(self.coin_count_word)
-
-                            self.coin_count_word = Text(str(self.coins), self.font, WHITE, False)
-                            self.coin_count_word2 = Text(str(self.coins), self.font, WHITE, False)
-
-                            self.upgrade_screen_items.add(self.coin_count_word2)
-                            self.title_screen_items.add(self.coin_count_word)
+                            Game.update_coin_count(game)
 
                             self.restart_word.color = WHITE
 
@@ -1602,19 +1132,19 @@ def main():
 
                     elif event.key == pygame.K_w:
 
-                        self.player.change_speed(0, -1 * self.player.speed)
+                        self.move[1] -= 1
 
                     elif event.key == pygame.K_a:
 
-                        self.player.change_speed(-1 * self.player.speed, 0)
+                        self.move[0] -= 1
 
                     elif event.key == pygame.K_s:
 
-                        self.player.change_speed(0, self.player.speed)
+                        self.move[1] += 1
 
                     elif event.key == pygame.K_d:
 
-                        self.player.change_speed(self.player.speed, 0)
+                        self.move[0] += 1
 
                     elif event.key == pygame.K_p:
 
@@ -1626,307 +1156,258 @@ def main():
 
                             self.paused = True
 
+                    elif event.key == pygame.K_F3:
+
+                        self.profiler.toggle()
+
+                    elif event.key == pygame.K_F4:
+
+                        self.capture.toggle(self.screen_name(), len(self.aliens))
+
                 if event.type == pygame.KEYUP:
 
                     if event.key == pygame.K_w:
 
-                        self.player.change_speed(0, self.player.speed)
+                        self.move[1] += 1
 
                     elif event.key == pygame.K_a:
 
-                        self.player.change_speed(self.player.speed, 0)
+                        self.move[0] += 1
 
                     elif event.key == pygame.K_s:
 
-                        self.player.change_speed(0, -1 * self.player.speed)
+                        self.move[1] -= 1
 
                     elif event.key == pygame.K_d:
 
-                        self.player.change_speed(-1 * self.player.speed, 0)
+                        self.move[0] -= 1
 
             return
 
-        def run_res_math(self):
-            """ Calculate the appropriate positions for everything in relaiton to the screen
-            size.
-
-            """
-
-            self.back_word.rect.x = self.universal_spacing_gap
-            self.back_word.rect.y = self.universal_spacing_gap
-
-            if self.title_screen:
-
-                for i in range(len(self.title_screen_items)):
-
-                    item = pygame.sprite.LayeredUpdates.get_sprite(self.title_screen_items, i)
-
-                    if i == 0:
-
-                        item.rect.x = (SCREEN_WIDTH / 2) - (item.rect.width / 2)
-                        item.rect.y = 20
+        def build_layouts(self, width, height):
+            """ Describe where everything goes on each screen, for the given
+            screen size. Returns the layouts keyed by screen name. Build them
+            again if the resolution changes.
 
-                    elif i == 5:
-
-                        item.rect.x = (SCREEN_WIDTH - item.rect.width - self.universal_spacing_gap)
-                        item.rect.y = self.universal_spacing_gap
-
-                    elif i == 6:
+            Args:
+                    width (int): Width of the screen.
+                    height (int): Height of the screen.
 
-                        item.rect.x = (SCREEN_WIDTH - item.rect.width -
-                                       50 - self.universal_spacing_gap)
-                        item.rect.y = self.universal_spacing_gap - 3
+            """
 
-                    else:
+            gap = self.universal_spacing_gap
+            layouts = {}
+
+            back = Layout()
+            back.place(self.back_word, fixed(gap), fixed(gap))
+
+            title = Layout()
+            items = self.title_screen_items.sprites()
+            step = height / (len(items) + 6)
+            title.place(self.title_pic, centered(width), fixed(20))
+
+            for i in range(1, 5):
+
+                title.place(items[i], centered(width), spread(i + 7.25, step))
+
+            title.place(self.coin_pic, lambda rect: width - rect.width - gap, fixed(gap))
+            title.place(self.coin_count_word, lambda rect: width - rect.width - 50 - gap,
+                        fixed(gap - 3))
+            layouts["title"] = title
+
+            in_game = Layout()
+            in_game.place(self.score_word, fixed(gap), fixed(gap))
+            in_game.place(self.number_score, lambda rect: self.score_word.rect.right + gap,
+                          fixed(gap), after=[self.score_word])
+            in_game.place(self.ammo_counter, fixed(gap),
+                          lambda rect: self.score_word.rect.bottom + gap +
+                          self.heart_pic.rect.height + gap, after=[self.score_word])
+            layouts["game"] = in_game
 
-                        item.rect.x = (SCREEN_WIDTH / 2) - (item.rect.width / 2)
-                        item.rect.y = (i + 7.25) * (SCREEN_HEIGHT /
-                                                    (len(self.title_screen_items) + 6)) - (item.rect.height / 2)
+            paused = Layout()
+            paused.extend(in_game)
+            paused.column(self.pause_items.sprites(), width, height)
+            layouts["paused"] = paused
 
-            elif self.game:
+            highscores = Layout()
+            highscores.extend(back)
+            scores = self.highscore_items.sprites()
+            names = self.highscore_name_items.sprites()
+            step = height / (len(scores) + 1)
+            highscores.place(scores[0], centered(width), spread(1, step))
 
-                self.score_word.rect.x = self.universal_spacing_gap
-                self.score_word.rect.y = self.universal_spacing_gap
+            for i in range(len(names)):
 
-                self.number_score.rect.x = self.score_word.rect.x + \
-                    self.score_word.rect.width + self.universal_spacing_gap
-                self.number_score.rect.y = self.universal_spacing_gap
+                highscores.place(scores[i + 1],
+                                 lambda rect, name=names[i]: (width / 2) -
+                                 (rect.width + name.rect.width / 2),
+                                 spread(i + 2, step), after=[names[i]])
 
-                self.ammo_counter.rect.x = self.universal_spacing_gap
-                self.ammo_counter.rect.y = self.heart_pic.rect.y + \
-                    self.heart_pic.rect.height + self.universal_spacing_gap
+            for i in range(len(names)):
 
-                if self.paused:
+                highscores.place(names[i], lambda rect, score=scores[i + 1]: score.rect.right + 50,
+                                 spread(i + 2, step), after=[scores[i + 1]])
 
-                    for i in range(len(self.pause_items)):
+            layouts["highscores"] = highscores
 
-                        item = pygame.sprite.LayeredUpdates.get_sprite(self.pause_items, i)
+            new_highscore = Layout()
+            new_highscore.column(self.new_highscore_items.sprites(), width, height)
+            layouts["new_highscore"] = new_highscore
 
-                        item.rect.x = (SCREEN_WIDTH / 2) - (item.rect.width / 2)
-                        item.rect.y = (i + 1) * (SCREEN_HEIGHT /
-                                                 (len(self.pause_items) + 1)) - (item.rect.height / 2)
+            enter_name = Layout()
+            keys = self.keyboard.sprites()
 
-            elif self.highscore_screen:
+            for i in range(len(keys)):
 
-                for i in range(len(self.highscore_items)):
+                enter_name.place(keys[i], spread_x(i % 8 + 1, width / 9),
+                                 spread(i // 8 + 2, height / 6))
 
-                    item = pygame.sprite.LayeredUpdates.get_sprite(self.highscore_items, i)
-                    item2 = pygame.sprite.LayeredUpdates.get_sprite(
-                        self.highscore_name_items, i - 1)
+            last_key = keys[-1]
+            enter_name.place(self.backspace_word, lambda rect: keys[2].rect.x,
+                             lambda rect: last_key.rect.y, after=[keys[2], last_key])
+            enter_name.place(self.done_word, lambda rect: keys[6].rect.x,
+                             lambda rect: last_key.rect.y, after=[keys[6], last_key])
+            enter_name.place(self.entered_name, centered(width),
+                             lambda rect: (height / 6) - (last_key.rect.height / 2), after=[last_key])
+            layouts["enter_name"] = enter_name
 
-                    if i == 0:
+            game_over = Layout()
+            game_over.column(self.game_over_items.sprites(), width, height)
+            layouts["game_over"] = game_over
 
-                        item.rect.x = (SCREEN_WIDTH / 2) - (item.rect.width / 2)
+            settings = Layout()
+            settings.extend(back)
+            settings.column(self.settings_screen_items.sprites(), width, height)
+            layouts["settings"] = settings
 
-                    else:
+            player_pics = [self.original_player_pic, self.blue_player_pic, self.yellow_player_pic]
+            selected_player = lambda: player_pics[self.player_number]
 
-                        item.rect.x = (SCREEN_WIDTH / 2) - (item.rect.width + item2.rect.width / 2)
+            player_select = Layout()
+            player_select.extend(back)
+            player_select.row(self.change_player_items.sprites(), width, height)
+            player_select.place(self.player_select_arrow, over(selected_player),
+                                above(selected_player, gap), after=player_pics,
+                                watch=lambda: self.player_number)
+            layouts["player_select"] = player_select
 
-                    item.rect.y = (i + 1) * (SCREEN_HEIGHT /
-                                             (len(self.highscore_items) + 1)) - (item.rect.height / 2)
+            ammo_pics = [self.green_ammo_pic, self.red_ammo_pic, self.purple_ammo_pic,
+                         self.blue_ammo_pic, self.yellow_ammo_pic]
+            selected_ammo = lambda: ammo_pics[self.ammo_number]
 
-                for i in range(len(self.highscore_name_items)):
+            bullet_select = Layout()
+            bullet_select.extend(back)
+            bullet_select.row(self.change_bullet_items.sprites(), width, height)
+            bullet_select.place(self.bullet_select_arrow, over(selected_ammo),
+                                above(selected_ammo, gap), after=ammo_pics,
+                                watch=lambda: self.ammo_number)
+            layouts["bullet_select"] = bullet_select
 
-                    item = pygame.sprite.LayeredUpdates.get_sprite(self.highscore_name_items, i)
-                    item2 = pygame.sprite.LayeredUpdates.get_sprite(self.highscore_items, i + 1)
-                    item.rect.x = item2.rect.x + item2.rect.width + 50
-                    item.rect.y = (i + 2) * (SCREEN_HEIGHT /
-                                             (len(self.highscore_items) + 1)) - (item.rect.height / 2)
+            cursor_select = Layout()
+            cursor_select.extend(back)
+            cursor_select.row(self.change_cursor_items.sprites(), width, height)
+            layouts["cursor_select"] = cursor_select
 
-            elif self.new_highscore_screen:
+            upgrades = Layout()
+            upgrades.extend(back)
+            words = [self.increase_speed_word, self.add_start_life_word, self.ammo_upgrade_word]
+            coins = [self.speed_coin, self.life_coin, self.ammo_coin]
 
-                for i in range(len(self.new_highscore_items)):
+            for i in range(len(words)):
 
-                    item = pygame.sprite.LayeredUpdates.get_sprite(self.new_highscore_items, i)
-                    item.rect.x = (SCREEN_WIDTH / 2) - (item.rect.width / 2)
-                    item.rect.y = (i + 1) * (SCREEN_HEIGHT /
-                                             (len(self.new_highscore_items) + 1)) - (item.rect.height / 2)
+                upgrades.place(words[i], centered(width), spread(i + 1, height / 4))
 
-            elif self.enter_name_screen:
+            upgrades.place(self.coin_pic2, lambda rect: width - rect.width - gap, fixed(gap))
+            upgrades.place(self.coin_count_word2,
+                           lambda rect: width - rect.width - self.coin_pic2.rect.width - (2 * gap),
+                           fixed(gap - 3), after=[self.coin_pic2])
 
-                for i in range(8):
+            for i in range(len(words)):
 
-                    key = pygame.sprite.LayeredUpdates.get_sprite(self.keyboard, i)
-                    key.rect.x = ((i + 1) * (SCREEN_WIDTH / 9)) - (key.rect.width / 2)
-                    key.rect.y = (2 * (SCREEN_HEIGHT / 6)) - (key.rect.height / 2)
+                upgrades.place(coins[i], lambda rect, word=words[i]: word.rect.right + gap,
+                               lambda rect, word=words[i]: word.rect.y, after=[words[i]])
 
-                for i in range(8):
+            layouts["upgrades"] = upgrades
 
-                    key = pygame.sprite.LayeredUpdates.get_sprite(self.keyboard, i + 8)
-                    key.rect.x = ((i + 1) * (SCREEN_WIDTH / 9)) - (key.rect.width / 2)
-                    key.rect.y = (3 * (SCREEN_HEIGHT / 6)) - (key.rect.height / 2)
+            return layouts
 
-                for i in range(8):
+        def screen_name(self):
+            """ Return the name of the screen being shown (the key of its
+            layout.)
 
-                    key = pygame.sprite.LayeredUpdates.get_sprite(self.keyboard, i + 16)
-                    key.rect.x = ((i + 1) * (SCREEN_WIDTH / 9)) - (key.rect.width / 2)
-                    key.rect.y = (4 * (SCREEN_HEIGHT / 6)) - (key.rect.height / 2)
-
-                for i in range(2):
-
-                    key = pygame.sprite.LayeredUpdates.get_sprite(self.keyboard, i + 24)
-                    key.rect.x = ((i + 1) * (SCREEN_WIDTH / 9)) - (key.rect.width / 2)
-                    key.rect.y = (5 * (SCREEN_HEIGHT / 6)) - (key.rect.height / 2)
-
-                backspace_x = pygame.sprite.LayeredUpdates.get_sprite(self.keyboard, 2)
-                backsapce_y = pygame.sprite.LayeredUpdates.get_sprite(self.keyboard, 25)
-                self.backspace_word.rect.x = backspace_x.rect.x
-                self.backspace_word.rect.y = backsapce_y.rect.y
+            """
 
-                done_x = pygame.sprite.LayeredUpdates.get_sprite(self.keyboard, 6)
-                done_y = pygame.sprite.LayeredUpdates.get_sprite(self.keyboard, 25)
-                self.done_word.rect.x = done_x.rect.x
-                self.done_word.rect.y = done_y.rect.y
+            if self.game:
 
-                self.entered_name.rect.x = (SCREEN_WIDTH / 2) - (self.entered_name.rect.width / 2)
-                self.entered_name.rect.y = (SCREEN_HEIGHT / 6) - (key.rect.height / 2)
+                if self.paused:
 
-            elif self.game_over:
+                    return "paused"
 
-                for i in range(len(self.game_over_items)):
+                return "game"
 
-                    item = pygame.sprite.LayeredUpdates.get_sprite(self.game_over_items, i)
+            elif self.title_screen:
 
-                    item.rect.x = (SCREEN_WIDTH / 2) - (item.rect.width / 2)
-                    item.rect.y = (i + 1) * (SCREEN_HEIGHT /
-                                             (len(self.game_over_items) + 1)) - (item.rect.height / 2)
+                return "title"
 
             elif self.settings:
 
-                self.back_word.rect.x = self.universal_spacing_gap
-                self.back_word.rect.y = self.universal_spacing_gap
-
                 if self.player_select:
 
-                    for i in range(len(self.change_player_items)):
-
-                        item = pygame.sprite.LayeredUpdates.get_sprite(self.change_player_items, i)
-
-                        item.rect.x = (i + 1) * (SCREEN_WIDTH /
-                                                 (len(self.change_player_items) + 1)) - (item.rect.width / 2)
-                        item.rect.y = (SCREEN_HEIGHT / 2) - (item.rect.height / 2)
+                    return "player_select"
 
-                    if self.player_number == 0:
-
-                        self.player_select_arrow.rect.x = (self.original_player_pic.rect.x + (self.original_player_pic.rect.width / 2)) - \
-                            (self.player_select_arrow.rect.width / 2)
-                        self.player_select_arrow.rect.y = (
-                            self.original_player_pic.rect.y - self.player_select_arrow.rect.height - self.universal_spacing_gap)
-
-                    elif self.player_number == 1:
-
-                        self.player_select_arrow.rect.x = (self.blue_player_pic.rect.x + (self.blue_player_pic.rect.width / 2)) - \
-                            (self.player_select_arrow.rect.width / 2)
-                        self.player_select_arrow.rect.y = (
-                            self.blue_player_pic.rect.y - self.player_select_arrow.rect.height - self.universal_spacing_gap)
+                elif self.bullet_select:
 
-                    elif self.player_number == 2:
+                    return "bullet_select"
 
-                        self.player_select_arrow.rect.x = (self.yellow_player_pic.rect.x + (self.yellow_player_pic.rect.width / 2)) - \
-                            (self.player_select_arrow.rect.width / 2)
-                        self.player_select_arrow.rect.y = (
-                            self.yellow_player_pic.rect.y - self.player_select_arrow.rect.height - self.universal_spacing_gap)
+                elif self.cursor_select:
 
-                elif self.bullet_select:
+                    return "cursor_select"
 
-                    for i in range(len(self.change_bullet_items)):
+                elif self.upgrades_screen:
 
-                        item = pygame.sprite.LayeredUpdates.get_sprite(self.change_bullet_items, i)
+                    return "upgrades"
 
-                        item.rect.x = (i + 1) * (SCREEN_WIDTH /
-                                                 (len(self.change_bullet_items) + 1)) - (item.rect.width / 2)
-                        item.rect.y = (SCREEN_HEIGHT / 2) - (item.rect.height / 2)
+                return "settings"
 
-                    if self.ammo_number == 0:
+            elif self.highscore_screen:
 
-                        self.bullet_select_arrow.rect.x = (self.green_ammo_pic.rect.x + (self.green_ammo_pic.rect.width / 2)) - \
-                            (self.bullet_select_arrow.rect.width / 2)
-                        self.bullet_select_arrow.rect.y = (
-                            self.green_ammo_pic.rect.y - self.bullet_select_arrow.rect.height - self.universal_spacing_gap)
+                return "highscores"
 
-                    if self.ammo_number == 1:
+            elif self.new_highscore_screen:
 
-                        self.bullet_select_arrow.rect.x = (self.red_ammo_pic.rect.x + (self.red_ammo_pic.rect.width / 2)) - \
-                            (self.bullet_select_arrow.rect.width / 2)
-                        self.bullet_select_arrow.rect.y = (
-                            self.red_ammo_pic.rect.y - self.bullet_select_arrow.rect.height - self.universal_spacing_gap)
+                return "new_highscore"
 
-                    if self.ammo_number == 2:
+            elif self.enter_name_screen:
 
-                        self.bullet_select_arrow.rect.x = (self.purple_ammo_pic.rect.x + (self.purple_ammo_pic.rect.width / 2)) - \
-                            (self.bullet_select_arrow.rect.width / 2)
-                        self.bullet_select_arrow.rect.y = (
-                            self.purple_ammo_pic.rect.y - self.bullet_select_arrow.rect.height - self.universal_spacing_gap)
+                return "enter_name"
 
-                    if self.ammo_number == 3:
+            elif self.game_over:
 
-                        self.bullet_select_arrow.rect.x = (self.blue_ammo_pic.rect.x + (self.blue_ammo_pic.rect.width / 2)) - \
-                            (self.bullet_select_arrow.rect.width / 2)
-                        self.bullet_select_arrow.rect.y = (
-                            self.blue_ammo_pic.rect.y - self.bullet_select_arrow.rect.height - self.universal_spacing_gap)
+                return "game_over"
 
-                    if self.ammo_number == 4:
+            return None
 
-                        self.bullet_select_arrow.rect.x = (self.yellow_ammo_pic.rect.x + (self.yellow_ammo_pic.rect.width / 2)) - \
-                            (self.bullet_select_arrow.rect.width / 2)
-                        self.bullet_select_arrow.rect.y = (
-                            self.yellow_ammo_pic.rect.y - self.bullet_select_arrow.rect.height - self.universal_spacing_gap)
+        def update_layout(self):
+            """ Position the widgets of the current screen. Everything is placed
+            when a screen is entered; after that only the widgets whose size
+            changed (e.g. the score or coin count) are placed again.
 
-                elif self.cursor_select:
-
-                    for i in range(len(self.change_cursor_items)):
+            """
 
-                        item = pygame.sprite.LayeredUpdates.get_sprite(self.change_cursor_items, i)
+            name = self.screen_name()
+            layout = self.layouts.get(name)
 
-                        item.rect.x = (i + 1) * (SCREEN_WIDTH /
-                                                 (len(self.change_cursor_items) + 1)) - (item.rect.width / 2)
-                        item.rect.y = (SCREEN_HEIGHT / 2) - (item.rect.height / 2)
+            if layout is not None:
 
-                elif self.upgrades_screen:
+                if name != self.layout_name:
 
-                    self.increase_speed_word.rect.x = (SCREEN_WIDTH / 2) - \
-                        (self.increase_speed_word.rect.width / 2)
-                    self.increase_speed_word.rect.y = (SCREEN_HEIGHT / 4) - \
-                        (self.increase_speed_word.rect.height / 2)
-
-                    self.add_start_life_word.rect.x = (SCREEN_WIDTH / 2) - \
-                        (self.add_start_life_word.rect.width / 2)
-                    self.add_start_life_word.rect.y = (2 * (SCREEN_HEIGHT / 4)) - \
-                        (self.add_start_life_word.rect.height / 2)
-
-                    self.ammo_upgrade_word.rect.x = (SCREEN_WIDTH / 2) - \
-                        (self.ammo_upgrade_word.rect.width / 2)
-                    self.ammo_upgrade_word.rect.y = (3 * (SCREEN_HEIGHT / 4)) - \
-                        (self.ammo_upgrade_word.rect.height / 2)
-
-                    self.coin_pic2.rect.x = SCREEN_WIDTH - self.coin_pic2.rect.width - \
-                        self.universal_spacing_gap
-                    self.coin_pic2.rect.y = self.universal_spacing_gap
-
-                    self.coin_count_word2.rect.x = SCREEN_WIDTH - self.coin_count_word2.rect.width - \
-                        self.coin_pic2.rect.width - (2 * self.universal_spacing_gap)
-                    self.coin_count_word2.rect.y = self.universal_spacing_gap - 3
-
-                    self.speed_coin.rect.x = self.increase_speed_word.rect.x + self.increase_speed_word.rect.width + \
-                        self.universal_spacing_gap
-                    self.speed_coin.rect.y = self.increase_speed_word.rect.y
-                    self.life_coin.rect.x = self.add_start_life_word.rect.x + self.add_start_life_word.rect.width + \
-                        self.universal_spacing_gap
-                    self.life_coin.rect.y = self.add_start_life_word.rect.y
-                    self.ammo_coin.rect.x = self.ammo_upgrade_word.rect.x + self.ammo_upgrade_word.rect.width + \
-                        self.universal_spacing_gap
-                    self.ammo_coin.rect.y = self.ammo_upgrade_word.rect.y
+                    layout.apply()
 
                 else:
 
-                    for i in range(len(self.settings_screen_items)):
-
-                        item = pygame.sprite.LayeredUpdates.get_sprite(
-                            self.settings_screen_items, i)
+                    layout.refresh()
 
-                        item.rect.x = (SCREEN_WIDTH / 2) - (item.rect.width / 2)
-                        item.rect.y = (i + 1) * (SCREEN_HEIGHT /
-                                                 (len(self.settings_screen_items) + 1)) - (item.rect.height / 2)
+            self.layout_name = name
 
             return
 
@@ -1937,53 +1418,12 @@ def main():
 
             self.cursor.update()
             self.back_word.update()
-            Game.run_res_math(game)
 
             if self.game:
 
                 if self.paused == False:
 
-                    if not self.freeze_pickup:
-
-                        self.game_items.update()
-                        self.aliens.update()
-                        Game.update_changing_items(game)
-
-                    if self.freeze_pickup:
-
-                        for i in range(len(self.aliens)):
-
-                            item = pygame.sprite.LayeredUpdates.get_sprite(self.aliens, i)
-
-                            item.full_freeze = True
-
-                        self.frozen_frames += 1
-
-                        if self.frozen_frames < 200:
-
-                            self.game_items.update()
-                            self.update_changing_items()
-                            self.aliens.update()
-
-                            if self.freeze_hit:
-
-                                self.frozen_frames -= 400
-
-                        elif self.frozen_frames == 200:
-
-                            for i in range(len(self.aliens)):
-
-                                item = pygame.sprite.LayeredUpdates.get_sprite(self.aliens, i)
-
-                                item.full_freeze = False
-
-                            self.frozen_frames = 0
-                            self.freeze_pickup = False
-                            self.aliens.update()
-                            self.game_items.update()
-                            Game.update_changing_items(game)
-
-                    self.freeze_hit = False
+                    Game.step_world(game)
 
                 elif self.paused == True:
 
@@ -2025,74 +1465,97 @@ def main():
 
             return
 
-        def display_frame(self, screen):
-            """ Draw the items needed for the current screen.
+        def menu_items(self):
+            """ Return the name of the current menu screen and its sprites in
+            draw order (None and an empty list while in game.)
 
             """
 
             if self.game:
 
-                if not self.paused:
-
-                    self.game_items.draw(screen)
-                    Game.draw_lives(game, screen)
-                    self.aliens.draw(screen)
-
-                if self.paused:
-
-                    self.pause_items.draw(screen)
-                    self.aliens.draw(screen)
+                return (None, [])
 
             elif self.title_screen:
 
-                self.title_screen_items.draw(screen)
+                return ("title", self.title_screen_items.sprites())
 
             elif self.settings:
 
-                self.back_word.draw(screen)
-
                 if self.player_select:
 
-                    self.change_player_items.draw(screen)
-                    self.player_select_arrow.draw(screen)
+                    return ("player_select", [self.back_word] + self.change_player_items.sprites() +
+                            [self.player_select_arrow])
 
                 elif self.bullet_select:
 
-                    self.change_bullet_items.draw(screen)
-                    self.bullet_select_arrow.draw(screen)
+                    return ("bullet_select", [self.back_word] + self.change_bullet_items.sprites() +
+                            [self.bullet_select_arrow])
 
                 elif self.cursor_select:
 
-                    self.change_cursor_items.draw(screen)
+                    return ("cursor_select", [self.back_word] + self.change_cursor_items.sprites())
 
                 elif self.upgrades_screen:
 
-                    self.upgrade_screen_items.draw(screen)
+                    return ("upgrades", [self.back_word] + self.upgrade_screen_items.sprites())
 
                 else:
 
-                    self.settings_screen_items.draw(screen)
+                    return ("settings", [self.back_word] + self.settings_screen_items.sprites())
 
             elif self.highscore_screen:
 
-                self.back_word.draw(screen)
-                self.highscore_items.draw(screen)
-                self.highscore_name_items.draw(screen)
+                return ("highscores", [self.back_word] + self.highscore_items.sprites() +
+                        self.highscore_name_items.sprites())
 
             elif self.new_highscore_screen:
 
-                self.new_highscore_items.draw(screen)
+                return ("new_highscore", self.new_highscore_items.sprites())
 
             elif self.enter_name_screen:
 
-                self.keyboard.draw(screen)
-                self.backspace_word.draw(screen)
-                self.done_word.draw(screen)
-                self.entered_name.draw(screen)
+                return ("enter_name", self.keyboard.sprites() +
+                        [self.backspace_word, self.done_word, self.entered_name])
 
             elif self.game_over:
 
-                self.game_over_items.draw(screen)
+                return ("game_over", self.game_over_items.sprites())
+
+            return (None, [])
+
+        def display_frame(self, screen):
+            """ Draw the items needed for the current screen. Menu screens are
+            drawn from the menu cache.
+
+            """
+
+            if self.game:
+
+                if not self.paused:
+
+                    self.players.draw(screen)
+                    self.bullets.draw(screen)
+                    self.hud.draw(screen, Game.hud_state(game), self.draw_hud)
+                    self.aliens.draw(screen)
+
+                if self.paused:
+
+                    self.pause_items.draw(screen)
+                    self.aliens.draw(screen)
+
+            else:
+
+                (name, items) = Game.menu_items(game)
+
+                if USE_MENU_CACHE:
+
+                    self.menu_cache.draw(screen, name, items)
+
+                else:
+
+                    for item in items:
+
+                        item.draw(screen)
 
             self.cursor.draw(screen)
 
@@ -2102,45 +1565,159 @@ def main():
 
     done = False
     screen = pygame.display.set_mode([SCREEN_WIDTH, SCREEN_HEIGHT], pygame.FULLSCREEN)
-    clock = pygame.time.Clock()
+    clock = clock if clock is not None else pygame.time.Clock()
     pygame.mouse.set_visible(False)
 
-    stars = pygame.sprite.Group()
-
     game = Game()
 
-    for i in range(int(SCREEN_WIDTH / 2)):
+    stars = Starfield("star.png", STAR_LAYERS, SCREEN_WIDTH, SCREEN_HEIGHT)
+    renderer = DirtyRenderer((SCREEN_WIDTH, SCREEN_HEIGHT))
+    interpolator = Interpolator()
+    profiler = game.profiler
+    metrics = None
+    memory = None
+
+    if METRICS:
 
-        star = Star("star.png")
+        metrics = MetricsSink(os.path.join(METRICS_DIR, time.strftime("%Y%m%d-%H%M%S.jsonl")),
+                              METRICS_EVERY)
+
+    tick_time = 1000.0 / TICK_RATE
+    lag = 0.0
+    alpha = 1
+
+    def draw(surface):
+        """ Draw the frame with moving things alpha of the way between their
+        last two ticks, and the profiler overlay on top.
+
+        """
 
-        star.rect.x = random.randrange(0, SCREEN_WIDTH)
-        star.rect.y = random.randrange(0, SCREEN_HEIGHT)
-        star.velx = 0
-        star.vely = random.randrange(-5, -1)
+        with profiler.phase("draw"):
 
-        stars.add(star)
+            interpolator.draw(surface, game.display_frame, alpha)
+
+        profiler.draw(surface)
 
     game.main_music.play(-1)
 
+    if MEMORY_MONITOR:
+
+        memory = MemoryMonitor(os.path.join(MEMORY_DIR, time.strftime("%Y%m%d-%H%M%S.txt")),
+                               MEMORY_EVERY)
+
+    if os.environ.get(CPROFILE_ENV):
+
+        game.capture.start(game.screen_name(), len(game.aliens))
+
     """ - - - Main Loop - - - """
 
     while not done:
 
-        done = game.process_events()
+        with profiler.phase("events"):
+
+            done = game.process_events()
+
+        with profiler.phase("wait"):
+
+            lag += clock.tick(MAX_FPS)
+
+        ticks = 0
+
+        while lag >= tick_time and ticks < MAX_TICKS_PER_FRAME:
+
+            if INTERPOLATE:
+
+                interpolator.snapshot([game.players, game.bullets, game.aliens])
+
+            with profiler.phase("logic"):
+
+                game.run_logic()
+
+            if game.paused == False:
+
+                with profiler.phase("stars_update"):
+
+                    stars.update()
+
+            lag -= tick_time
+            ticks += 1
+
+            # Game over is handled with the next frame's events; no more ticks
+            # may change the score or state after the player died.
+            if game.game and game.world.over:
+
+                break
+
+        if lag >= tick_time:
+
+            lag %= tick_time
+
+        # Place the widgets once per frame, so a screen entered on a frame
+        # with no ticks is still drawn with its own layout.
+        game.update_layout()
+
+        # The cursor follows the mouse every frame, not just on ticks.
+        game.cursor.update()
+
+        if INTERPOLATE and game.paused == False:
+
+            alpha = lag / tick_time
+
+        else:
+
+            alpha = 1
+
+        if DIRTY_RECTS:
+
+            if ticks > 1:
+
+                renderer.invalidate()
+
+            with profiler.phase("render"):
+
+                renderer.render(screen, stars, draw, ticks > 0 and game.paused == False)
+
+        else:
+
+            with profiler.phase("stars_draw"):
+
+                screen.fill(BLACK)
+                stars.draw(screen, alpha)
+
+            draw(screen)
+
+            with profiler.phase("flip"):
+
+                pygame.display.flip()
+
+        phases = profiler.end_frame()
+
+        if metrics is not None and metrics.due():
+
+            metrics.record(frame_record(metrics.frames, game.screen_name(), phases,
+                                        {"aliens": len(game.aliens),
+                                         "bullets": len(game.bullets),
+                                         "players": len(game.players),
+                                         "stars": len(stars)},
+                                        cache_stats(), ticks))
+
+        if memory is not None:
+
+            memory.check(game.screen_name())
+
+        if on_frame is not None and on_frame(game):
 
-        game.run_logic()
+            done = True
 
-        if game.paused == False:
+    game.capture.stop()
 
-            stars.update()
+    if memory is not None:
 
-        screen.fill(BLACK)
-        stars.draw(screen)
-        game.display_frame(screen)
+        memory.stop()
 
-        pygame.display.flip()
+    if metrics is not None:
 
-        clock.tick(60)
+        metrics.close()
 
     pygame.quit()
 
@@ -0,0 +1,329 @@
+"""
+Space Fight
+Alien Engine
+"""
+
+import pygame
+
+from profiler import NULL_PROFILER
+
+try:
+
+    import numpy
+
+except ImportError:
+
+    numpy = None
+
+HAVE_NUMPY = numpy is not None
+
+CHASING = 0
+DROPPED = 1
+EXPLODING = 2
+
+
+def _rect_rounds():
+    """ Check how this pygame stores a float in a rect. Newer versions round
+    (half away from zero), older ones truncate.
+
+    """
+
+    rect = pygame.Rect(0, 0, 1, 1)
+    rect.x = 2.5
+
+    return rect.x == 3
+
+
+class AlienEngine(object):
+    """ Struct-of-arrays copy of the alien population. Every chasing alien is
+    steered, moved and checked against the bullets and players with a few
+    NumPy operations per frame. Only the aliens that actually have something
+    happen to them (a hit, a drop on the ground, an explosion) go through the
+    Python Alien methods, so the gameplay rules (drops, respawn, the speed
+    ramp) stay in one place. Rects are only written back for aliens
+    that are, or just were, on the screen.
+
+    Args:
+            aliens (list): The alien sprites, in update order.
+            screen_rect (rect): Area that gets drawn.
+            speed (float): Pixels per tick an alien moves before any ramp.
+            profiler (FrameProfiler): Times the collision checks.
+
+    Attributes:
+            aliens (list): The alien sprites, in update order.
+            screen_rect (rect): Area that gets drawn.
+            speed (float): Pixels per tick an alien moves before any ramp.
+            profiler (FrameProfiler): Times the collision checks.
+            x, y (array): Rect positions.
+            width, height (array): Rect sizes.
+            velx, vely (array): Velocities.
+            lives (array): Lives left.
+            speed_multiplier (array): Speed multipliers.
+            state (array): CHASING, DROPPED or EXPLODING.
+            full_freeze (array): Is the alien frozen.
+            visible (array): Was the alien's rect on the screen at the last sync.
+
+    """
+
+    def __init__(self, aliens, screen_rect, speed=2, profiler=NULL_PROFILER):
+
+        self.aliens = list(aliens)
+        self.screen_rect = screen_rect
+        self.speed = speed
+        self.profiler = profiler
+
+        count = len(self.aliens)
+
+        self.x = numpy.zeros(count)
+        self.y = numpy.zeros(count)
+        self.width = numpy.zeros(count)
+        self.height = numpy.zeros(count)
+        self.velx = numpy.zeros(count)
+        self.vely = numpy.zeros(count)
+        self.lives = numpy.zeros(count, dtype=int)
+        self.speed_multiplier = numpy.ones(count)
+        self.state = numpy.zeros(count, dtype=numpy.int8)
+        self.full_freeze = numpy.zeros(count, dtype=bool)
+        self.visible = numpy.ones(count, dtype=bool)
+
+        if _rect_rounds():
+
+            self.to_rect = self.round_half_away
+
+        else:
+
+            self.to_rect = numpy.trunc
+
+        self.load_all()
+
+    @staticmethod
+    def round_half_away(values):
+        """ Round like pygame does when a float is stored in a rect.
+
+        """
+
+        return numpy.where(values >= 0, numpy.floor(values + 0.5), numpy.ceil(values - 0.5))
+
+    def load(self, i):
+        """ Copy alien i's state from its sprite into the arrays.
+
+        Args:
+                i (int): Index of the alien.
+
+        """
+
+        alien = self.aliens[i]
+
+        self.x[i] = alien.rect.x
+        self.y[i] = alien.rect.y
+        self.width[i] = alien.rect.width
+        self.height[i] = alien.rect.height
+        self.velx[i] = alien.velx
+        self.vely[i] = alien.vely
+        self.lives[i] = alien.lives
+        self.speed_multiplier[i] = alien.speed_multiplier
+        self.full_freeze[i] = alien.full_freeze
+
+        if alien.exploding:
+
+            self.state[i] = EXPLODING
+
+        elif alien.ammo_dropped or alien.heart_dropped or \
+                alien.freeze_dropped or alien.coin_dropped:
+
+            self.state[i] = DROPPED
+
+        else:
+
+            self.state[i] = CHASING
+
+    def load_all(self):
+        """ Copy every alien's state into the arrays (e.g. after a reset.)
+
+        """
+
+        for i in range(len(self.aliens)):
+
+            self.load(i)
+
+        self.visible[:] = True
+
+    def store(self, i):
+        """ Copy alien i's state from the arrays back onto its sprite.
+
+        Args:
+                i (int): Index of the alien.
+
+        """
+
+        alien = self.aliens[i]
+
+        alien.rect.x = int(self.x[i])
+        alien.rect.y = int(self.y[i])
+        alien.velx = float(self.velx[i])
+        alien.vely = float(self.vely[i])
+        alien.full_freeze = bool(self.full_freeze[i])
+
+    def freeze(self, frozen):
+        """ Freeze or unfreeze every alien.
+
+        Args:
+                frozen (bool): Should the aliens stop moving.
+
+        """
+
+        self.full_freeze[:] = frozen
+
+    def steer(self, target):
+        """ Point every chasing alien at the target and move it one step.
+        Frozen aliens stop in place.
+
+        Args:
+                target (tuple): Point the aliens chase (the player's center.)
+
+        """
+
+        chasing = self.state == CHASING
+        moving = chasing & ~self.full_freeze
+        stopped = chasing & self.full_freeze
+
+        x_diff = target[0] - (self.x + self.width // 2)
+        y_diff = target[1] - (self.y + self.height // 2)
+        distance = numpy.hypot(x_diff, y_diff)
+        speed = self.speed * self.speed_multiplier
+
+        # atan2(0, 0) is 0, so an alien sitting on the target heads right.
+        cos = numpy.divide(x_diff, distance, out=numpy.ones_like(distance), where=distance > 0)
+        sin = numpy.divide(y_diff, distance, out=numpy.zeros_like(distance), where=distance > 0)
+
+        self.velx = numpy.where(moving, cos * speed, numpy.where(stopped, 0.0, self.velx))
+        self.vely = numpy.where(moving, sin * speed, numpy.where(stopped, 0.0, self.vely))
+
+        self.x = numpy.where(moving, self.to_rect(self.x + self.velx), self.x)
+        self.y = numpy.where(moving, self.to_rect(self.y + self.vely), self.y)
+
+    def overlapping(self, rect):
+        """ Return a mask of the aliens whose rects overlap the given rect
+        (same test as Rect.colliderect.)
+
+        Args:
+                rect (rect): Rect to test against.
+
+        """
+
+        if rect.width <= 0 or rect.height <= 0:
+
+            return numpy.zeros(len(self.aliens), dtype=bool)
+
+        return (self.x < rect.right) & (rect.left < self.x + self.width) & \
+            (self.y < rect.bottom) & (rect.top < self.y + self.height)
+
+    def find_hits(self, bullets, players):
+        """ Work out which chasing alien each bullet hits (the first one in
+        update order, like a chain of spritecollide calls would) and which
+        chasing aliens touch a player.
+
+        Args:
+                bullets (list): Bullets in play.
+                players (list): Players in play.
+
+        """
+
+        chasing = self.state == CHASING
+        bullet_hits = {}
+        player_hits = {}
+
+        if bullets:
+
+            left = numpy.array([bullet.rect.left for bullet in bullets])[:, None]
+            top = numpy.array([bullet.rect.top for bullet in bullets])[:, None]
+            right = numpy.array([bullet.rect.right for bullet in bullets])[:, None]
+            bottom = numpy.array([bullet.rect.bottom for bullet in bullets])[:, None]
+
+            overlap = (self.x < right) & (left < self.x + self.width) & \
+                (self.y < bottom) & (top < self.y + self.height) & \
+                (right > left) & (bottom > top) & chasing
+
+            hit = overlap.any(axis=1)
+            first = overlap.argmax(axis=1)
+
+            for b in numpy.flatnonzero(hit).tolist():
+
+                bullet_hits.setdefault(int(first[b]), []).append(bullets[b])
+
+        for player in players:
+
+            for i in numpy.flatnonzero(self.overlapping(player.rect) & chasing).tolist():
+
+                player_hits.setdefault(i, []).append(player)
+
+        return (bullet_hits, player_hits)
+
+    def sync_rects(self):
+        """ Write positions back to the rects of the aliens that will be drawn
+        (plus the ones that just left the screen, so they are not drawn at a
+        stale spot.)
+
+        """
+
+        visible = self.overlapping(self.screen_rect)
+
+        for i in numpy.flatnonzero(visible | self.visible).tolist():
+
+            rect = self.aliens[i].rect
+            rect.x = int(self.x[i])
+            rect.y = int(self.y[i])
+
+        self.visible = visible
+
+    def step(self, target, players, bullets):
+        """ Run one frame for every alien.
+
+        Args:
+                target (tuple): Point the aliens chase (the player's center.)
+                players (sprite group): Players the aliens can crash into.
+                bullets (sprite group): Bullets that can hit the aliens.
+
+        """
+
+        self.steer(target)
+
+        with self.profiler.phase("collisions"):
+
+            (bullet_hits, player_hits) = self.find_hits(list(bullets), list(players))
+
+        busy = self.state != CHASING
+        busy[list(bullet_hits)] = True
+        busy[list(player_hits)] = True
+
+        for i in numpy.flatnonzero(busy).tolist():
+
+            alien = self.aliens[i]
+
+            self.store(i)
+
+            if self.state[i] == CHASING:
+
+                hits = bullet_hits.get(i, [])
+
+                for bullet in hits:
+
+                    bullet.kill()
+
+                alien.collide(hits, player_hits.get(i, []))
+
+                if alien.exploding:
+
+                    alien.explode()
+
+                else:
+
+                    alien.show_lives()
+
+            else:
+
+                alien.update()
+
+            self.load(i)
+
+        self.sync_rects()
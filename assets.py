@@ -0,0 +1,297 @@
+"""
+Space Fight
+Asset Cache
+"""
+
+import math
+import struct
+from collections import OrderedDict
+
+import pygame
+
+BLACK = (0,  0,  0)
+
+_images = {}
+_sizes = {}
+_sounds = {}
+_rotations = {}
+_text = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+def load_image(image_string, convert=True, colorkey=BLACK):
+    """ Return the shared surface for an image file. The file is only read
+    from disk the first time a (path, conversion mode) pair is asked for.
+    Every later call gets the same surface back, so callers must treat it
+    as read-only.
+
+    Args:
+            image_string (str): Path of the image to load.
+            convert (bool): Convert the image to the display pixel format.
+            colorkey (color): Color to make transparent, or None for no
+            colorkey.
+
+    """
+
+    key = (image_string, convert, colorkey)
+    image = _images.get(key)
+
+    if image is not None:
+
+        _stats["hits"] += 1
+
+        return image
+
+    _stats["misses"] += 1
+
+    image = pygame.image.load(image_string)
+
+    if convert:
+
+        image = image.convert()
+
+    if colorkey is not None:
+
+        image.set_colorkey(colorkey)
+
+    _images[key] = image
+
+    return image
+
+
+def image_size(image_string):
+    """ Return the (width, height) of an image file without making a surface
+    (so it works with no display.) PNG sizes are read from the file header.
+
+    Args:
+            image_string (str): Path of the image.
+
+    """
+
+    size = _sizes.get(image_string)
+
+    if size is not None:
+
+        return size
+
+    with open(image_string, "rb") as image_file:
+
+        header = image_file.read(24)
+
+    if header[:8] == b"\x89PNG\r\n\x1a\n":
+
+        size = struct.unpack(">II", header[16:24])
+
+    else:
+
+        size = pygame.image.load(image_string).get_size()
+
+    _sizes[image_string] = size
+
+    return size
+
+
+def load_sound(sound_string):
+    """ Return the shared mixer sound for an audio file. The file is decoded
+    once; every later call gets the same Sound object back.
+
+    Args:
+            sound_string (str): Path of the sound to load.
+
+    """
+
+    sound = _sounds.get(sound_string)
+
+    if sound is not None:
+
+        _stats["hits"] += 1
+
+        return sound
+
+    _stats["misses"] += 1
+
+    sound = pygame.mixer.Sound(sound_string)
+    _sounds[sound_string] = sound
+
+    return sound
+
+
+def angle_step(angle, resolution):
+    """ Return which step of the given resolution an angle snaps to.
+
+    Args:
+            angle (float): Counterclockwise rotation in degrees.
+            resolution (int/float): Size of one angle step in degrees.
+
+    """
+
+    return int(round(angle / resolution)) % int(round(360.0 / resolution))
+
+
+def rotated_size(size, angle):
+    """ Return the size pygame.transform.rotate gives an image of the given
+    size, without rotating anything.
+
+    Args:
+            size (tuple): (width, height) of the unrotated image.
+            angle (float): Counterclockwise rotation in degrees.
+
+    """
+
+    (width, height) = size
+
+    if angle % 90 == 0:
+
+        if int(angle / 90) % 2:
+
+            return (height, width)
+
+        return (width, height)
+
+    radians = angle * .01745329251994329
+    sin = math.sin(radians)
+    cos = math.cos(radians)
+
+    return (int(max(abs(cos * width + sin * height), abs(cos * width - sin * height))),
+            int(max(abs(sin * width + cos * height), abs(sin * width - cos * height))))
+
+
+class RotationCache(object):
+    """ Pre-rotated copies of one image. Angles are snapped to a fixed
+    resolution, so looking up a rotation is a dict access instead of a
+    rotate and a new surface every frame. Frames are made the first time
+    they are asked for (or all at once with fill) and the least recently
+    used frame is dropped once max_size frames are held.
+
+    Args:
+            image (surface): The unrotated image.
+            resolution (int/float): Size of one angle step in degrees.
+            max_size (int): Most rotated frames kept at once.
+
+    Attributes:
+            image (surface): The unrotated image.
+            resolution (int/float): Size of one angle step in degrees.
+            max_size (int): Most rotated frames kept at once.
+            frames (OrderedDict): Rotated frames keyed by step number, oldest
+            use first.
+
+    """
+
+    def __init__(self, image, resolution=2, max_size=180):
+
+        self.image = image
+        self.resolution = resolution
+        self.max_size = max_size
+        self.frames = OrderedDict()
+
+    def steps(self):
+        """ Number of distinct angles at this resolution.
+
+        """
+
+        return int(round(360.0 / self.resolution))
+
+    def get(self, angle):
+        """ Return the frame closest to the given angle.
+
+        Args:
+                angle (float): Counterclockwise rotation in degrees.
+
+        """
+
+        step = angle_step(angle, self.resolution)
+        frame = self.frames.get(step)
+
+        if frame is not None:
+
+            self.frames.move_to_end(step)
+
+            return frame
+
+        frame = pygame.transform.rotate(self.image, step * self.resolution)
+        self.frames[step] = frame
+
+        if len(self.frames) > self.max_size:
+
+            self.frames.popitem(last=False)
+
+        return frame
+
+    def fill(self):
+        """ Rotate every step up front (as many as max_size allows.)
+
+        """
+
+        for step in range(min(self.steps(), self.max_size)):
+
+            self.get(step * self.resolution)
+
+
+def load_rotations(image_string, resolution=2, max_size=180):
+    """ Return the shared RotationCache for an image, so every sprite using
+    the same skin (at the same resolution and bound) shares the same rotated
+    frames.
+
+    Args:
+            image_string (str): Path of the image to rotate.
+            resolution (int/float): Size of one angle step in degrees.
+            max_size (int): Most rotated frames kept at once.
+
+    """
+
+    key = (image_string, resolution, max_size)
+    rotations = _rotations.get(key)
+
+    if rotations is None:
+
+        rotations = RotationCache(load_image(image_string), resolution, max_size)
+        _rotations[key] = rotations
+
+    return rotations
+
+
+def render_text(font, text, color, antialias=False, max_size=256):
+    """ Return a shared rendered surface for a string. Renders are kept in a
+    bounded cache keyed by (font, string, antialias, color); the least
+    recently used render is dropped once max_size renders are held.
+
+    Args:
+            font (font): Font to render with.
+            text (str): The string to render.
+            color (color): Color of the text.
+            antialias (bool): Render with antialiasing.
+            max_size (int): Most renders kept at once.
+
+    """
+
+    key = (font, text, antialias, color)
+    image = _text.get(key)
+
+    if image is not None:
+
+        _text.move_to_end(key)
+
+        return image
+
+    image = font.render(text, antialias, color)
+    _text[key] = image
+
+    if len(_text) > max_size:
+
+        _text.popitem(last=False)
+
+    return image
+
+
+def cache_stats():
+    """ Return the hit/miss counters of the asset cache. Misses are disk
+    reads, so a steady game loop should only ever add hits.
+
+    """
+
+    return {"hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "images": len(_images),
+            "sounds": len(_sounds),
+            "text": len(_text)}
+
@@ -0,0 +1,313 @@
+"""
+Space Fight
+Batch Simulator
+"""
+
+import argparse
+import ast
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+
+from simulation import Inputs, Rules, World
+
+FIELD_WIDTH = 1360
+FIELD_HEIGHT = 768
+PICKUP_KINDS = ["ammo", "heart", "freeze", "coin"]
+
+
+class Bot(object):
+    """ A simple player for unattended games. It runs away from the closest
+    alien that gets too near, otherwise goes for the closest drop, always
+    aims at the closest alien on the field and fires at it at a fixed rate.
+
+    Args:
+            world (World): The world the bot plays in.
+            fire_every (int): Ticks between shots.
+            danger (int): Distance at which an alien is run away from.
+
+    Attributes:
+            world (World): The world the bot plays in.
+            fire_every (int): Ticks between shots.
+            danger (int): Distance at which an alien is run away from.
+            field (rect): Area of the screen.
+            tick (int): Ticks played so far.
+
+    """
+
+    def __init__(self, world, fire_every=6, danger=150):
+
+        self.world = world
+        self.fire_every = fire_every
+        self.danger = danger
+        self.field = pygame.Rect(0, 0, world.width, world.height)
+        self.tick = 0
+
+    @staticmethod
+    def closest(center, points):
+        """ Return the point nearest to center, or None if there are none.
+
+        """
+
+        if not points:
+
+            return None
+
+        return min(points, key=lambda point: (point[0] - center[0]) ** 2 +
+                   (point[1] - center[1]) ** 2)
+
+    @staticmethod
+    def direction(start, end):
+        """ Unit move (-1, 0 or 1 on each axis) from start towards end.
+
+        """
+
+        return ((end[0] > start[0]) - (end[0] < start[0]),
+                (end[1] > start[1]) - (end[1] < start[1]))
+
+    def inputs(self):
+        """ Decide this tick's inputs.
+
+        """
+
+        center = self.world.player.rect.center
+        chasing = []
+        drops = []
+
+        for alien in self.world.aliens:
+
+            if not self.field.colliderect(alien.rect) or alien.exploding:
+
+                continue
+
+            if alien.heart_dropped or alien.ammo_dropped or alien.freeze_dropped or \
+                    alien.coin_dropped:
+
+                drops.append(alien.rect.center)
+
+            else:
+
+                chasing.append(alien.rect.center)
+
+        target = Bot.closest(center, chasing)
+        move = (0, 0)
+
+        if target is not None and (target[0] - center[0]) ** 2 + \
+                (target[1] - center[1]) ** 2 < self.danger ** 2:
+
+            move = Bot.direction(target, center)
+
+        else:
+
+            drop = Bot.closest(center, drops)
+
+            if drop is not None:
+
+                move = Bot.direction(center, drop)
+
+        fire = int(target is not None and self.tick % self.fire_every == 0)
+        self.tick += 1
+
+        return Inputs(move, target or self.field.center, fire)
+
+
+def play(seed, overrides=None, max_ticks=36000, lives=3, ammo=100):
+    """ Play one game with the bot and no display. Returns a dict with the
+    seed, the score, the ticks survived, the coins and the drops picked up.
+
+    Args:
+            seed (int): Random seed of the game.
+            overrides (dict): Rules to change from the defaults.
+            max_ticks (int): Stop the game after this many ticks.
+            lives (int): Lives the player starts with.
+            ammo (int): Bullets the player starts with.
+
+    """
+
+    world = World(FIELD_WIDTH, FIELD_HEIGHT, seed, rules=Rules(**(overrides or {})))
+    world.player.lives = lives
+    world.player.ammo = ammo
+    world.new_game(seed)
+    bot = Bot(world)
+
+    ticks = 0
+
+    while not world.over and ticks < max_ticks:
+
+        world.step(bot.inputs())
+        ticks += 1
+
+    return {"seed": seed,
+            "score": world.score,
+            "ticks": ticks,
+            "survived": not world.over,
+            "coins": world.coins,
+            "pickups": dict(world.pickups)}
+
+
+def play_args(args):
+    """ play() taking its arguments as one tuple (for Executor.map.)
+
+    """
+
+    return play(*args)
+
+
+def run_batch(games, seed=0, overrides=None, max_ticks=36000, lives=3, ammo=100, workers=None):
+    """ Play games with seeds seed, seed + 1, ... spread over a pool of
+    processes. Returns the list of play() results, in seed order.
+
+    Args:
+            games (int): Number of games.
+            seed (int): Seed of the first game.
+            overrides (dict): Rules to change from the defaults.
+            max_ticks (int): Longest a game may run.
+            lives (int): Lives the player starts with.
+            ammo (int): Bullets the player starts with.
+            workers (int): Processes to use (one per CPU if None.)
+
+    """
+
+    jobs = [(seed + i, overrides, max_ticks, lives, ammo) for i in range(games)]
+
+    with ProcessPoolExecutor(workers) as executor:
+
+        return list(executor.map(play_args, jobs, chunksize=max(1, games // 64)))
+
+
+def percentile(values, fraction):
+    """ Value below which the given fraction of the sorted values fall
+    (nearest rank.)
+
+    """
+
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summary(values):
+    """ Mean, min, max and percentiles of a list of numbers.
+
+    """
+
+    values = sorted(values)
+
+    return {"mean": sum(values) / len(values),
+            "min": values[0],
+            "p10": percentile(values, 0.1),
+            "p50": percentile(values, 0.5),
+            "p90": percentile(values, 0.9),
+            "max": values[-1]}
+
+
+def histogram(values, bins=10):
+    """ Counts of the values in equal-width bins. Returns a list of
+    (low, high, count).
+
+    """
+
+    low = min(values)
+    width = max(1, (max(values) - low + bins) // bins)
+    counts = [0] * bins
+
+    for value in values:
+
+        counts[min(bins - 1, (value - low) // width)] += 1
+
+    return [(low + i * width, low + (i + 1) * width, counts[i]) for i in range(bins)]
+
+
+def report(results):
+    """ Boil a batch down to score, survival and pickup distributions.
+
+    Args:
+            results (list): play() results.
+
+    """
+
+    scores = [result["score"] for result in results]
+    ticks = [result["ticks"] for result in results]
+
+    return {"games": len(results),
+            "survived": sum(result["survived"] for result in results),
+            "score": summary(scores),
+            "ticks": summary(ticks),
+            "score_histogram": histogram(scores),
+            "pickups": dict((kind, summary([result["pickups"][kind] for result in results]))
+                            for kind in PICKUP_KINDS)}
+
+
+def print_report(summary_report, rules):
+    """ Print a report made by report().
+
+    """
+
+    print("%d games, %d survived to the tick limit" % (summary_report["games"],
+                                                     summary_report["survived"]))
+    print("rules: %s" % ", ".join("%s=%s" % item for item in sorted(vars(rules).items())))
+
+    for name in ("score", "ticks"):
+
+        print("%-7s mean %8.1f  min %6d  p10 %6d  p50 %6d  p90 %6d  max %6d" % (
+            (name,) + tuple(summary_report[name][key]
+                            for key in ("mean", "min", "p10", "p50", "p90", "max"))))
+
+    for kind in PICKUP_KINDS:
+
+        stats = summary_report["pickups"][kind]
+        print("%-7s mean %8.2f  p50 %6d  p90 %6d  max %6d" % (
+            kind, stats["mean"], stats["p50"], stats["p90"], stats["max"]))
+
+    most = max(count for (low, high, count) in summary_report["score_histogram"]) or 1
+
+    for (low, high, count) in summary_report["score_histogram"]:
+
+        print("%6d-%-6d %5d %s" % (low, high - 1, count, "#" * (40 * count // most)))
+
+
+def parse_rule(text):
+    """ Turn "name=value" into (name, value). The value is read as a Python
+    literal (e.g. speed_ramp=1.1, heart_roll=0,30.)
+
+    """
+
+    (name, value) = text.split("=", 1)
+
+    return (name.strip(), ast.literal_eval(value))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Play many bot games with no display and "
+                                                 "report how they went.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=36000)
+    parser.add_argument("--lives", type=int, default=3)
+    parser.add_argument("--ammo", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--set", dest="rules", action="append", default=[], type=parse_rule,
+                        metavar="NAME=VALUE", help="change a rule (see simulation.Rules)")
+    parser.add_argument("--json", help="also write the report and every game to this file")
+    options = parser.parse_args()
+
+    overrides = dict(options.rules)
+    rules = Rules(**overrides)
+
+    start = time.perf_counter()
+    results = run_batch(options.games, options.seed, overrides, options.max_ticks,
+                        options.lives, options.ammo, options.workers)
+    elapsed = time.perf_counter() - start
+
+    summary_report = report(results)
+    print_report(summary_report, rules)
+    print("%.1f s" % elapsed)
+
+    if options.json:
+
+        with open(options.json, "w") as report_file:
+
+            json.dump({"rules": vars(rules), "report": summary_report, "games": results},
+                      report_file, indent=1)
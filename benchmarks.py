@@ -0,0 +1,344 @@
+"""
+Space Fight
+Benchmarks
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import time
+
+import pygame
+
+import SpaceFight_main
+from alien_engine import HAVE_NUMPY
+from assets import render_text
+from simulation import World
+from starfield import Starfield
+
+WHITE = (255, 255, 255)
+
+# Flag a benchmark when it is this much slower than the baseline (0.15 is
+# 15% slower.)
+THRESHOLD = 0.15
+
+
+class Suite(object):
+    """ A list of named benchmarks. Every benchmark is a function that is
+    called number times per run; each benchmark is run repeat times and the
+    best and median time per call are kept.
+
+    Attributes:
+            cases (list): (name, function, number, setup) of every benchmark.
+
+    """
+
+    def __init__(self):
+
+        self.cases = []
+
+    def add(self, name, function, number, setup=None):
+        """ Add a benchmark.
+
+        Args:
+                name (str): Name of the benchmark ("group/case".)
+                function (function): What is timed (takes no arguments.)
+                number (int): Calls per run.
+                setup (function): Called once before the benchmark runs.
+
+        """
+
+        self.cases.append((name, function, number, setup))
+
+    def run(self, pattern=None, repeat=5):
+        """ Run every benchmark whose name contains pattern. Returns the
+        results keyed by name.
+
+        Args:
+                pattern (str): Only run the benchmarks matching this.
+                repeat (int): Runs per benchmark.
+
+        """
+
+        results = {}
+
+        for (name, function, number, setup) in self.cases:
+
+            if pattern and pattern not in name:
+
+                continue
+
+            if setup is not None:
+
+                setup()
+
+            times = []
+
+            for i in range(repeat):
+
+                start = time.perf_counter()
+
+                for j in range(number):
+
+                    function()
+
+                times.append((time.perf_counter() - start) / number * 1e6)
+
+            times.sort()
+            results[name] = {"best_us": times[0],
+                             "median_us": times[len(times) // 2],
+                             "number": number,
+                             "repeat": repeat}
+
+            print("%-34s %12.1f us %12.1f us" % (name, times[len(times) // 2], times[0]))
+
+        return results
+
+
+def cycle(function, values):
+    """ Return a function that calls function with the next of values (over
+    and over) each time it is called.
+
+    """
+
+    state = [0]
+
+    def call():
+
+        function(values[state[0] % len(values)])
+        state[0] += 1
+
+    return call
+
+
+def add_world_benchmarks(suite, width, height):
+    """ Benchmarks of the display-free game rules.
+
+    """
+
+    engines = [False, True] if HAVE_NUMPY else [False]
+
+    for count in (30, 300, 3000):
+
+        for engine in engines:
+
+            world = World(width, height, 1, alien_count=count, use_engine=engine)
+            world.player.lives = 1000000
+            world.new_game(1)
+
+            suite.add("alien_update/%d%s" % (count, "/engine" if engine else ""),
+                      world.update_aliens, max(1, 3000 // count))
+
+    rng = random.Random(1)
+
+    for bullet_count in (16, 64, 256):
+
+        world = World(width, height, 1, alien_count=300, pool_size=bullet_count, use_engine=False)
+
+        for alien in world.aliens:
+
+            alien.rect.topleft = (rng.randrange(0, width), rng.randrange(0, height))
+
+        for bullet in world.bullet_pool.bullets:
+
+            bullet.rect.topleft = (rng.randrange(0, width), rng.randrange(0, height))
+            world.bullets.add(bullet)
+
+        def grid_collisions(world=world):
+
+            world.bullet_grid.rebuild(world.bullets)
+
+            for alien in world.aliens:
+
+                world.bullet_grid.spritecollide(alien, world.bullets, False)
+
+        suite.add("collisions/%d/grid" % bullet_count, grid_collisions, 20)
+
+        if HAVE_NUMPY:
+
+            from alien_engine import AlienEngine
+
+            engine = AlienEngine(world.aliens.sprites(), pygame.Rect(0, 0, width, height))
+            bullets = list(world.bullets)
+
+            suite.add("collisions/%d/engine" % bullet_count,
+                      lambda engine=engine, bullets=bullets: engine.find_hits(bullets, []), 100)
+
+    world = World(width, height, 1)
+    world.new_game(1)
+    (x, y) = world.player.rect.center
+    aims = [(x + int(300 * math.cos(math.radians(angle))),
+             y + int(300 * math.sin(math.radians(angle)))) for angle in range(360)]
+
+    def turn(aim, player=world.player):
+
+        # The rotated frame is only looked up when the ship is drawn.
+        player.update(aim)
+        player.image
+
+    suite.add("player_update/rotation", cycle(turn, aims), 1000)
+
+
+def add_game_benchmarks(suite, game, screen):
+    """ Benchmarks that need the real game (its widgets, layouts and screen.)
+
+    """
+
+    font = game.number_score.font
+
+    suite.add("text/render_cached", lambda: render_text(font, "SCORE:", WHITE), 10000)
+    suite.add("text/render_uncached", cycle(lambda number: font.render(str(number), False, WHITE),
+                                            list(range(1000))), 500)
+    suite.add("text/set_text", cycle(game.number_score.set_text, list(range(1000))), 500)
+    suite.add("hud/update_changing_items", game.update_changing_items, 1000)
+
+    for name in sorted(game.layouts):
+
+        suite.add("layout/apply/%s" % name, game.layouts[name].apply, 200)
+
+    suite.add("layout/refresh/game", game.layouts["game"].refresh, 1000)
+
+    stars = Starfield("star.png", SpaceFight_main.STAR_LAYERS, screen.get_width(),
+                      screen.get_height())
+
+    suite.add("starfield/update", stars.update, 500)
+    suite.add("starfield/draw", lambda: stars.draw(screen), 200)
+
+    def frame():
+
+        game.run_logic()
+        game.update_layout()
+        game.display_frame(screen)
+
+    suite.add("frame/title", frame, 200)
+
+    def start_game():
+
+        game.title_screen = False
+        game.game = True
+        game.player.lives = 3
+        game.start_game()
+
+    def game_frame():
+
+        # Never die, so every frame is an in-game frame.
+        game.player.lives = 3
+        frame()
+
+    suite.add("frame/game", game_frame, 300, start_game)
+
+
+def run(pattern=None, repeat=5):
+    """ Run the whole suite under the dummy SDL drivers. Returns the
+    results.
+
+    Args:
+            pattern (str): Only run the benchmarks whose name contains this.
+            repeat (int): Runs per benchmark.
+
+    """
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    results = {}
+
+    def on_frame(game):
+
+        suite = Suite()
+        screen = pygame.display.get_surface()
+
+        add_world_benchmarks(suite, SpaceFight_main.SCREEN_WIDTH, SpaceFight_main.SCREEN_HEIGHT)
+        add_game_benchmarks(suite, game, screen)
+
+        print("%-34s %15s %15s" % ("benchmark", "median", "best"))
+        results.update(suite.run(pattern, repeat))
+
+        return True
+
+    SpaceFight_main.main(on_frame)
+
+    return {"meta": {"time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                     "python": platform.python_version(),
+                     "pygame": pygame.version.ver,
+                     "numpy": HAVE_NUMPY,
+                     "machine": platform.machine(),
+                     "system": platform.system()},
+            "results": results}
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """ Compare results with a baseline. Prints every benchmark in both and
+    returns the names of the ones slower than the baseline by more than
+    threshold.
+
+    Args:
+            results (dict): run() output.
+            baseline (dict): run() output to compare with.
+            threshold (float): Allowed slowdown (0.15 is 15%.)
+
+    """
+
+    slower = []
+
+    print("%-34s %12s %12s %8s" % ("benchmark", "baseline", "now", "change"))
+
+    for (name, result) in sorted(results["results"].items()):
+
+        before = baseline["results"].get(name)
+
+        if before is None:
+
+            continue
+
+        change = result["median_us"] / before["median_us"] - 1
+        flag = ""
+
+        if change > threshold:
+
+            slower.append(name)
+            flag = "  SLOWER"
+
+        print("%-34s %9.1f us %9.1f us %+7.1f%%%s" % (name, before["median_us"],
+                                                       result["median_us"], change * 100, flag))
+
+    return slower
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Time the hot paths of Space Fight with no "
+                                                 "window.")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown against the baseline (default %(default)s)")
+    options = parser.parse_args()
+
+    results = run(options.filter, options.repeat)
+
+    if options.save:
+
+        with open(options.save, "w") as results_file:
+
+            json.dump(results, results_file, indent=1, sort_keys=True)
+
+    if options.compare:
+
+        with open(options.compare) as baseline_file:
+
+            baseline = json.load(baseline_file)
+
+        slower = compare(results, baseline, options.threshold)
+
+        if slower:
+
+            print("%d benchmark(s) slower than the baseline by more than %d%%: %s" % (
+                len(slower), options.threshold * 100, ", ".join(slower)))
+
+            raise SystemExit(1)
@@ -0,0 +1,292 @@
+"""
+Space Fight
+Environment
+"""
+
+import os
+import time
+
+import numpy
+import pygame
+
+from alien_engine import CHASING, DROPPED, EXPLODING
+from simulation import Inputs, Rules, World
+
+OBSERVE_STATE = "state"
+OBSERVE_PIXELS = "pixels"
+
+BLACK = (0,  0,  0)
+
+
+def alien_state(alien):
+    """ CHASING, DROPPED or EXPLODING for an alien sprite.
+
+    """
+
+    if alien.exploding:
+
+        return EXPLODING
+
+    if alien.ammo_dropped or alien.heart_dropped or alien.freeze_dropped or alien.coin_dropped:
+
+        return DROPPED
+
+    return CHASING
+
+
+class VectorEnv(object):
+    """ Several headless games of Space Fight stepped in lock-step, with a
+    reset/step interface for automated players. Each step takes one action
+    per game and returns (observations, rewards, dones, infos). A game that
+    ends is started again with the next seed right away; its last score and
+    length are in its info.
+
+    Actions are rows of (move x, move y, aim x, aim y, shots), either as an
+    array of shape (count, 5) or a list of Inputs. Rewards are the points
+    scored during the step.
+
+    Observations are written into arrays made once, and the same arrays are
+    returned by every step, so copy them to keep them:
+
+    - "state": a dict of float32 arrays. "player" is (count, 6) with x, y,
+      width, height, lives and ammo. "aliens" is (count, aliens, 4) with x,
+      y, lives and CHASING/DROPPED/EXPLODING. "bullets" is (count, pool, 3)
+      with x, y and whether the bullet is flying.
+    - "pixels": a uint8 array of shape (count, height, width, 3). Every game
+      draws into a Surface made over its slice of the array, so the frames
+      are never copied out of pygame.
+
+    Args:
+            count (int): Number of games.
+            seed (int): Seed of the first game (the rest use seed + 1, ...)
+            observe (str): OBSERVE_STATE or OBSERVE_PIXELS.
+            width (int): Width of the field.
+            height (int): Height of the field.
+            rules (Rules): Difficulty numbers (the defaults if None.)
+            lives (int): Lives the player starts each game with.
+            ammo (int): Bullets the player starts each game with.
+            max_ticks (int): End a game after this many steps (never if None.)
+            use_engine (bool): Step the aliens with the NumPy alien engine.
+
+    Attributes:
+            worlds (list): The games.
+            observe (str): OBSERVE_STATE or OBSERVE_PIXELS.
+            lives (int): Lives the player starts each game with.
+            ammo (int): Bullets the player starts each game with.
+            max_ticks (int): End a game after this many steps.
+            next_seed (int): Seed of the next game to be started.
+            ticks (array): Steps played in each game so far.
+            state (dict): The state observation arrays.
+            pixels (array): The pixel observation array.
+            surfaces (list): Surface over each game's slice of pixels.
+
+    """
+
+    def __init__(self, count, seed=0, observe=OBSERVE_STATE, width=1360, height=768,
+                 rules=None, lives=3, ammo=100, max_ticks=None, use_engine=True):
+
+        if observe not in (OBSERVE_STATE, OBSERVE_PIXELS):
+
+            raise ValueError("observe must be %r or %r, not %r" % (OBSERVE_STATE,
+                                                                   OBSERVE_PIXELS, observe))
+
+        rules = rules if rules is not None else Rules()
+
+        self.worlds = [World(width, height, None, use_engine=use_engine, rules=rules)
+                       for i in range(count)]
+        self.observe = observe
+        self.lives = lives
+        self.ammo = ammo
+        self.max_ticks = max_ticks
+        self.next_seed = seed
+        self.ticks = numpy.zeros(count, dtype=int)
+
+        world = self.worlds[0]
+
+        self.state = {"player": numpy.zeros((count, 6), dtype=numpy.float32),
+                      "aliens": numpy.zeros((count, len(world.aliens), 4), dtype=numpy.float32),
+                      "bullets": numpy.zeros((count, len(world.bullet_pool.bullets), 3),
+                                             dtype=numpy.float32)}
+        self.pixels = None
+        self.surfaces = []
+
+        if observe == OBSERVE_PIXELS:
+
+            if pygame.display.get_surface() is None:
+
+                os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+                pygame.display.init()
+                pygame.display.set_mode((1, 1))
+
+            self.pixels = numpy.zeros((count, height, width, 4), dtype=numpy.uint8)
+            self.surfaces = [pygame.image.frombuffer(self.pixels[i], (width, height), "RGBX")
+                             for i in range(count)]
+
+    def __len__(self):
+
+        return len(self.worlds)
+
+    def start(self, i):
+        """ Start a new game in slot i with the next seed.
+
+        """
+
+        world = self.worlds[i]
+        world.player.lives = self.lives
+        world.player.ammo = self.ammo
+        world.new_game(self.next_seed)
+
+        self.next_seed += 1
+        self.ticks[i] = 0
+
+    def reset(self):
+        """ Start a new game in every slot. Returns the observations.
+
+        """
+
+        for i in range(len(self.worlds)):
+
+            self.start(i)
+
+        return self.observations()
+
+    def step(self, actions):
+        """ Run one tick of every game. Returns (observations, rewards, dones,
+        infos).
+
+        Args:
+                actions (array/list): One action per game.
+
+        """
+
+        count = len(self.worlds)
+        rewards = numpy.zeros(count, dtype=numpy.float32)
+        dones = numpy.zeros(count, dtype=bool)
+        infos = [{} for i in range(count)]
+
+        for i in range(count):
+
+            world = self.worlds[i]
+            action = actions[i]
+
+            if not isinstance(action, Inputs):
+
+                action = Inputs((int(action[0]), int(action[1])), (int(action[2]), int(action[3])),
+                                int(action[4]))
+
+            score = world.score
+            events = world.step(action)
+            self.ticks[i] += 1
+
+            rewards[i] = world.score - score
+            infos[i]["events"] = events
+
+            if world.over or (self.max_ticks is not None and self.ticks[i] >= self.max_ticks):
+
+                dones[i] = True
+                infos[i].update({"seed": world.seed, "score": world.score,
+                                 "ticks": int(self.ticks[i]), "coins": world.coins,
+                                 "pickups": dict(world.pickups)})
+                self.start(i)
+
+        return (self.observations(), rewards, dones, infos)
+
+    def observations(self):
+        """ Fill in and return the observation arrays.
+
+        """
+
+        if self.observe == OBSERVE_PIXELS:
+
+            for i in range(len(self.worlds)):
+
+                self.draw(i)
+
+            return self.pixels[..., :3]
+
+        for i in range(len(self.worlds)):
+
+            self.observe_state(i)
+
+        return self.state
+
+    def observe_state(self, i):
+        """ Write game i's player, aliens and bullets into the state arrays.
+
+        """
+
+        world = self.worlds[i]
+        player = world.player
+        engine = world.alien_engine
+
+        self.state["player"][i] = (player.rect.x, player.rect.y, player.rect.width,
+                                   player.rect.height, player.lives, player.ammo)
+
+        aliens = self.state["aliens"][i]
+
+        if engine is not None:
+
+            aliens[:, 0] = engine.x
+            aliens[:, 1] = engine.y
+            aliens[:, 2] = engine.lives
+            aliens[:, 3] = engine.state
+
+        else:
+
+            aliens[:] = [(alien.rect.x, alien.rect.y, alien.lives, alien_state(alien))
+                         for alien in world.aliens]
+
+        self.state["bullets"][i] = [(bullet.rect.x, bullet.rect.y, bullet.alive())
+                                    for bullet in world.bullet_pool.bullets]
+
+    def draw(self, i):
+        """ Draw game i into its slice of the pixel array.
+
+        """
+
+        world = self.worlds[i]
+        surface = self.surfaces[i]
+
+        surface.fill(BLACK)
+        world.players.draw(surface)
+        world.bullets.draw(surface)
+        world.aliens.draw(surface)
+
+
+def benchmark(count=8, steps=2000, observe=OBSERVE_STATE):
+    """ Step a vector of games with random actions and print the steps per
+    second (per game and in total.)
+
+    Args:
+            count (int): Number of games.
+            steps (int): Steps to run.
+            observe (str): OBSERVE_STATE or OBSERVE_PIXELS.
+
+    """
+
+    env = VectorEnv(count, observe=observe)
+    env.reset()
+
+    generator = numpy.random.default_rng(0)
+    actions = numpy.zeros((count, 5), dtype=int)
+
+    start = time.perf_counter()
+
+    for step in range(steps):
+
+        actions[:, 0:2] = generator.integers(-1, 2, (count, 2))
+        actions[:, 2] = generator.integers(0, env.worlds[0].width, count)
+        actions[:, 3] = generator.integers(0, env.worlds[0].height, count)
+        actions[:, 4] = step % 6 == 0
+        env.step(actions)
+
+    elapsed = time.perf_counter() - start
+
+    print("%s: %d games x %d steps in %.2f s (%.0f steps/s per game, %.0f in total)" % (
+        observe, count, steps, elapsed, steps / elapsed, count * steps / elapsed))
+
+
+if __name__ == "__main__":
+
+    benchmark(observe=OBSERVE_STATE)
+    benchmark(observe=OBSERVE_PIXELS)
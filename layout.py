@@ -0,0 +1,220 @@
+"""
+Space Fight
+Layout
+"""
+
+
+def centered(width):
+    """ Rule that centers a rect horizontally in the given width.
+
+    Args:
+            width (int): Width to center in.
+
+    """
+
+    return lambda rect: (width / 2) - (rect.width / 2)
+
+
+def middle(height):
+    """ Rule that centers a rect vertically in the given height.
+
+    Args:
+            height (int): Height to center in.
+
+    """
+
+    return lambda rect: (height / 2) - (rect.height / 2)
+
+
+def spread(slot, step):
+    """ Rule that centers a rect on the slot-th mark of evenly spaced marks
+    (e.g. the rows of a menu.)
+
+    Args:
+            slot (int/float): Which mark to center on.
+            step (float): Distance between marks.
+
+    """
+
+    return lambda rect: slot * step - (rect.height / 2)
+
+
+def spread_x(slot, step):
+    """ Same as spread, along x (e.g. the pictures of a select screen.)
+
+    Args:
+            slot (int/float): Which mark to center on.
+            step (float): Distance between marks.
+
+    """
+
+    return lambda rect: slot * step - (rect.width / 2)
+
+
+def over(target):
+    """ Rule that centers a rect horizontally over another sprite.
+
+    Args:
+            target (function): Returns the sprite to center over (e.g. the
+            one that is selected.)
+
+    """
+
+    return lambda rect: (target().rect.x + (target().rect.width / 2)) - (rect.width / 2)
+
+
+def above(target, gap):
+    """ Rule that puts a rect just above another sprite.
+
+    Args:
+            target (function): Returns the sprite to sit above.
+            gap (int): Space between the two.
+
+    """
+
+    return lambda rect: target().rect.y - rect.height - gap
+
+
+def fixed(value):
+    """ Rule that always gives the same value.
+
+    Args:
+            value (int/float): The value.
+
+    """
+
+    return lambda rect: value
+
+
+class Layout(object):
+    """ Where every widget of one screen goes, described as rules instead of
+    being worked out every frame. apply() places everything (when the screen
+    is entered.) refresh() only places again the widgets whose size changed,
+    whose watched value changed, or that sit relative to a widget that moved
+    or changed size.
+
+    Attributes:
+            entries (list): [sprite, x rule, y rule, after, watch, snapshot]
+            for every widget, in placement order.
+
+    """
+
+    def __init__(self):
+
+        self.entries = []
+
+    def place(self, sprite, x, y, after=(), watch=None):
+        """ Add a widget to the layout.
+
+        Args:
+                sprite (sprite): The widget.
+                x (function): Takes the widget's rect, returns its x.
+                y (function): Takes the widget's rect, returns its y.
+                after (list): Widgets the rules read the rects of.
+                watch (function): Returns a value the rules depend on (e.g.
+                which ship is selected.)
+
+        """
+
+        self.entries.append([sprite, x, y, tuple(after), watch, None])
+
+    def column(self, sprites, width, height):
+        """ Add sprites as a centered column, evenly spaced down the screen
+        (e.g. the words of a menu.)
+
+        Args:
+                sprites (list): The sprites, top to bottom.
+                width (int): Width of the screen.
+                height (int): Height of the screen.
+
+        """
+
+        step = height / (len(sprites) + 1)
+
+        for i in range(len(sprites)):
+
+            self.place(sprites[i], centered(width), spread(i + 1, step))
+
+    def row(self, sprites, width, height):
+        """ Add sprites as a row across the middle of the screen, evenly
+        spaced (e.g. the pictures of a select screen.)
+
+        Args:
+                sprites (list): The sprites, left to right.
+                width (int): Width of the screen.
+                height (int): Height of the screen.
+
+        """
+
+        step = width / (len(sprites) + 1)
+
+        for i in range(len(sprites)):
+
+            self.place(sprites[i], spread_x(i + 1, step), middle(height))
+
+    def extend(self, other):
+        """ Add every widget of another layout (e.g. the in-game widgets to
+        the pause screen.)
+
+        Args:
+                other (Layout): The layout to copy from.
+
+        """
+
+        for entry in other.entries:
+
+            self.entries.append(entry[:5] + [None])
+
+    @staticmethod
+    def snapshot(entry):
+        """ What an entry's placement depends on right now.
+
+        """
+
+        (sprite, x, y, after, watch, last) = entry
+
+        return (sprite.rect.size,
+                tuple(tuple(other.rect) for other in after),
+                watch() if watch is not None else None)
+
+    @staticmethod
+    def run(entry):
+        """ Place one widget.
+
+        """
+
+        rect = entry[0].rect
+        rect.x = entry[1](rect)
+        rect.y = entry[2](rect)
+
+    def apply(self):
+        """ Place every widget.
+
+        """
+
+        for entry in self.entries:
+
+            Layout.run(entry)
+            entry[5] = Layout.snapshot(entry)
+
+        return len(self.entries)
+
+    def refresh(self):
+        """ Place again only the widgets whose inputs changed. Returns how many
+        were placed.
+
+        """
+
+        placed = 0
+
+        for entry in self.entries:
+
+            snapshot = Layout.snapshot(entry)
+
+            if snapshot != entry[5]:
+
+                Layout.run(entry)
+                entry[5] = Layout.snapshot(entry)
+                placed += 1
+
+        return placed
@@ -0,0 +1,180 @@
+"""
+Space Fight
+Memory Monitor
+"""
+
+import gc
+import os
+import time
+import tracemalloc
+
+import pygame
+
+# Containers the garbage collector stops tracking when they only hold
+# atomic values (such as Surfaces.)
+UNTRACKED_CONTAINERS = (dict, list, tuple, set, frozenset)
+
+
+def surface_stats():
+    """ Count the Surfaces that are alive and the bytes their pixels take.
+    Surfaces are not tracked by the garbage collector themselves, so they
+    are found through the objects that hold them. Containers that hold
+    only untracked objects (e.g. the asset cache dicts) are not tracked
+    either, so those are searched as well. Subsurfaces share their
+    parent's pixels and are counted apart.
+
+    """
+
+    seen = set()
+    surfaces = 0
+    subsurfaces = 0
+    size = 0
+    pending = gc.get_objects()
+
+    while pending:
+
+        holder = pending.pop()
+
+        for item in gc.get_referents(holder):
+
+            if id(item) in seen:
+
+                continue
+
+            if isinstance(item, pygame.Surface):
+
+                seen.add(id(item))
+
+                if item.get_parent() is not None:
+
+                    subsurfaces += 1
+
+                else:
+
+                    surfaces += 1
+                    size += item.get_pitch() * item.get_height()
+
+            elif isinstance(item, UNTRACKED_CONTAINERS) and not gc.is_tracked(item):
+
+                seen.add(id(item))
+                pending.append(item)
+
+    return {"surfaces": surfaces, "subsurfaces": subsurfaces, "bytes": size}
+
+
+class MemoryMonitor(object):
+    """ Takes tracemalloc snapshots on every screen change and every so many
+    frames, and writes what grew since the last one to a log: the top
+    allocation sites by growth, the total traced memory and the live
+    Surfaces with their sizes.
+
+    Args:
+            path (str): Log file. Its directory is made if needed.
+            every (int): Frames between snapshots on the same screen.
+            top (int): Allocation sites listed per snapshot.
+            depth (int): Stack frames tracemalloc keeps per allocation.
+
+    Attributes:
+            path (str): Log file.
+            every (int): Frames between snapshots on the same screen.
+            top (int): Allocation sites listed per snapshot.
+            frames (int): Frames seen so far.
+            screen (str): Screen of the last frame.
+            last (Snapshot): The previous snapshot.
+            filters (list): Allocations left out of the snapshots (the
+            monitor's own and the import machinery's.)
+            started (bool): Did the monitor start tracing (so it stops it.)
+
+    """
+
+    def __init__(self, path, every=3600, top=10, depth=1):
+
+        directory = os.path.dirname(path)
+
+        if directory and not os.path.isdir(directory):
+
+            os.makedirs(directory)
+
+        self.path = path
+        self.every = every
+        self.top = top
+        self.frames = 0
+        self.screen = None
+        self.last = None
+        self.filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                        tracemalloc.Filter(False, __file__),
+                        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+                        tracemalloc.Filter(False, "<unknown>")]
+
+        self.started = not tracemalloc.is_tracing()
+
+        if self.started:
+
+            tracemalloc.start(depth)
+
+    def check(self, screen):
+        """ Count a frame and take a snapshot if the screen changed or one is
+        due.
+
+        Args:
+                screen (str): Name of the screen being shown.
+
+        """
+
+        self.frames += 1
+
+        if screen != self.screen:
+
+            self.snapshot("screen %s -> %s" % (self.screen, screen))
+            self.screen = screen
+
+        elif self.frames % self.every == 0:
+
+            self.snapshot("frame %d on %s" % (self.frames, screen))
+
+    def snapshot(self, reason):
+        """ Take a snapshot and log how it differs from the last one.
+
+        Args:
+                reason (str): Why the snapshot was taken.
+
+        """
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(self.filters)
+        (current, peak) = tracemalloc.get_traced_memory()
+        surfaces = surface_stats()
+
+        lines = ["%s frame %d: %s" % (time.strftime("%Y-%m-%d %H:%M:%S"), self.frames, reason),
+                 "  traced %.1f kB (peak %.1f kB), %d surfaces (%.1f kB) + %d subsurfaces" % (
+                     current / 1024, peak / 1024, surfaces["surfaces"],
+                     surfaces["bytes"] / 1024, surfaces["subsurfaces"])]
+
+        if self.last is not None:
+
+            growth = [stat for stat in snapshot.compare_to(self.last, "lineno")
+                      if stat.size_diff > 0][:self.top]
+
+            for stat in growth:
+
+                frame = stat.traceback[0]
+                lines.append("  %+9.1f kB %+7d blocks  %s:%d" % (
+                    stat.size_diff / 1024, stat.count_diff, frame.filename, frame.lineno))
+
+        self.last = snapshot
+
+        with open(self.path, "a") as log_file:
+
+            log_file.write("\n".join(lines) + "\n")
+
+    def stop(self):
+        """ Take a last snapshot and stop tracing (unless someone else
+        started it.)
+
+        """
+
+        self.snapshot("exit")
+
+        if self.started:
+
+            tracemalloc.stop()
@@ -0,0 +1,161 @@
+"""
+Space Fight
+Metrics Sink
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+
+class MetricsSink(object):
+    """ Writes frame records to a JSON Lines file (one JSON object per
+    line.) Records are handed to a background thread through a queue, so
+    the game loop never waits on the disk. If the writer falls behind by
+    more than max_pending records, new records are dropped and counted
+    instead of piling up.
+
+    Args:
+            path (str): File to write. Its directory is made if needed.
+            every (int): Keep one frame in every this many.
+            max_pending (int): Most records waiting to be written.
+
+    Attributes:
+            path (str): File being written.
+            every (int): Keep one frame in every this many.
+            frames (int): Frames offered so far.
+            dropped (int): Records dropped because the writer was behind.
+            queue (Queue): Records waiting to be written.
+            thread (Thread): The writer.
+
+    """
+
+    def __init__(self, path, every=1, max_pending=10000):
+
+        directory = os.path.dirname(path)
+
+        if directory and not os.path.isdir(directory):
+
+            os.makedirs(directory)
+
+        self.path = path
+        self.every = max(1, every)
+        self.frames = 0
+        self.dropped = 0
+        self.queue = queue.Queue(max_pending)
+        self.thread = threading.Thread(target=self.write, name="metrics", daemon=True)
+        self.thread.start()
+
+    def due(self):
+        """ Count a frame. Returns whether this frame should be recorded (so
+        the record is only built when it will be kept.)
+
+        """
+
+        self.frames += 1
+
+        return (self.frames - 1) % self.every == 0
+
+    def record(self, record):
+        """ Queue a record to be written.
+
+        Args:
+                record (dict): Anything json can write.
+
+        """
+
+        try:
+
+            self.queue.put_nowait(record)
+
+        except queue.Full:
+
+            self.dropped += 1
+
+    def write(self):
+        """ Writer thread: write queued records until close() is called.
+
+        """
+
+        with open(self.path, "a") as metrics_file:
+
+            while True:
+
+                record = self.queue.get()
+
+                if record is None:
+
+                    break
+
+                metrics_file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+                if self.queue.empty():
+
+                    metrics_file.flush()
+
+    def close(self):
+        """ Write out everything still queued, then a count of the dropped
+        records (if any), and stop the writer. The count waits for room in
+        the queue rather than being dropped itself, unless the writer has
+        died.
+
+        """
+
+        if self.dropped:
+
+            self.put_waiting({"time": time.time(), "dropped": self.dropped})
+
+        if not self.put_waiting(None):
+
+            print("metrics writer stopped early; %d records in %s were not written" % (
+                self.queue.qsize(), self.path))
+
+        self.thread.join()
+
+    def put_waiting(self, record):
+        """ Queue a record, waiting for room for as long as the writer is
+        running. Returns whether the record was queued.
+
+        Args:
+                record (dict): Anything json can write (None stops the
+                writer.)
+
+        """
+
+        while self.thread.is_alive():
+
+            try:
+
+                self.queue.put(record, timeout=0.1)
+
+                return True
+
+            except queue.Full:
+
+                pass
+
+        return False
+
+
+def frame_record(frame, screen, phases, groups, assets, ticks):
+    """ Build the record of one frame.
+
+    Args:
+            frame (int): Frame number.
+            screen (str): Name of the screen being shown.
+            phases (dict): Milliseconds spent in each phase.
+            groups (dict): Number of sprites in each group, by name.
+            assets (dict): Asset cache stats.
+            ticks (int): Game ticks run this frame.
+
+    """
+
+    return {"frame": frame,
+            "time": time.time(),
+            "screen": screen,
+            "ticks": ticks,
+            "phases": dict((name, round(ms, 4)) for (name, ms) in phases.items()),
+            "sprites": groups,
+            "assets": assets}
@@ -0,0 +1,428 @@
+"""
+Space Fight
+Frame Profiler
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import time
+from collections import deque
+
+import pygame
+
+BLACK = (0,  0,  0)
+WHITE = (255, 255, 255)
+GREEN = (0, 255,  0)
+YELLOW = (255, 255, 0)
+RED = (255,  0,  0)
+
+# (name, label) of every phase, in the order the overlay lists them.
+PHASES = [("frame", "frame"),
+          ("events", "events"),
+          ("logic", "logic"),
+          ("items", "  player+bullets"),
+          ("aliens", "  aliens"),
+          ("collisions", "    collisions"),
+          ("stars_update", "stars update"),
+          ("draw", "draw"),
+          ("hud", "  hud"),
+          ("stars_draw", "stars draw"),
+          ("render", "dirty render"),
+          ("flip", "flip"),
+          ("wait", "wait")]
+
+
+class NullPhase(object):
+    """ A phase that times nothing.
+
+    """
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc_info):
+
+        return False
+
+
+class Phase(object):
+    """ Times one phase of the frame (use it as a with block.) A phase can
+    run several times in one frame; the times add up.
+
+    Args:
+            profiler (FrameProfiler): Where the time goes.
+            name (str): Name of the phase.
+
+    """
+
+    def __init__(self, profiler, name):
+
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exc_info):
+
+        current = self.profiler.current
+        current[self.name] = current.get(self.name, 0.0) + time.perf_counter() - self.start
+
+        return False
+
+
+class NullProfiler(object):
+    """ Stand-in for a FrameProfiler that is never on (e.g. for worlds run
+    with no display.)
+
+    """
+
+    enabled = False
+
+    def phase(self, name):
+
+        return NULL_PHASE
+
+
+NULL_PHASE = NullPhase()
+NULL_PROFILER = NullProfiler()
+
+
+class FrameProfiler(object):
+    """ Times the phases of every frame while it is on. Keeps the last few
+    seconds of every phase for rolling averages and p95/p99, a histogram of
+    whole-frame times for the session, and draws all of it as an overlay.
+    Timing is on while the overlay is shown, or all the time with timing
+    (e.g. for a metrics sink.)
+
+    Args:
+            show (bool): Show the overlay straight away.
+            timing (bool): Time frames even while the overlay is hidden.
+            window (int): Frames the rolling statistics cover.
+            bucket_ms (float): Width of a histogram bucket in milliseconds.
+            buckets (int): Number of histogram buckets (the last one also
+            counts every longer frame.)
+            refresh (int): Frames between redraws of the overlay text.
+
+    Attributes:
+            enabled (bool): Is the profiler timing frames.
+            show (bool): Is the overlay shown.
+            timing (bool): Time frames even while the overlay is hidden.
+            window (int): Frames the rolling statistics cover.
+            bucket_ms (float): Width of a histogram bucket in milliseconds.
+            histogram (list): Frame count of every bucket.
+            frames (int): Frames timed so far.
+            current (dict): Seconds spent in each phase so far this frame.
+            phases (dict): The Phase timer of every phase, by name.
+            history (dict): Milliseconds of each phase over the last window
+            frames.
+            frame_start (float): When the current frame started.
+            refresh (int): Frames between redraws of the overlay text.
+            font (font): Font of the overlay (made when first drawn.)
+            overlay (surface): The rendered overlay.
+
+    """
+
+    def __init__(self, show=False, window=240, bucket_ms=1.0, buckets=50, refresh=30,
+                 timing=False):
+
+        self.enabled = timing
+        self.show = False
+        self.timing = timing
+        self.window = window
+        self.bucket_ms = bucket_ms
+        self.histogram = [0] * buckets
+        self.frames = 0
+        self.current = {}
+        self.history = {}
+        self.phases = {}
+        self.frame_start = time.perf_counter()
+        self.refresh = refresh
+        self.font = None
+        self.overlay = None
+
+        if show:
+
+            self.toggle()
+
+    def toggle(self):
+        """ Show or hide the overlay (timing goes with it, unless it is
+        always on.)
+
+        """
+
+        self.show = not self.show
+        self.overlay = None
+
+        if self.enabled != (self.show or self.timing):
+
+            self.enabled = self.show or self.timing
+            self.current = {}
+            self.frame_start = time.perf_counter()
+
+    def phase(self, name):
+        """ Return the timer of a phase, for a with block. Times nothing
+        while the profiler is off.
+
+        Args:
+                name (str): Name of the phase.
+
+        """
+
+        if not self.enabled:
+
+            return NULL_PHASE
+
+        phase = self.phases.get(name)
+
+        if phase is None:
+
+            phase = Phase(self, name)
+            self.phases[name] = phase
+
+        return phase
+
+    def end_frame(self):
+        """ Close the current frame: file away its phase times and start the
+        next one. Returns the frame's milliseconds per phase (None while
+        the profiler is off.)
+
+        """
+
+        if not self.enabled:
+
+            return None
+
+        now = time.perf_counter()
+        self.current["frame"] = now - self.frame_start
+        self.frame_start = now
+
+        frame = {}
+
+        for (name, seconds) in self.current.items():
+
+            history = self.history.get(name)
+
+            if history is None:
+
+                history = deque(maxlen=self.window)
+                self.history[name] = history
+
+            frame[name] = seconds * 1000
+            history.append(frame[name])
+
+        bucket = int(self.current["frame"] * 1000 / self.bucket_ms)
+        self.histogram[min(bucket, len(self.histogram) - 1)] += 1
+
+        self.frames += 1
+        self.current = {}
+
+        if self.frames % self.refresh == 0:
+
+            self.overlay = None
+
+        return frame
+
+    def stats(self, name):
+        """ Return (mean, p95, p99) of a phase over the window in
+        milliseconds, or None if it has not run. Frames the phase did not run
+        in are left out.
+
+        Args:
+                name (str): Name of the phase.
+
+        """
+
+        history = self.history.get(name)
+
+        if not history:
+
+            return None
+
+        values = sorted(history)
+        last = len(values) - 1
+
+        return (sum(values) / len(values),
+                values[min(last, int(0.95 * len(values)))],
+                values[min(last, int(0.99 * len(values)))])
+
+    def render(self):
+        """ Draw the overlay: a table of every phase that ran and the frame
+        time histogram underneath.
+
+        """
+
+        if self.font is None:
+
+            self.font = pygame.font.Font(None, 20)
+
+        lines = [("phase", "avg ms", "p95", "p99", WHITE)]
+
+        for (name, label) in PHASES:
+
+            stats = self.stats(name)
+
+            if stats is not None:
+
+                color = GREEN if stats[2] < 16.7 else YELLOW if stats[2] < 33.4 else RED
+                lines.append((label,) + tuple("%.2f" % value for value in stats) + (color,))
+
+        line_height = self.font.get_linesize()
+        columns = [0, 130, 190, 250]
+        bar_width = 3
+        graph_height = 40
+        width = max(columns[-1] + 60, len(self.histogram) * bar_width) + 10
+        height = line_height * (len(lines) + 1) + graph_height + 10
+
+        surface = pygame.Surface((width, height))
+        surface.fill(BLACK)
+        surface.set_alpha(200)
+
+        for (row, line) in enumerate(lines):
+
+            for (column, text) in zip(columns, line[:4]):
+
+                surface.blit(self.font.render(text, True, line[4]),
+                             (5 + column, 5 + row * line_height))
+
+        top = 5 + len(lines) * line_height
+        surface.blit(self.font.render("frames: 0-%d ms, %d timed" % (
+            len(self.histogram) * self.bucket_ms, self.frames), True, WHITE), (5, top))
+
+        most = max(self.histogram) or 1
+        bottom = height - 5
+
+        for (i, count) in enumerate(self.histogram):
+
+            bar = int(graph_height * count / most)
+
+            if bar:
+
+                color = GREEN if (i + 1) * self.bucket_ms <= 16.7 else YELLOW \
+                    if (i + 1) * self.bucket_ms <= 33.4 else RED
+                surface.fill(color, (5 + i * bar_width, bottom - bar, bar_width - 1, bar))
+
+        return surface
+
+    def draw(self, screen):
+        """ Blit the overlay in the top right corner, rendering it again if it
+        is due.
+
+        Args:
+                screen (screen): Blit destination.
+
+        """
+
+        if not self.show:
+
+            return
+
+        if self.overlay is None:
+
+            self.overlay = self.render()
+
+        screen.blit(self.overlay, (screen.get_size()[0] - self.overlay.get_width(), 0))
+
+
+class SessionProfiler(object):
+    """ cProfile capture that can be started and stopped while the game runs.
+    Every capture is written to its own file, named after when it started,
+    the screen it started on and the number of aliens, with a text summary
+    of the top functions by cumulative time next to it.
+
+    Args:
+            directory (str): Where captures are written.
+            top (int): Functions listed in the summary.
+
+    Attributes:
+            directory (str): Where captures are written.
+            top (int): Functions listed in the summary.
+            profile (Profile): The running capture (None when stopped.)
+            name (str): File name (without extension) of the running capture.
+
+    """
+
+    def __init__(self, directory="profiles", top=25):
+
+        self.directory = directory
+        self.top = top
+        self.profile = None
+        self.name = None
+
+    @property
+    def running(self):
+        """ Is a capture running.
+
+        """
+
+        return self.profile is not None
+
+    def start(self, screen, aliens):
+        """ Start a capture.
+
+        Args:
+                screen (str): Name of the screen being shown.
+                aliens (int): Number of aliens.
+
+        """
+
+        if self.running:
+
+            return
+
+        self.name = "%s-%s-%daliens" % (time.strftime("%Y%m%d-%H%M%S"), screen or "none", aliens)
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        """ Stop the capture and write it out. Returns the path of the
+        profile (None if no capture was running.)
+
+        """
+
+        if not self.running:
+
+            return None
+
+        self.profile.disable()
+
+        if not os.path.isdir(self.directory):
+
+            os.makedirs(self.directory)
+
+        path = os.path.join(self.directory, self.name + ".prof")
+        self.profile.dump_stats(path)
+
+        summary = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=summary)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(self.top)
+
+        with open(os.path.join(self.directory, self.name + ".txt"), "w") as summary_file:
+
+            summary_file.write(summary.getvalue())
+
+        self.profile = None
+
+        return path
+
+    def toggle(self, screen, aliens):
+        """ Start a capture, or stop the running one.
+
+        Args:
+                screen (str): Name of the screen being shown.
+                aliens (int): Number of aliens.
+
+        """
+
+        if self.running:
+
+            return self.stop()
+
+        self.start(screen, aliens)
@@ -0,0 +1,407 @@
+"""
+Space Fight
+Dirty Rectangle Renderer
+"""
+
+import pygame
+
+BLACK = (0,  0,  0)
+
+
+def composite(commands):
+    """ Flatten a list of blits into one surface covering their bounding
+    box, with black as the colorkey. Returns (surface, topleft).
+
+    Args:
+            commands (list): (image, rect) of every blit, in draw order.
+
+    """
+
+    rects = [rect for (image, rect) in commands]
+    area = rects[0].unionall(rects[1:])
+
+    surface = pygame.Surface(area.size).convert()
+    surface.fill(BLACK)
+
+    for (image, rect) in commands:
+
+        surface.blit(image, rect.move(-area.x, -area.y))
+
+    surface.set_colorkey(BLACK, pygame.RLEACCEL)
+
+    return (surface, area.topleft)
+
+
+class DrawRecorder(object):
+    """ Stand-in for the screen that records blits instead of doing them.
+    Sprite groups and the draw methods only ever blit, so the whole frame
+    can be drawn into a recorder and compared with the last one.
+
+    Args:
+            size (tuple): Size of the screen being stood in for.
+
+    Attributes:
+            rect (rect): Area of the screen.
+            commands (list): (image, rect) for every blit this frame, in order.
+
+    """
+
+    def __init__(self, size):
+
+        self.rect = pygame.Rect((0, 0), size)
+        self.commands = []
+
+    def get_size(self):
+
+        return self.rect.size
+
+    def get_rect(self):
+
+        return self.rect.copy()
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        """ Record a blit. Returns the part of the screen it would cover, like
+        Surface.blit.
+
+        """
+
+        if area is not None:
+
+            source = source.subsurface(pygame.Rect(area).clip(source.get_rect()))
+
+        if isinstance(dest, pygame.Rect):
+
+            rect = pygame.Rect(dest.topleft, source.get_size())
+
+        else:
+
+            rect = pygame.Rect((int(dest[0]), int(dest[1])), source.get_size())
+
+        self.commands.append((source, rect))
+
+        return rect.clip(self.rect)
+
+    def blits(self, blit_sequence, doreturn=1):
+        """ Record a sequence of blits, like Surface.blits.
+
+        """
+
+        rects = [self.blit(*item) for item in blit_sequence]
+
+        if doreturn:
+
+            return rects
+
+
+class DirtyRenderer(object):
+    """ Draws a frame by repainting only what changed since the last one and
+    pushing just those areas with pygame.display.update(rects). The frame is
+    recorded as a list of blits; blits that appeared, disappeared or moved
+    mark their areas dirty, as do the stars that moved. Every dirty area is
+    cleared and then every layer (stars first, then the recorded blits in
+    order) is redrawn clipped to it. A frame where nothing changed costs the
+    recording and nothing else.
+
+    Args:
+            size (tuple): Size of the screen.
+
+    Attributes:
+            recorder (DrawRecorder): Where the frame is drawn into.
+            screen_rect (rect): Area of the screen.
+            last (set): (image, rect) of every blit of the last frame.
+            full (bool): Redraw the whole screen next frame.
+
+    """
+
+    def __init__(self, size):
+
+        self.recorder = DrawRecorder(size)
+        self.screen_rect = pygame.Rect((0, 0), size)
+        self.last = set()
+        self.full = True
+
+    def invalidate(self):
+        """ Redraw the whole screen on the next frame.
+
+        """
+
+        self.full = True
+
+    def render(self, screen, stars, draw, stars_moved):
+        """ Draw one frame and push the changed areas to the display.
+        Returns the list of rects that were updated.
+
+        Args:
+                screen (screen): The display surface.
+                stars (Starfield): Background stars.
+                draw (function): Draws the rest of the frame onto the surface
+                it is given (e.g. Game.display_frame.)
+                stars_moved (bool): Did the stars move since the last frame.
+
+        """
+
+        self.recorder.commands = []
+        draw(self.recorder)
+
+        commands = self.recorder.commands
+        current = set((image, tuple(rect)) for (image, rect) in commands)
+
+        if self.full:
+
+            dirty = [self.screen_rect.copy()]
+            self.full = False
+
+        else:
+
+            dirty = [pygame.Rect(rect) for (image, rect) in current.symmetric_difference(self.last)]
+
+            if stars_moved:
+
+                dirty.extend(stars.dirty_rects())
+
+        self.last = current
+
+        # Sprites off the top or left edge give rects that fill() would move
+        # onto the screen without shrinking, so keep only the visible part.
+        dirty = [rect.clip(self.screen_rect) for rect in dirty]
+        dirty = [rect for rect in dirty if rect.width and rect.height]
+
+        if not dirty:
+
+            return dirty
+
+        for rect in dirty:
+
+            screen.fill(BLACK, rect)
+
+        if stars_moved or dirty[0] == self.screen_rect:
+
+            stars.draw(screen)
+
+        else:
+
+            self.blit_clipped(screen, stars.image, stars.rects(), dirty)
+
+        for (image, rect) in commands:
+
+            for i in rect.collidelistall(dirty):
+
+                self.blit_part(screen, image, rect, dirty[i])
+
+        pygame.display.update(dirty)
+
+        return dirty
+
+    def blit_clipped(self, screen, image, rects, dirty):
+        """ Blit the image at every rect, but only inside the dirty areas.
+
+        """
+
+        for rect in rects:
+
+            for i in rect.collidelistall(dirty):
+
+                self.blit_part(screen, image, rect, dirty[i])
+
+    @staticmethod
+    def blit_part(screen, image, rect, clip):
+        """ Blit the part of an image (placed at rect) that falls inside clip.
+
+        """
+
+        part = rect.clip(clip)
+
+        if part.width and part.height:
+
+            screen.blit(image, part.topleft, part.move(-rect.x, -rect.y))
+
+
+class MenuCache(object):
+    """ Menu screens composited once into a single surface. Each menu is
+    drawn as one blit of its composite plus any widget that currently looks
+    different from its resting state (a hover highlight.) The composite is
+    rebuilt only when a widget's resting image or position changes (e.g. the
+    coin count.)
+
+    Attributes:
+            screens (dict): (signature, surface, topleft) keyed by menu name.
+
+    """
+
+    def __init__(self):
+
+        self.screens = {}
+
+    def compose(self, signature):
+        """ Build the composite for a menu. Returns (surface, topleft).
+
+        Args:
+                signature (tuple): (resting image, x, y) of every widget, in
+                draw order.
+
+        """
+
+        return composite([(image, pygame.Rect((x, y), image.get_size()))
+                          for (image, x, y) in signature])
+
+    def draw(self, screen, name, items):
+        """ Draw a menu.
+
+        Args:
+                screen (screen): Blit destination.
+                name (str): Which menu this is.
+                items (list): The menu's sprites in draw order. Each has a
+                base_image method giving its resting image.
+
+        """
+
+        if not items:
+
+            return
+
+        bases = [item.base_image() for item in items]
+        signature = tuple((base, item.rect.x, item.rect.y) for (base, item) in zip(bases, items))
+        entry = self.screens.get(name)
+
+        if entry is None or entry[0] != signature:
+
+            entry = (signature,) + self.compose(signature)
+            self.screens[name] = entry
+
+        screen.blit(entry[1], entry[2])
+
+        for (base, item) in zip(bases, items):
+
+            if item.image is not base:
+
+                screen.blit(item.image, [item.rect.x, item.rect.y])
+
+
+class Hud(object):
+    """ The in-game strip (score, ammo counter and lives) kept pre-rendered
+    in one surface. It is drawn again only when the values it shows change,
+    so on most frames the HUD costs a single blit.
+
+    Args:
+            size (tuple): Size of the screen.
+
+    Attributes:
+            recorder (DrawRecorder): What the HUD's items are drawn into when
+            it is rebuilt.
+            state (tuple): The values and widget positions the surface was
+            rendered for.
+            surface (surface): The pre-rendered HUD.
+            topleft (tuple): Where the surface goes on the screen.
+
+    """
+
+    def __init__(self, size):
+
+        self.recorder = DrawRecorder(size)
+        self.state = None
+        self.surface = None
+        self.topleft = (0, 0)
+
+    def invalidate(self):
+        """ Render the HUD again the next time it is drawn.
+
+        """
+
+        self.state = None
+        self.surface = None
+
+    def draw(self, screen, state, draw):
+        """ Blit the HUD, rendering it first if the values it shows changed.
+
+        Args:
+                screen (screen): Blit destination.
+                state (tuple): The values shown and where their widgets sit
+                (e.g. score, ammo, lives, ammo counter color and the widgets'
+                top left corners.)
+                draw (function): Draws the HUD's items onto the surface it is
+                given.
+
+        """
+
+        if self.surface is None or state != self.state:
+
+            self.recorder.commands = []
+            draw(self.recorder)
+
+            if not self.recorder.commands:
+
+                return
+
+            (self.surface, self.topleft) = composite(self.recorder.commands)
+            self.state = state
+
+        screen.blit(self.surface, self.topleft)
+
+
+class Interpolator(object):
+    """ Draws moving sprites part of the way between where they were at the
+    start of the last tick and where they are now, so motion looks smooth
+    when frames and ticks do not line up. Centers are interpolated (the
+    player's rect changes size as the ship turns, so its corner moves even
+    when the ship does not.) The rects are only moved for the draw and put
+    back right after, so the game never sees the in-between positions.
+
+    Args:
+            limit (int): Sprites that moved further than this in one tick
+            (respawned aliens, recycled bullets) are drawn where they are.
+
+    Attributes:
+            limit (int): Furthest a sprite is interpolated across.
+            previous (dict): Rect center of every sprite at the last
+            snapshot.
+
+    """
+
+    def __init__(self, limit=64):
+
+        self.limit = limit
+        self.previous = {}
+
+    def snapshot(self, groups):
+        """ Remember where every sprite is (call before each tick.)
+
+        Args:
+                groups (list): Sprite groups to remember.
+
+        """
+
+        self.previous = dict((sprite, sprite.rect.center) for group in groups
+                             for sprite in group)
+
+    def draw(self, screen, draw, alpha):
+        """ Draw a frame with the remembered sprites moved alpha of the way
+        from their snapshot to where they are now.
+
+        Args:
+                screen (screen): Blit destination.
+                draw (function): Draws the frame onto the surface it is given.
+                alpha (float): How far along (0 is the snapshot, 1 is now.)
+
+        """
+
+        moved = []
+
+        if alpha < 1:
+
+            for (sprite, (last_x, last_y)) in self.previous.items():
+
+                rect = sprite.rect
+                (x, y) = rect.center
+
+                if (x, y) != (last_x, last_y) and abs(x - last_x) <= self.limit and \
+                        abs(y - last_y) <= self.limit:
+
+                    moved.append((rect, x, y))
+                    rect.center = (last_x + int((x - last_x) * alpha),
+                                   last_y + int((y - last_y) * alpha))
+
+        draw(screen)
+
+        for (rect, x, y) in moved:
+
+            rect.center = (x, y)
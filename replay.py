@@ -0,0 +1,167 @@
+"""
+Space Fight
+Replays
+"""
+
+import json
+import os
+import sys
+import time
+
+from simulation import Inputs, Rules, World
+
+REPLAY_VERSION = 1
+
+
+class Recorder(object):
+    """ Records one game as its starting setup plus one small entry per tick
+    ([aim x, aim y, shots, move x, move y].) Since a World only depends on
+    its seed and its inputs, that is enough to play the game again.
+
+    Args:
+            world (World): The world, just after World.new_game.
+
+    Attributes:
+            header (dict): Seed, field size, rules and the player's setup.
+            ticks (list): The inputs of every tick so far.
+
+    """
+
+    def __init__(self, world):
+
+        self.header = {"version": REPLAY_VERSION,
+                       "seed": world.seed,
+                       "width": world.width,
+                       "height": world.height,
+                       "alien_count": len(world.aliens),
+                       "pool_size": len(world.bullet_pool.bullets),
+                       "cell_size": world.bullet_grid.cell_size,
+                       "player_image": world.player.image_string,
+                       "lives": world.player.lives,
+                       "ammo": world.player.ammo,
+                       "speed": world.player.speed,
+                       "ammo_type": world.ammo_type,
+                       "rules": vars(world.rules)}
+        self.ticks = []
+
+    def record(self, inputs):
+        """ Add one tick's inputs.
+
+        Args:
+                inputs (Inputs): What the player did this tick.
+
+        """
+
+        self.ticks.append([inputs.aim[0], inputs.aim[1], inputs.fire,
+                           inputs.move[0], inputs.move[1]])
+
+    def save(self, directory, score):
+        """ Write the replay to a new file in the given directory. Returns the
+        path of the file.
+
+        Args:
+                directory (str): Where replays are kept.
+                score (int): Score the game ended with (checked on replay.)
+
+        """
+
+        if not os.path.isdir(directory):
+
+            os.makedirs(directory)
+
+        path = os.path.join(directory, "%s-%d.json" % (time.strftime("%Y%m%d-%H%M%S"),
+                                                       self.header["seed"]))
+
+        with open(path, "w") as replay_file:
+
+            json.dump({"header": self.header, "ticks": self.ticks, "score": score},
+                      replay_file, separators=(",", ":"))
+
+        return path
+
+
+def load(path):
+    """ Read a replay file. Returns (header, ticks, score).
+
+    Args:
+            path (str): The replay file.
+
+    """
+
+    with open(path) as replay_file:
+
+        data = json.load(replay_file)
+
+    if data["header"]["version"] != REPLAY_VERSION:
+
+        raise ValueError("%s is a version %s replay, expected %d" % (
+            path, data["header"]["version"], REPLAY_VERSION))
+
+    return (data["header"], data["ticks"], data["score"])
+
+
+def make_world(header, use_engine=True):
+    """ Build a world set up like the one a replay was recorded in, with its
+    game started.
+
+    Args:
+            header (dict): The replay's header.
+            use_engine (bool): Step the aliens with the NumPy alien engine.
+
+    """
+
+    world = World(header["width"], header["height"], header["seed"], header["player_image"],
+                  header["alien_count"], header["pool_size"], header["cell_size"], use_engine,
+                  Rules(**header.get("rules", {})))
+    world.ammo_type = header["ammo_type"]
+    world.player.lives = header["lives"]
+    world.player.ammo = header["ammo"]
+    world.player.speed = header["speed"]
+    world.new_game(header["seed"])
+
+    return world
+
+
+def replay(path, use_engine=True):
+    """ Play a recorded game again with no display, as fast as it will go.
+    Returns a dict with the score it got, the score it was recorded with,
+    whether they match, the number of ticks and the time taken.
+
+    Args:
+            path (str): The replay file.
+            use_engine (bool): Step the aliens with the NumPy alien engine.
+
+    """
+
+    (header, ticks, expected) = load(path)
+    world = make_world(header, use_engine)
+
+    start = time.perf_counter()
+
+    for (aim_x, aim_y, fire, move_x, move_y) in ticks:
+
+        world.step(Inputs((move_x, move_y), (aim_x, aim_y), fire))
+
+    seconds = time.perf_counter() - start
+
+    return {"score": world.score,
+            "expected": expected,
+            "match": world.score == expected,
+            "ticks": len(ticks),
+            "seconds": seconds}
+
+
+if __name__ == "__main__":
+
+    failed = False
+
+    for path in sys.argv[1:]:
+
+        result = replay(path)
+        failed = failed or not result["match"]
+
+        print("%s: score %d (recorded %d) %s, %d ticks in %.2f s (%.0f ticks/s)" % (
+            path, result["score"], result["expected"], "ok" if result["match"] else "MISMATCH",
+            result["ticks"], result["seconds"], result["ticks"] / max(result["seconds"], 1e-9)))
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,450 @@
+"""
+Space Fight
+Scenario Benchmarks
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+HIGHSCORE_FILES = ["highscore_names.txt", "highscore_numbers.txt"]
+
+
+class StepClock(object):
+    """ Stands in for pygame.time.Clock in automated runs. It never waits,
+    always reports exactly one game tick since the last frame (so a scenario
+    plays the same way on any machine) and records how long every frame
+    really took.
+
+    Args:
+            tick_ms (float): Length of a game tick in milliseconds.
+
+    Attributes:
+            tick_ms (float): Length of a game tick in milliseconds.
+            last (float): When the last frame started.
+            frames (list): Seconds every recorded frame took.
+
+    """
+
+    def __init__(self, tick_ms):
+
+        self.tick_ms = tick_ms
+        self.last = None
+        self.frames = []
+
+    def reset(self):
+        """ Forget the frames so far and start timing from now.
+
+        """
+
+        self.frames = []
+        self.last = time.perf_counter()
+
+    def tick(self, framerate=0):
+
+        now = time.perf_counter()
+
+        if self.last is not None:
+
+            self.frames.append(now - self.last)
+
+        self.last = now
+
+        return self.tick_ms
+
+    def get_fps(self):
+
+        if not self.frames:
+
+            return 0.0
+
+        return len(self.frames) / sum(self.frames)
+
+
+class Driver(object):
+    """ Synthetic mouse and keyboard. Scenarios move the mouse and click on
+    the game's own widgets; events are posted to the pygame queue and the
+    mouse position is what pygame.mouse.get_pos returns while the scenario
+    runs (the dummy video driver has no mouse of its own.)
+
+    Attributes:
+            position (tuple): Where the mouse is.
+
+    """
+
+    def __init__(self):
+
+        self.position = (0, 0)
+
+    def get_pos(self):
+
+        return self.position
+
+    def move(self, target):
+        """ Move the mouse to a point or to the middle of a sprite.
+
+        """
+
+        if hasattr(target, "rect"):
+
+            target = target.rect.center
+
+        self.position = (int(target[0]), int(target[1]))
+        pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=self.position, rel=(0, 0),
+                                             buttons=(0, 0, 0)))
+
+    def click(self, target=None):
+        """ Left click, on a point or sprite if one is given.
+
+        """
+
+        if target is not None:
+
+            self.move(target)
+
+        pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=self.position, button=1))
+        pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=self.position, button=1))
+
+    def press(self, key):
+        """ Press and release a key.
+
+        """
+
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode=""))
+        pygame.event.post(pygame.event.Event(pygame.KEYUP, key=key, mod=0, unicode=""))
+
+
+def wait(frames):
+    """ Let frames go by (use as "yield from wait(n)".)
+
+    """
+
+    for i in range(frames):
+
+        yield
+
+
+def click_through(driver, sprites, gap=10):
+    """ Click each sprite in turn, leaving gap frames after each click.
+
+    """
+
+    for sprite in sprites:
+
+        driver.click(sprite)
+        yield from wait(gap)
+
+
+def fight(game, driver, frames, fire_every=2, immortal=True):
+    """ Shoot at the closest alien on the screen for a number of frames.
+
+    Args:
+            game (Game): The game.
+            driver (Driver): Mouse and keyboard.
+            frames (int): Frames to play.
+            fire_every (int): Frames between shots.
+            immortal (bool): Keep the player's lives and ammo topped up.
+
+    """
+
+    field = pygame.Rect((0, 0), pygame.display.get_surface().get_size())
+
+    for frame in range(frames):
+
+        if immortal:
+
+            game.player.lives = max(game.player.lives, 3)
+            game.player.ammo = max(game.player.ammo, 100)
+
+        if frame % fire_every == 0:
+
+            center = game.player.rect.center
+            targets = [alien.rect.center for alien in game.aliens
+                       if field.colliderect(alien.rect)]
+
+            if targets:
+
+                driver.click(min(targets, key=lambda point: (point[0] - center[0]) ** 2 +
+                                 (point[1] - center[1]) ** 2))
+
+        yield
+
+
+def menus(game, driver):
+    """ Go through the settings screens, change the ship, bullet and
+    cursor, look at the highscores, then start a game.
+
+    """
+
+    yield from click_through(driver, [game.settings_word, game.change_player_word])
+    yield from click_through(driver, [game.blue_player_pic, game.back_word,
+                                      game.change_bullet_word])
+    yield from click_through(driver, [game.red_ammo_pic, game.back_word,
+                                      game.change_cursor_word])
+    yield from click_through(driver, [game.big_red_cursor_pic, game.back_word,
+                                      game.upgrades_word])
+    yield from click_through(driver, [game.back_word, game.back_word, game.highscore_word])
+    yield from click_through(driver, [game.back_word, game.start_word])
+    yield from fight(game, driver, 120)
+
+
+def rapid_fire(game, driver):
+    """ Start a game and shoot as fast as possible for 60 seconds.
+
+    """
+
+    yield from click_through(driver, [game.start_word])
+    yield from fight(game, driver, 60 * 60, fire_every=1)
+
+
+def freeze(game, driver):
+    """ Start a game, shoot down an alien carrying a freeze, move the ship
+    onto the drop to pick it up and keep shooting until the freeze ends.
+
+    """
+
+    yield from click_through(driver, [game.start_word])
+    yield from fight(game, driver, 60)
+
+    # Make every alien a freeze carrier, so the next one shot drops a freeze.
+    for alien in game.aliens:
+
+        alien.freeze_drop = game.world.rules.lucky_roll
+        alien.heartdrop = 0
+        alien.ammo_drop = 0
+        alien.coin_drop = 0
+
+    for frame in range(60 * 60):
+
+        if game.world.freeze_pickup:
+
+            break
+
+        drops = [alien for alien in game.aliens if alien.freeze_dropped]
+
+        if drops:
+
+            game.player.rect.center = drops[0].rect.center
+
+        yield from fight(game, driver, 1)
+
+    else:
+
+        raise RuntimeError("no freeze was picked up in a minute of play")
+
+    # A freeze that is picked up lasts three times freeze_ticks.
+    yield from fight(game, driver, 3 * game.world.rules.freeze_ticks + 60, fire_every=4)
+
+
+def die_and_restart(game, driver):
+    """ Start a game, die with a new highscore, enter a name, then start
+    again.
+
+    """
+
+    yield from click_through(driver, [game.start_word])
+    yield from fight(game, driver, 120)
+
+    game.score = 1000000
+    game.player.lives = 1
+
+    for frame in range(60 * 60):
+
+        if not game.game:
+
+            break
+
+        yield
+
+    yield from wait(10)
+
+    if game.new_highscore_screen:
+
+        keys = dict((key.text, key) for key in game.keyboard)
+
+        yield from click_through(driver, [game.continue_word, keys["C"], keys["P"], keys["U"],
+                                          game.done_word, game.back_word, game.start_word])
+
+    elif game.game_over:
+
+        yield from click_through(driver, [game.restart_word])
+
+    yield from fight(game, driver, 120)
+
+
+SCENARIOS = {"menus": menus,
+             "rapid_fire": rapid_fire,
+             "freeze": freeze,
+             "die_and_restart": die_and_restart}
+
+
+def play(on_frame, clock, driver):
+    """ Run the game with no window, driven by on_frame, with the driver's
+    mouse standing in for the real one. The highscore files are put back as
+    they were afterwards.
+
+    Args:
+            on_frame (function): Called with the game after every frame;
+            the game stops when it returns True.
+            clock (StepClock): The game's clock.
+            driver (Driver): Mouse and keyboard.
+
+    """
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    import SpaceFight_main
+
+    saved = {}
+
+    for path in HIGHSCORE_FILES:
+
+        with open(path) as highscore_file:
+
+            saved[path] = highscore_file.read()
+
+    get_pos = pygame.mouse.get_pos
+    pygame.mouse.get_pos = driver.get_pos
+
+    try:
+
+        SpaceFight_main.main(on_frame, clock)
+
+    finally:
+
+        pygame.mouse.get_pos = get_pos
+
+        for (path, contents) in saved.items():
+
+            with open(path, "w") as highscore_file:
+
+                highscore_file.write(contents)
+
+
+def run_scenario(name, trace=False):
+    """ Play one scenario with no window and return its report: frames,
+    frames per second, mean and worst frame time, allocated blocks and
+    garbage collections during the run (and traced memory with trace.)
+
+    Args:
+            name (str): Key of the scenario in SCENARIOS.
+            trace (bool): Also trace allocations with tracemalloc (slower.)
+
+    """
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    import SpaceFight_main
+
+    driver = Driver()
+    clock = StepClock(1000.0 / SpaceFight_main.TICK_RATE)
+    state = {}
+
+    def on_frame(game):
+
+        if "script" not in state:
+
+            state["script"] = SCENARIOS[name](game, driver)
+            state["collections"] = [generation["collections"] for generation in gc.get_stats()]
+            state["blocks"] = sys.getallocatedblocks()
+            state["start"] = time.perf_counter()
+
+            if trace:
+
+                tracemalloc.start()
+
+            clock.reset()
+
+        try:
+
+            next(state["script"])
+
+        except StopIteration:
+
+            state["end"] = time.perf_counter()
+
+            return True
+
+        return False
+
+    play(on_frame, clock, driver)
+
+    frames = clock.frames
+    report = {"scenario": name,
+              "frames": len(frames),
+              "fps": len(frames) / (state["end"] - state["start"]),
+              "mean_ms": sum(frames) / len(frames) * 1000,
+              "worst_ms": max(frames) * 1000,
+              "worst_frame": frames.index(max(frames)),
+              "blocks": sys.getallocatedblocks() - state["blocks"],
+              "collections": [generation["collections"] - before for (generation, before) in
+                              zip(gc.get_stats(), state["collections"])]}
+
+    if trace:
+
+        (current, peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report["traced_kb"] = current / 1024
+        report["traced_peak_kb"] = peak / 1024
+
+    return report
+
+
+def run(names, trace=False):
+    """ Run scenarios, each in a fresh process (so no scenario starts with
+    caches warmed up by another.) Returns their reports.
+
+    Args:
+            names (list): Scenario names.
+            trace (bool): Also trace allocations with tracemalloc.
+
+    """
+
+    reports = []
+    context = multiprocessing.get_context("spawn")
+
+    for name in names:
+
+        with context.Pool(1) as pool:
+
+            report = pool.apply(run_scenario, (name, trace))
+
+        reports.append(report)
+
+        print("%-16s %6d frames %8.1f fps  mean %6.2f ms  worst %7.2f ms (frame %d)  "
+              "blocks %+7d  gc %s%s" % (
+                  name, report["frames"], report["fps"], report["mean_ms"], report["worst_ms"],
+                  report["worst_frame"], report["blocks"], report["collections"],
+                  "  traced %.0f kB (peak %.0f kB)" % (report["traced_kb"],
+                                                       report["traced_peak_kb"])
+                  if trace else ""))
+
+    return reports
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Play scripted sessions of Space Fight with "
+                                                 "no window and report how smoothly they ran.")
+    parser.add_argument("scenarios", nargs="*", default=sorted(SCENARIOS),
+                        help="scenarios to run (default: all of %s)" % ", ".join(sorted(SCENARIOS)))
+    parser.add_argument("--trace", action="store_true", help="count allocations with tracemalloc")
+    parser.add_argument("--save", help="write the reports to this JSON file")
+    options = parser.parse_args()
+
+    reports = run(options.scenarios, options.trace)
+
+    if options.save:
+
+        with open(options.save, "w") as reports_file:
+
+            json.dump(reports, reports_file, indent=1)
@@ -0,0 +1,1098 @@
+"""
+Space Fight
+Simulation
+"""
+
+import math
+import random
+import time
+
+import pygame
+
+from alien_engine import AlienEngine, HAVE_NUMPY
+from assets import angle_step, image_size, load_image, load_rotations, rotated_size
+from profiler import NULL_PROFILER
+from spatial_hash import SpatialHash
+
+ROTATION_RESOLUTION = 2
+ROTATION_CACHE_SIZE = 180
+
+EXPLOSION_IMAGES = ["e1.png", "e2.png", "e3.png", "e4.png", "e5.png"]
+
+
+class Rules(object):
+    """ The numbers that decide how hard the game is. Every world has its own
+    copy, so they can be changed per world (e.g. for balance sweeps.)
+
+    Args:
+            overrides: Any of the attributes below, by keyword.
+
+    Attributes:
+            alien_speed (float): Pixels per tick an alien moves before any ramp.
+            speed_ramp (float): Factor an alien's speed goes up by every time
+            it respawns or drops something.
+            drop_lifetime (int): Ticks a drop stays on the field.
+            lucky_roll (int): Roll that makes an alien carry a drop.
+            heart_roll (tuple): randrange arguments for the heart roll.
+            first_ammo_roll (tuple): randrange arguments for the ammo roll of
+            a newly spawned alien.
+            ammo_roll (tuple): randrange arguments for the ammo roll of a
+            respawned alien.
+            freeze_roll (tuple): randrange arguments for the freeze roll.
+            coin_roll (tuple): randrange arguments for the coin roll.
+            level3_every (int): An alien respawns with three lives when the
+            score is a multiple of this.
+            level2_every (int): An alien respawns with two lives when the
+            score is a multiple of this.
+            ammo_pickup (int): Bullets an ammo drop gives.
+            freeze_ticks (int): Ticks a freeze lasts.
+
+    """
+
+    def __init__(self, **overrides):
+
+        self.alien_speed = 2
+        self.speed_ramp = 1.05
+        self.drop_lifetime = 360
+        self.lucky_roll = 15
+        self.heart_roll = (0, 40)
+        self.first_ammo_roll = (5, 16)
+        self.ammo_roll = (0, 20)
+        self.freeze_roll = (0, 30)
+        self.coin_roll = (10, 20)
+        self.level3_every = 10
+        self.level2_every = 3
+        self.ammo_pickup = 25
+        self.freeze_ticks = 200
+
+        for (name, value) in overrides.items():
+
+            if not hasattr(self, name):
+
+                raise ValueError("unknown rule %r" % name)
+
+            if isinstance(getattr(self, name), tuple):
+
+                value = tuple(value)
+
+            setattr(self, name, value)
+
+
+class Inputs(object):
+    """ What the player does during one tick, as plain data.
+
+    Args:
+            move (tuple): (x, y) direction the ship is being pushed in. Each is
+            the sum of the keys held on that axis (-1, 0 or 1 normally.)
+            aim (tuple): Where the cursor is.
+            fire (int): Number of shots fired this tick.
+
+    Attributes:
+            move (tuple): (x, y) direction the ship is being pushed in.
+            aim (tuple): Where the cursor is.
+            fire (int): Number of shots fired this tick.
+
+    """
+
+    def __init__(self, move=(0, 0), aim=(0, 0), fire=0):
+
+        self.move = tuple(move)
+        self.aim = tuple(aim)
+        self.fire = fire
+
+
+class Player(pygame.sprite.Sprite):
+
+    """ The player-controlled main character of the game.
+
+    Args:
+            world (World): The world the player is in.
+            image_string (str): Human readable name of the picture used to make
+                    the player sprite.
+
+    Attributes:
+            world (World): The world the player is in.
+            image_string (str): Picture of the ship.
+            angle (float): Rotation of the ship in degrees (snapped to
+                    ROTATION_RESOLUTION), or None before the first update.
+            rect (rect): Rect attributes for the player sprite. Sized like
+                    the rotated image, without making the image.
+            velx (int): The player's x axis velocity.
+            vely (int): The player's y axis velocity.
+            lives (int): Number of lives the player begins with.
+            ammo (int): Number of bullets the player begins with.
+            speed (int): Velocity the player moves at.
+
+    """
+
+    def __init__(self, world, image_string):
+
+        super(Player, self).__init__()
+
+        self.world = world
+        self.image_string = image_string
+        self.center()
+        self.velx = 0
+        self.vely = 0
+        self.lives = 0
+        self.ammo = 100
+        self.speed = 5
+
+    def center(self):
+        """ Put the ship, unrotated, in the middle of the field.
+
+        """
+
+        self.angle = None
+        self.rect = pygame.Rect((0, 0), image_size(self.image_string))
+        self.rect.x = (self.world.width / 2) - (self.rect.width / 2)
+        self.rect.y = (self.world.height / 2) - (self.rect.height / 2)
+
+    @property
+    def image(self):
+        """ The ship's picture at its current rotation (only made when the
+        ship is drawn.)
+
+        """
+
+        if self.angle is None:
+
+            return load_image(self.image_string)
+
+        return load_rotations(self.image_string, ROTATION_RESOLUTION,
+                              ROTATION_CACHE_SIZE).get(self.angle)
+
+    def update(self, aim):
+        """ Check if the player is going off the screen. If they are,
+        set the proper rect attribute to the corresponding side.
+        Add the velx and vely to the rect.x and rect.y attributes,
+        respectively. Rotate the player towards the aim point.
+
+        Args:
+                aim (tuple): Where the cursor is.
+
+        """
+
+        if self.rect.x + self.rect.width >= self.world.width:
+
+            self.rect.right = self.world.width
+
+        if self.rect.x <= 0:
+
+            self.rect.left = 0
+
+        if self.rect.y <= 0:
+
+            self.rect.top = 0
+
+        if self.rect.y + self.rect.height >= self.world.height:
+
+            self.rect.bottom = self.world.height
+
+        self.rect.x += self.velx
+        self.rect.y += self.vely
+
+        (mouse_x, mouse_y) = aim
+        angle = 360 - (math.degrees(math.atan2(self.rect.center[1] - mouse_y,
+                                               self.rect.center[0] - mouse_x)) + 180)
+
+        self.angle = angle_step(angle, ROTATION_RESOLUTION) * ROTATION_RESOLUTION
+        center = self.rect.center
+        self.rect = pygame.Rect((0, 0), rotated_size(image_size(self.image_string), self.angle))
+        self.rect.center = center
+
+
+class Alien(pygame.sprite.Sprite):
+
+    """ Aliens that follow the player and explode.
+
+    Args:
+            world (World): The world the alien is in.
+
+    Attributes:
+            world (World): The world the alien is in.
+            image_string (str): Picture of the alien (corresponds to lives.)
+            image_convert (bool): Convert the picture to the display format
+            when it is drawn.
+
+            rect (pygame sprite rect): Rect attributes for sprite image.
+            velx (int): Aliens x axis velocity.
+            vely (int): Aliens y axis velocity.
+            frame (int): Counter for number of frames in explosion.
+            exp_num (int): Counter for the explosion image list.
+
+            heartdrop (int): Random value for heart carrier.
+            ammo_drop (int): Random value for ammo carrier.
+            freeze_drop (int): Random value for freeze carrier.
+
+            heart_dropped (bool): Has a heart carrier been killed.
+            ammo_dropped (bool): Has an ammo carrir been killed.
+            freeze_dropped (bool): Has a freeze carrier been killed.
+            full_freeze (bool): Is there an active freeze.
+            exploding (bool): Is the alien in the exploding loop.
+
+            dropped_frames (int): Number of frames the alien has been dead for.
+            lives (int): NUmber of lives the alien has (corresponds to image.)
+            speed_multiplier (int): Multiplys to velx and vely to increase speed of approach.
+
+    """
+
+    def __init__(self, world):
+
+        super(Alien, self).__init__()
+
+        self.world = world
+        self.image_string = "Alien.png"
+        self.image_convert = True
+        self.rect = pygame.Rect((0, 0), image_size(self.image_string))
+
+        self.reset()
+
+    @property
+    def image(self):
+        """ The alien's current picture (only made when the alien is drawn.)
+
+        """
+
+        return load_image(self.image_string, self.image_convert)
+
+    def show(self, image_string, convert=True):
+        """ Change the alien's picture.
+
+        Args:
+                image_string (str): The picture.
+                convert (bool): Convert it to the display format when drawn.
+
+        """
+
+        self.image_string = image_string
+        self.image_convert = convert
+
+    def reset(self):
+        """ Put the alien back in its spawn state: a random position off
+        the screen, one life, no drops and no speed increase.
+
+        """
+
+        rng = self.world.random
+
+        self.show("Alien.png")
+
+        lr = rng.randrange(0, 2)
+        tb = rng.randrange(0, 2)
+
+        if lr == 0:
+
+            self.rect.x = rng.randrange(-2100, -100)
+
+        elif lr == 1:
+
+            self.rect.x = rng.randrange(self.world.width + 100, self.world.width + 2100)
+
+        if tb == 0:
+
+            self.rect.y = rng.randrange(-2100, -100)
+
+        elif tb == 1:
+
+            self.rect.y = rng.randrange(self.world.height + 100, self.world.height + 2100)
+
+        self.velx = 0
+        self.vely = 0
+        self.frame = 0
+        self.exp_num = 0
+
+        rules = self.world.rules
+
+        self.heartdrop = rng.randrange(*rules.heart_roll)
+        self.ammo_drop = rng.randrange(*rules.first_ammo_roll)
+        self.freeze_drop = rng.randrange(*rules.freeze_roll)
+        self.coin_drop = rng.randrange(*rules.coin_roll)
+
+        self.heart_dropped = False
+        self.ammo_dropped = False
+        self.freeze_dropped = False
+        self.coin_dropped = False
+        self.full_freeze = False
+        self.exploding = False
+
+        self.dropped_frames = 0
+        self.lives = 1
+        self.speed_multiplier = 1
+
+    def update(self):
+        """ Stop motion if the alien has been shot. Set the other attributes
+        as False to prevent dual-drop. Drop priorities: Ammo, heart, then
+        freeze. Change the image to the corresponding drop image. Add one
+        to dropped_frames. If the dropped_frames reaches the drop time
+        threshold, reset it's attributes and tag it for explosion in the next
+        update. Run collision detection with player to test of the player
+        picks up the drop. If so, tag the alien for respawn and execute the
+        respective drop effects (give ammo, freeze aliens, or give life.)
+        If the alien is still alive, set the image to the corresponding life
+        number. If there is an active freeze, stop movement. If there is not
+        an active freeze, calculate the triange of trajectory towards the
+        player and move along the hypotenuse of that triangle. Check for
+        collision with player and bullet. If player collision, subtract from
+        the players lives the corresponding aliens number of lives. If
+        bullet collision, subtract one life from the alien. Revoke any lucky
+        carrier attributes from the alien if there is a player collision. If
+        the alien is exploding. Send it to the explode method.
+
+        """
+
+        world = self.world
+
+        if self.ammo_dropped == True or self.heart_dropped == True or \
+                self.freeze_dropped == True or self.coin_dropped == True:
+
+            self.velx = 0
+            self.vely = 0
+
+            if self.ammo_dropped == True:
+
+                self.freeze_dropped = False
+                self.heart_dropped = False
+                self.coin_dropped = False
+                self.freeze_drop = 0
+                self.heartdrop = 0
+                self.coin_drop = 0
+
+            elif self.heart_dropped == True:
+
+                self.freeze_dropped = False
+                self.ammo_dropped = False
+                self.coin_dropped = False
+                self.freeze_drop = 0
+                self.ammo_drop = 0
+                self.coin_drop = 0
+
+            elif self.freeze_dropped == True:
+
+                self.heart_dropped = False
+                self.ammo_dropped = False
+                self.coin_dropped = False
+                self.ammo_drop = 0
+                self.heartdrop = 0
+                self.coin_drop = 0
+
+            elif self.coin_dropped == True:
+
+                self.heart_dropped = False
+                self.ammo_dropped = False
+                self.freeze_dropped = False
+                self.ammo_drop = 0
+                self.heartdrop = 0
+                self.freeze_drop = 0
+
+            if self.ammo_dropped == True:
+
+                self.show("ammo_drop.png")
+
+            elif self.heart_dropped == True:
+
+                self.show("heart.png")
+
+            elif self.freeze_dropped == True:
+
+                self.show("freeze_powerup.png")
+
+            elif self.coin_dropped == True:
+
+                self.show("Coin.png", convert=False)
+
+            self.dropped_frames += 1
+
+            if self.dropped_frames == world.rules.drop_lifetime:
+
+                self.exploding = True
+                self.freeze_drop = 0
+                self.heartdrop = 0
+                self.ammo_drop = 0
+                self.coin_drop = 0
+                self.exp_num = 0
+                self.frame = 0
+
+            player_collect = pygame.sprite.spritecollide(self, world.players, False)
+
+            for pickup in player_collect:
+
+                if self.ammo_dropped == True:
+
+                    world.player.ammo += world.rules.ammo_pickup
+                    world.pickups["ammo"] += 1
+                    self.ammo_drop = 0
+
+                if self.heart_dropped == True:
+
+                    world.player.lives += 1
+                    world.pickups["heart"] += 1
+                    self.heartdrop = 0
+
+                if self.freeze_dropped == True:
+
+                    world.freeze_pickup = True
+                    world.pickups["freeze"] += 1
+                    self.freeze_drop = 0
+                    world.freeze_hit = True
+
+                if self.coin_dropped == True:
+
+                    world.coins += 1
+                    world.pickups["coin"] += 1
+                    self.coin_drop = 0
+
+                self.respawn()
+
+        elif self.ammo_dropped == False and self.freeze_dropped == False and \
+                self.exploding == False and self.heart_dropped == False and \
+                self.coin_dropped == False:
+
+            self.show_lives()
+
+            if self.full_freeze == True:
+
+                self.velx = 0
+                self.vely = 0
+
+            elif not self.full_freeze:
+
+                speed = world.rules.alien_speed * self.speed_multiplier
+
+                x_diff = world.player.rect.center[0] - self.rect.center[0]
+                y_diff = world.player.rect.center[1] - self.rect.center[1]
+                angle = math.atan2(y_diff, x_diff)
+
+                self.velx = math.cos(angle) * speed
+                self.vely = math.sin(angle) * speed
+
+                self.rect.x += self.velx
+                self.rect.y += self.vely
+
+            with world.profiler.phase("collisions"):
+
+                bullet_alien_collision = world.bullet_grid.spritecollide(self, world.bullets,
+                                                                         True)
+                player_alien_collision = pygame.sprite.spritecollide(self, world.players, False)
+
+            self.collide(bullet_alien_collision, player_alien_collision)
+
+        if self.exploding == True:
+
+            self.explode()
+
+    def show_lives(self):
+        """ Set the image to the one for the alien's number of lives.
+
+        """
+
+        if self.lives == 3:
+
+            self.show("alien_level3.png")
+
+        elif self.lives == 2:
+
+            self.show("alien_level2.png")
+
+        elif self.lives == 1:
+
+            self.show("Alien.png")
+
+    def collide(self, bullet_alien_collision, player_alien_collision):
+        """ Apply this frame's hits. Every bullet takes one life and the
+        last life scores a point. Touching the player costs the player the
+        alien's lives and blows the alien up without any drop.
+
+        Args:
+                bullet_alien_collision (list): Bullets that hit the alien.
+                player_alien_collision (list): Players that hit the alien.
+
+        """
+
+        for alien in bullet_alien_collision:
+
+            self.lives -= 1
+
+            if self.lives <= 0:
+
+                self.world.score += 1
+                self.world.events.append("explosion")
+                self.exploding = True
+
+        for alien in player_alien_collision:
+
+            self.world.events.append("explosion")
+
+            self.heartdrop = 0
+            self.ammo_drop = 0
+            self.freeze_drop = 0
+            self.coin_drop = 0
+
+            self.world.player.lives -= self.lives
+
+            self.exploding = True
+
+    def respawn(self):
+        """ The first four if statements don't respawn the alien. They
+        check the alien for the lucky number and set the corresponding
+        drop attribute to True if they match. If there is no active drop
+        attributes, increase the speed multiplier and calculate a new,
+        random a and y position. Set the image to the corresponding life
+        number. Reset all the attributes.
+
+        """
+
+        rules = self.world.rules
+        lucky = rules.lucky_roll
+
+        if self.heartdrop == lucky:
+
+            self.heart_dropped = True
+            self.speed_multiplier *= rules.speed_ramp
+
+        if self.ammo_drop == lucky:
+
+            self.speed_multiplier *= rules.speed_ramp
+            self.ammo_dropped = True
+
+        if self.freeze_drop == lucky:
+
+            self.speed_multiplier *= rules.speed_ramp
+            self.freeze_dropped = True
+
+        if self.coin_drop == lucky:
+
+            self.speed_multiplier *= rules.speed_ramp
+            self.coin_dropped = True
+
+        if self.heartdrop != lucky and self.ammo_drop != lucky and \
+                self.freeze_drop != lucky and self.coin_drop != lucky:
+
+            rng = self.world.random
+            lr = rng.randrange(0, 2)
+            tb = rng.randrange(0, 2)
+
+            self.speed_multiplier *= rules.speed_ramp
+
+            if lr == 0:
+
+                self.rect.x = rng.randrange(-2600, -100)
+
+            elif lr == 1:
+
+                self.rect.x = rng.randrange(self.world.width + 100, self.world.width + 2600)
+
+            if tb == 0:
+
+                self.rect.y = rng.randrange(-2600, -100)
+
+            elif tb == 1:
+
+                self.rect.y = rng.randrange(self.world.height + 100, self.world.height + 2600)
+
+            if self.world.score % rules.level3_every == 0:
+
+                self.show("alien_level3.png")
+                self.lives = 3
+
+            elif self.world.score % rules.level2_every == 0 and self.lives != 3:
+
+                self.show("alien_level2.png")
+                self.lives = 2
+
+            else:
+
+                self.show("Alien.png")
+                self.lives = 1
+
+            self.freeze_dropped = False
+            self.dropped_frames = 0
+            self.heart_dropped = False
+            self.ammo_dropped = False
+            self.coin_dropped = False
+            self.freeze_drop = rng.randrange(*rules.freeze_roll)
+            self.heartdrop = rng.randrange(*rules.heart_roll)
+            self.ammo_drop = rng.randrange(*rules.ammo_roll)
+            self.coin_drop = rng.randrange(*rules.coin_roll)
+            self.exploding = False
+            self.exp_num = 0
+            self.frame = 0
+
+    def explode(self):
+        """ Stop movement. If the frame attribute reaches the explosion
+        frame threshold, revoke the exploding attribute and tag it for
+        respawn in the next update. If the frame attribute reaches the
+        individual explosion frame threshold, move to the next frame.
+        Always add one to frame attribute and set image to the corresponding
+        explosion image for that frame number.
+
+        """
+
+        self.velx = 0
+        self.vely = 0
+
+        if self.frame == 25:
+
+            self.exploding = False
+            self.respawn()
+
+        elif self.frame % 5 == 0:
+
+            self.exp_num += 1
+
+            if self.exp_num == 5:
+
+                self.exp_num = 4
+
+        if self.exploding == True:
+
+            self.frame += 1
+            self.show(EXPLOSION_IMAGES[self.exp_num])
+
+
+class Bullet(pygame.sprite.Sprite):
+
+    """ Bullets that spawn from the player position and move towards the cursor.
+
+    Args:
+            world (World): The world the bullet is in.
+            image_string (str): Picture of the bullet (can change color).
+
+    Attributes:
+            world (World): The world the bullet is in.
+            image_string (str): Picture of the bullet.
+            rect (pygame sprite rect): Rect attributes for sprite image.
+            velx (int): Aliens x axis velocity.
+            vely (int): Aliens y axis velocity.
+
+    """
+
+    def __init__(self, world, image_string):
+
+        super(Bullet, self).__init__()
+
+        self.world = world
+        self.image_string = image_string
+        self.rect = pygame.Rect((0, 0), image_size(image_string))
+
+        self.velx = 0
+        self.vely = 0
+
+    @property
+    def image(self):
+        """ The bullet's picture (only made when the bullet is drawn.)
+
+        """
+
+        return load_image(self.image_string)
+
+    def update(self):
+        """ Add the velx and vely attributes to the rect.x and rect.y
+        positions, respectively. If the bullet goes off the screen, kill it.
+
+        """
+
+        self.rect.y += self.vely
+        self.rect.x += self.velx
+
+        if self.rect.x + self.rect.width < 0 or self.rect.y + self.rect.height < 0:
+
+            self.kill()
+
+        elif self.rect.y > self.world.height or self.rect.x > self.world.width:
+
+            self.kill()
+
+    def reset(self, image_string):
+        """ Get a pooled bullet ready to be fired again.
+
+        Args:
+                image_string (str): Picture of the bullet (can change color).
+
+        """
+
+        self.image_string = image_string
+        self.rect.size = image_size(image_string)
+        self.velx = 0
+        self.vely = 0
+
+
+class BulletPool(object):
+    """ Fixed set of bullets that are reused instead of made for every shot.
+    Bullets are handed out in firing order, so the next bullet in the ring
+    is either dead or the oldest one still flying (which gets recycled.)
+
+    Args:
+            world (World): The world the bullets are in.
+            capacity (int): Number of bullets to preallocate.
+            image_string (str): Picture the bullets start with.
+
+    Attributes:
+            bullets (list): Every bullet in the pool.
+            next (int): Index of the next bullet to hand out.
+
+    """
+
+    def __init__(self, world, capacity, image_string):
+
+        self.bullets = [Bullet(world, image_string) for i in range(capacity)]
+        self.next = 0
+
+    def acquire(self, image_string):
+        """ Return the next bullet, taken out of any groups and reset.
+
+        Args:
+                image_string (str): Picture of the bullet (can change color).
+
+        """
+
+        bullet = self.bullets[self.next]
+        self.next = (self.next + 1) % len(self.bullets)
+
+        if bullet.alive():
+
+            bullet.kill()
+
+        bullet.reset(image_string)
+
+        return bullet
+
+    def reset(self):
+        """ Take every bullet out of play.
+
+        """
+
+        for bullet in self.bullets:
+
+            bullet.kill()
+
+        self.next = 0
+
+
+class World(object):
+    """ The rules of one game of Space Fight, with no display. Everything is
+    a rect, input comes in as Inputs and the things that should be heard
+    come out as events, so the game can be stepped as fast as the rules
+    allow (no window, no surfaces unless something is drawn.)
+
+    Args:
+            width (int): Width of the playing field.
+            height (int): Height of the playing field.
+            seed (int): Seed for the world's random numbers (None for a
+            random seed.)
+            player_image (str): Picture of the player's ship.
+            alien_count (int): Number of aliens.
+            pool_size (int): Number of pooled bullets.
+            cell_size (int): Cell size of the bullet grid.
+            use_engine (bool): Step the aliens with the NumPy alien engine
+            (when NumPy is installed.)
+            rules (Rules): Difficulty numbers (the defaults if None.)
+            profiler (FrameProfiler): Times the parts of a tick (nothing if
+            None.)
+
+    Attributes:
+            width (int): Width of the playing field.
+            height (int): Height of the playing field.
+            seed (int): Seed the current game was started with.
+            random (Random): The world's own random numbers (spawn positions
+            and drop rolls), so a game only depends on its seed and inputs.
+            rules (Rules): Difficulty numbers.
+            profiler (FrameProfiler): Times the parts of a tick.
+            score (int): Aliens killed.
+            coins (int): Coins picked up.
+            pickups (dict): Drops picked up this game, by kind ("ammo",
+            "heart", "freeze", "coin".)
+            ammo_type (str): Picture of the bullets fired.
+            freeze_pickup (bool): Is a freeze active.
+            freeze_hit (bool): Was a freeze picked up this tick.
+            frozen_frames (int): Ticks the current freeze has lasted.
+            events (list): What happened this tick that can be heard
+            ("shoot", "explosion".)
+            player (Player): The player's ship.
+            players (sprite group): Holds the player.
+            bullets (sprite group): Bullets in play.
+            aliens (sprite group): Every alien, in update order.
+            bullet_pool (BulletPool): Preallocated bullets for spawn_bullet.
+            bullet_grid (SpatialHash): Bullets bucketed by position, rebuilt
+            every tick for the alien collision checks.
+            alien_engine (AlienEngine): NumPy copy of the aliens that steps
+            them all at once, or None.
+
+    """
+
+    def __init__(self, width, height, seed=None, player_image="original.png", alien_count=30,
+                 pool_size=64, cell_size=128, use_engine=True, rules=None, profiler=None):
+
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.rules = rules if rules is not None else Rules()
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        self.score = 0
+        self.coins = 0
+        self.pickups = {"ammo": 0, "heart": 0, "freeze": 0, "coin": 0}
+        self.ammo_type = "green_ammo.png"
+        self.freeze_pickup = False
+        self.freeze_hit = False
+        self.frozen_frames = 0
+        self.events = []
+
+        self.players = pygame.sprite.Group()
+        self.bullets = pygame.sprite.Group()
+        self.aliens = pygame.sprite.LayeredUpdates()
+        self.bullet_pool = BulletPool(self, pool_size, self.ammo_type)
+        self.bullet_grid = SpatialHash(cell_size)
+
+        self.player = None
+        self.set_player(player_image)
+
+        for i in range(alien_count):
+
+            self.aliens.add(Alien(self))
+
+        self.alien_engine = None
+
+        if use_engine and HAVE_NUMPY:
+
+            self.alien_engine = AlienEngine(self.aliens.sprites(),
+                                            pygame.Rect(0, 0, width, height),
+                                            self.rules.alien_speed, self.profiler)
+
+    @property
+    def over(self):
+        """ Has the player run out of lives.
+
+        """
+
+        return self.player.lives <= 0
+
+    def new_game(self, seed=None):
+        """ Start a new game: reseed the random numbers, then reset the
+        score, the freeze, the bullets, the aliens and the player's position.
+        The player's lives, ammo and speed are left as they are.
+
+        Args:
+                seed (int): Seed for the game (None picks one with the random
+                module.)
+
+        """
+
+        if seed is None:
+
+            seed = random.randrange(1 << 31)
+
+        self.seed = seed
+        self.random.seed(seed)
+
+        self.score = 0
+        self.pickups = {"ammo": 0, "heart": 0, "freeze": 0, "coin": 0}
+        self.freeze_pickup = False
+        self.freeze_hit = False
+        self.frozen_frames = 0
+
+        self.bullet_pool.reset()
+        self.reset_aliens()
+        self.player.center()
+
+    def set_player(self, image_string):
+        """ Swap in a new ship for the player.
+
+        Args:
+                image_string (str): Picture of the ship.
+
+        """
+
+        if self.player is not None:
+
+            self.players.remove(self.player)
+
+        self.player = Player(self, image_string)
+        self.players.add(self.player)
+
+    def spawn_bullet(self, aim):
+        """ Spawn a bullet from the player position and set its trajectory
+        towards the aim point.
+
+        Args:
+                aim (tuple): Where the cursor is.
+
+        """
+
+        (mouse_x, mouse_y) = aim
+
+        self.events.append("shoot")
+        self.player.ammo -= 1
+
+        bullet_speed = 20
+        angle = math.atan2(self.player.rect.center[1]-mouse_y,
+                           self.player.rect.center[0]-mouse_x)
+        x_vel = math.cos(angle) * (-1 * bullet_speed)
+        y_vel = math.sin(angle) * (-1 * bullet_speed)
+        bullet = self.bullet_pool.acquire(self.ammo_type)
+        bullet.rect.x = self.player.rect.center[0] - (bullet.rect.width / 2)
+        bullet.rect.y = self.player.rect.center[1] - (bullet.rect.height / 2)
+        bullet.velx = x_vel
+        bullet.vely = y_vel
+
+        self.bullets.add(bullet)
+
+    def reset_aliens(self):
+        """ Put every alien back in its spawn state instead of building a
+        new set of aliens.
+
+        """
+
+        for alien in self.aliens:
+
+            alien.reset()
+
+        if self.alien_engine is not None:
+
+            self.alien_engine.load_all()
+
+    def freeze_aliens(self, frozen):
+        """ Freeze or unfreeze every alien.
+
+        Args:
+                frozen (bool): Should the aliens stop moving.
+
+        """
+
+        if self.alien_engine is not None:
+
+            self.alien_engine.freeze(frozen)
+
+        else:
+
+            for alien in self.aliens:
+
+                alien.full_freeze = frozen
+
+    def update_aliens(self):
+        """ Update every alien. With the alien engine, the whole population
+        is stepped in a few array operations. Without it, rebuild the
+        bullet grid once for this tick and update each alien (which
+        checks bullet collisions against the grid.) Either way the
+        "collisions" phase times the bullet and player hit tests.
+
+        """
+
+        with self.profiler.phase("aliens"):
+
+            if self.alien_engine is not None:
+
+                self.alien_engine.step(self.player.rect.center, self.players, self.bullets)
+
+            else:
+
+                with self.profiler.phase("collisions"):
+
+                    self.bullet_grid.rebuild(self.bullets)
+
+                self.aliens.update()
+
+    def update_items(self, aim):
+        """ Move the player and the bullets.
+
+        Args:
+                aim (tuple): Where the cursor is.
+
+        """
+
+        with self.profiler.phase("items"):
+
+            self.player.update(aim)
+            self.bullets.update()
+
+    def step(self, inputs):
+        """ Run one tick of the game. Returns the tick's events.
+
+        Args:
+                inputs (Inputs): What the player does this tick.
+
+        """
+
+        self.events = []
+
+        self.player.velx = inputs.move[0] * self.player.speed
+        self.player.vely = inputs.move[1] * self.player.speed
+
+        for i in range(inputs.fire):
+
+            if self.player.ammo > 0:
+
+                self.spawn_bullet(inputs.aim)
+
+        if not self.freeze_pickup:
+
+            self.update_items(inputs.aim)
+            self.update_aliens()
+
+        if self.freeze_pickup:
+
+            self.freeze_aliens(True)
+
+            self.frozen_frames += 1
+
+            if self.frozen_frames < self.rules.freeze_ticks:
+
+                self.update_items(inputs.aim)
+                self.update_aliens()
+
+                if self.freeze_hit:
+
+                    self.frozen_frames -= 2 * self.rules.freeze_ticks
+
+            elif self.frozen_frames == self.rules.freeze_ticks:
+
+                self.freeze_aliens(False)
+
+                self.frozen_frames = 0
+                self.freeze_pickup = False
+                self.update_aliens()
+                self.update_items(inputs.aim)
+
+        self.freeze_hit = False
+
+        return self.events
+
+
+def benchmark(ticks=10000, seed=1):
+    """ Step a world with a simple bot (aim at the closest alien on the
+    field, fire every third tick) and print how many ticks per second the
+    rules run at. Runs with no display.
+
+    Args:
+            ticks (int): Ticks to run.
+            seed (int): Random seed.
+
+    """
+
+    world = World(1360, 768, seed)
+    world.player.lives = 3
+    field = pygame.Rect(0, 0, world.width, world.height)
+
+    start = time.perf_counter()
+
+    for tick in range(ticks):
+
+        if world.over:
+
+            world.player.lives = 3
+
+        center = world.player.rect.center
+        targets = [alien.rect.center for alien in world.aliens if field.colliderect(alien.rect)]
+        aim = min(targets or [field.center],
+                  key=lambda point: (point[0] - center[0]) ** 2 + (point[1] - center[1]) ** 2)
+
+        world.step(Inputs((0, 0), aim, int(tick % 3 == 0)))
+
+    elapsed = time.perf_counter() - start
+
+    print("%d ticks in %.2f s (%.0f ticks/s), score %d" % (ticks, elapsed, ticks / elapsed,
+                                                             world.score))
+
+
+if __name__ == "__main__":
+    benchmark()
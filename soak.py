@@ -0,0 +1,367 @@
+"""
+Space Fight
+Soak Test
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import pygame
+
+from assets import cache_stats
+from memory import surface_stats
+from scenarios import SCENARIOS, Driver, StepClock, click_through, fight, play, wait
+
+try:
+
+    import resource
+    HAVE_RESOURCE = True
+
+except ImportError:
+
+    HAVE_RESOURCE = False
+
+# Most a metric may grow over the run (by its fitted trend, after the warm
+# up) before the soak fails: 0.05 is 5%.
+TOLERANCES = {"frame_ms": 0.15,
+              "rss_kb": 0.10,
+              "objects": 0.05,
+              "surfaces": 0.05}
+
+# Fewest samples a trend is fitted to.
+MIN_SAMPLES = 3
+
+
+def marathon(game, driver):
+    """ Start a game and keep it going for ten minutes of game time, so the
+    aliens keep speeding up with every respawn.
+
+    """
+
+    yield from click_through(driver, [game.start_word])
+    yield from fight(game, driver, 10 * 60 * 60, fire_every=3)
+
+
+SESSIONS = dict(SCENARIOS, marathon=marathon)
+
+
+def go_home(game, driver):
+    """ Go back to the title screen from a game, the pause menu or the game
+    over screen.
+
+    """
+
+    if game.game and not game.paused:
+
+        driver.press(pygame.K_p)
+        yield from wait(2)
+
+    if game.game or game.game_over:
+
+        driver.click(game.go_home_word)
+        yield from wait(10)
+
+    if game.screen_name() != "title":
+
+        raise RuntimeError("a soak session ended on the %s screen" % game.screen_name())
+
+
+def rss_kb():
+    """ Return the resident set size of the process in kB: the current one
+    from /proc, or the peak one from resource where there is no /proc
+    (None where neither is there.)
+
+    """
+
+    try:
+
+        with open("/proc/self/statm") as statm:
+
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024
+
+    except (OSError, ValueError, AttributeError):
+
+        pass
+
+    if HAVE_RESOURCE:
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        # Bytes on macOS, kB everywhere else.
+        return peak / 1024 if sys.platform == "darwin" else peak
+
+    return None
+
+
+def slope(xs, ys):
+    """ Return the slope of the least squares line through the points.
+
+    """
+
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+
+    if spread == 0:
+
+        return 0.0
+
+    return sum((x - mean_x) * (y - mean_y) for (x, y) in zip(xs, ys)) / spread
+
+
+def trend(samples, name, tolerance):
+    """ Fit a line to one metric over time. Returns the slope per hour, the
+    growth over the run as a fraction of the fitted start, and whether that
+    is a failure: growth beyond tolerance that is sustained (the later half
+    of the samples is also higher on average than the earlier half, so one
+    spike at the end does not fail a run.) Returns None with too few
+    samples.
+
+    Args:
+            samples (list): Samples after the warm up.
+            name (str): Key of the metric in the samples.
+            tolerance (float): Most growth allowed.
+
+    """
+
+    points = [(sample["hours"], sample[name]) for sample in samples if sample[name] is not None]
+
+    if len(points) < MIN_SAMPLES:
+
+        return None
+
+    (xs, ys) = zip(*points)
+    per_hour = slope(xs, ys)
+    start = sum(ys) / len(ys) + per_hour * (xs[0] - sum(xs) / len(xs))
+    growth = per_hour * (xs[-1] - xs[0]) / start if start > 0 else 0.0
+    half = len(ys) // 2
+    sustained = sum(ys[-half:]) / half > sum(ys[:half]) / half
+
+    return {"metric": name,
+            "per_hour": per_hour,
+            "growth": growth,
+            "failed": growth > tolerance and sustained}
+
+
+class Soak(object):
+    """ Plays sessions back to back with no window for a set time, going
+    back to the title screen after each, and samples frame time, memory and
+    object counts at regular intervals.
+
+    Args:
+            hours (float): How long to run.
+            interval (float): Seconds between samples.
+            names (list): Sessions to play, in turn (keys of SESSIONS.)
+            warmup (float): Seconds left out of the trends while caches
+            fill.
+
+    Attributes:
+            seconds (float): How long to run.
+            interval (float): Seconds between samples.
+            names (list): Sessions to play, in turn.
+            warmup (float): Seconds left out of the trends.
+            clock (StepClock): The game's clock (reset at every sample; made
+            when the soak runs.)
+            driver (Driver): Mouse and keyboard.
+            samples (list): Every sample so far.
+            sessions (int): Sessions finished.
+            script (generator): The sessions being played.
+            start (float): When the soak started.
+            next_sample (float): When the next sample is due.
+            types (Counter): Live objects by type at the end of the warm up.
+            grown (list): (type name, growth) of the types with the most
+            new objects since the warm up.
+
+    """
+
+    def __init__(self, hours, interval=60.0, names=None, warmup=600.0):
+
+        self.seconds = hours * 3600
+        self.interval = interval
+        self.names = names or sorted(SESSIONS)
+        self.warmup = warmup
+        self.clock = None
+        self.driver = Driver()
+        self.samples = []
+        self.sessions = 0
+        self.script = None
+        self.start = None
+        self.next_sample = None
+        self.types = None
+        self.grown = []
+
+    def play(self, game):
+        """ Play the sessions in turn until the soak stops it.
+
+        """
+
+        for name in itertools.cycle(self.names):
+
+            yield from SESSIONS[name](game, self.driver)
+            yield from go_home(game, self.driver)
+
+            self.sessions += 1
+
+    def sample(self, game):
+        """ Measure the interval that just ended and start timing the next.
+
+        """
+
+        frames = self.clock.frames
+
+        gc.collect()
+
+        objects = gc.get_objects()
+        surfaces = surface_stats()
+        sample = {"hours": (time.perf_counter() - self.start) / 3600,
+                  "sessions": self.sessions,
+                  "screen": game.screen_name(),
+                  "frames": len(frames),
+                  "frame_ms": sum(frames) / len(frames) * 1000 if frames else None,
+                  "worst_ms": max(frames) * 1000 if frames else None,
+                  "rss_kb": rss_kb(),
+                  "objects": len(objects),
+                  "surfaces": surfaces["surfaces"] + surfaces["subsurfaces"]}
+
+        # Every image in the asset cache is a Surface, so a count below that
+        # means the counter is missing where surfaces pile up.
+        if sample["surfaces"] < cache_stats()["images"]:
+
+            raise RuntimeError("only %d surfaces counted with %d images loaded" % (
+                sample["surfaces"], cache_stats()["images"]))
+
+        self.samples.append(sample)
+
+        if self.types is None and sample["hours"] * 3600 >= self.warmup:
+
+            self.types = Counter(type(item).__name__ for item in objects)
+
+        del objects
+
+        print("%6.2f h %5d sessions %7d frames  mean %6.2f ms  worst %7.2f ms  rss %8.0f kB  "
+              "%8d objects %5d surfaces  %s" % (
+                  sample["hours"], sample["sessions"], sample["frames"], sample["frame_ms"] or 0,
+                  sample["worst_ms"] or 0, sample["rss_kb"] or 0, sample["objects"],
+                  sample["surfaces"], sample["screen"]))
+        sys.stdout.flush()
+
+        self.clock.reset()
+
+    def on_frame(self, game):
+
+        now = time.perf_counter()
+
+        if self.script is None:
+
+            self.script = self.play(game)
+            self.start = now
+            self.next_sample = now + self.interval
+            self.clock.reset()
+
+        next(self.script)
+
+        if now >= self.next_sample:
+
+            self.sample(game)
+            self.next_sample += self.interval
+
+            if now - self.start >= self.seconds:
+
+                if self.types is not None:
+
+                    after = Counter(type(item).__name__ for item in gc.get_objects())
+                    after.subtract(self.types)
+                    self.grown = [(name, count) for (name, count) in after.most_common(10)
+                                  if count > 0]
+
+                return True
+
+        return False
+
+    def run(self):
+        """ Run the soak. Returns the trend of every metric.
+
+        """
+
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+        import SpaceFight_main
+
+        self.clock = StepClock(1000.0 / SpaceFight_main.TICK_RATE)
+        play(self.on_frame, self.clock, self.driver)
+
+        measured = [sample for sample in self.samples if sample["hours"] * 3600 >= self.warmup]
+
+        return [result for result in (trend(measured, name, tolerance)
+                                      for (name, tolerance) in sorted(TOLERANCES.items()))
+                if result is not None]
+
+
+def report(trends, grown):
+    """ Print the trends and the object types that grew. Returns the names of
+    the metrics that failed.
+
+    """
+
+    failed = []
+
+    print("%-10s %14s %10s" % ("metric", "per hour", "growth"))
+
+    for result in trends:
+
+        flag = ""
+
+        if result["failed"]:
+
+            failed.append(result["metric"])
+            flag = "  FAIL (over %d%%)" % (TOLERANCES[result["metric"]] * 100)
+
+        print("%-10s %+14.2f %+9.1f%%%s" % (result["metric"], result["per_hour"],
+                                           result["growth"] * 100, flag))
+
+    if grown:
+
+        print("most new objects since the warm up: %s" % ", ".join(
+            "%s %+d" % (name, count) for (name, count) in grown))
+
+    return failed
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Play Space Fight with no window for hours and "
+                                                 "fail if frame time, memory or object counts "
+                                                 "keep growing.")
+    parser.add_argument("--hours", type=float, default=1.0)
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between samples")
+    parser.add_argument("--warmup", type=float, default=10.0,
+                        help="minutes left out of the trends while caches fill "
+                             "(default %(default)s)")
+    parser.add_argument("--sessions", nargs="+", choices=sorted(SESSIONS),
+                        help="sessions to play in turn (default: all)")
+    parser.add_argument("--save", help="write the samples and trends to this JSON file")
+    options = parser.parse_args()
+
+    soak = Soak(options.hours, options.interval, options.sessions, options.warmup * 60)
+    trends = soak.run()
+    failed = report(trends, soak.grown)
+
+    if options.save:
+
+        with open(options.save, "w") as soak_file:
+
+            json.dump({"samples": soak.samples, "trends": trends, "grown": soak.grown}, soak_file,
+                      indent=1)
+
+    if failed:
+
+        print("still growing after %d sessions: %s" % (soak.sessions, ", ".join(failed)))
+
+        raise SystemExit(1)
@@ -0,0 +1,216 @@
+"""
+Space Fight
+Spatial Hash
+"""
+
+import random
+import time
+
+import pygame
+
+
+class SpatialHash(object):
+    """ Uniform grid of sprites used as a broadphase for collision checks.
+    The grid is rebuilt once per frame and then shared by every query in
+    that frame, so each query only looks at the sprites in the cells it
+    touches instead of the whole group.
+
+    Args:
+            cell_size (int): Width and height of a grid cell in pixels.
+
+    Attributes:
+            cell_size (int): Width and height of a grid cell in pixels.
+            cells (dict): Lists of (insert order, sprite) keyed by (column, row).
+            count (int): Number of sprites inserted since the last clear.
+
+    """
+
+    def __init__(self, cell_size=128):
+
+        self.cell_size = cell_size
+        self.cells = {}
+        self.count = 0
+
+    def clear(self):
+        """ Remove every sprite from the grid.
+
+        """
+
+        self.cells.clear()
+        self.count = 0
+
+    def insert(self, sprite):
+        """ Add a sprite to every cell its rect covers.
+
+        Args:
+                sprite (sprite): Sprite to add.
+
+        """
+
+        rect = sprite.rect
+        size = self.cell_size
+        entry = (self.count, sprite)
+        self.count += 1
+
+        for column in range(rect.left // size, (rect.right - 1) // size + 1):
+
+            for row in range(rect.top // size, (rect.bottom - 1) // size + 1):
+
+                cell = self.cells.get((column, row))
+
+                if cell is None:
+
+                    self.cells[(column, row)] = [entry]
+
+                else:
+
+                    cell.append(entry)
+
+    def rebuild(self, sprites):
+        """ Clear the grid and insert every sprite in the given group.
+
+        Args:
+                sprites (sprite group): Sprites to insert.
+
+        """
+
+        self.clear()
+
+        for sprite in sprites:
+
+            self.insert(sprite)
+
+    def query(self, rect):
+        """ Return the sprites whose rects overlap the given rect, in the order
+        they were inserted.
+
+        Args:
+                rect (rect): Area to look in.
+
+        """
+
+        size = self.cell_size
+        collide = rect.colliderect
+        left = rect.left // size
+        right = (rect.right - 1) // size
+        top = rect.top // size
+        bottom = (rect.bottom - 1) // size
+
+        if left == right and top == bottom:
+
+            cell = self.cells.get((left, top))
+
+            if cell is None:
+
+                return []
+
+            return [sprite for (order, sprite) in cell if collide(sprite.rect)]
+
+        found = {}
+
+        for column in range(left, right + 1):
+
+            for row in range(top, bottom + 1):
+
+                cell = self.cells.get((column, row))
+
+                if cell is None:
+
+                    continue
+
+                for (order, sprite) in cell:
+
+                    if order not in found and collide(sprite.rect):
+
+                        found[order] = sprite
+
+        return [found[order] for order in sorted(found)]
+
+    def spritecollide(self, sprite, group, dokill):
+        """ Same result as pygame.sprite.spritecollide(sprite, group, dokill),
+        but only the grid cells under the sprite are searched. Sprites that
+        left the group since the last rebuild (e.g. a bullet that already hit
+        another alien this frame) are skipped.
+
+        Args:
+                sprite (sprite): Sprite to check.
+                group (sprite group): Group the grid was built from.
+                dokill (bool): Kill the sprites that were hit.
+
+        """
+
+        hits = [other for other in self.query(sprite.rect) if other in group]
+
+        if dokill:
+
+            for other in hits:
+
+                other.kill()
+
+        return hits
+
+
+def benchmark(alien_counts=(30, 300, 3000), bullet_counts=(10, 100, 1000), frames=5):
+    """ Time one frame of alien-vs-bullet checks with plain spritecollide and
+    with the spatial hash. Prints the average milliseconds per frame.
+
+    Args:
+            alien_counts (list): Alien counts to try.
+            bullet_counts (list): Bullet counts to try.
+            frames (int): Frames to average over.
+
+    """
+
+    width = 1360
+    height = 768
+
+    def make_group(count, size):
+
+        group = pygame.sprite.Group()
+
+        for i in range(count):
+
+            sprite = pygame.sprite.Sprite()
+            sprite.rect = pygame.Rect(random.randrange(0, width), random.randrange(0, height),
+                                      size, size)
+            group.add(sprite)
+
+        return group
+
+    print("aliens  bullets  spritecollide(ms)  spatial hash(ms)")
+
+    for alien_count in alien_counts:
+
+        for bullet_count in bullet_counts:
+
+            aliens = make_group(alien_count, 40)
+            bullets = make_group(bullet_count, 10)
+            grid = SpatialHash()
+
+            start = time.perf_counter()
+
+            for i in range(frames):
+
+                for alien in aliens:
+
+                    pygame.sprite.spritecollide(alien, bullets, False)
+
+            brute = (time.perf_counter() - start) / frames * 1000
+
+            start = time.perf_counter()
+
+            for i in range(frames):
+
+                grid.rebuild(bullets)
+
+                for alien in aliens:
+
+                    grid.spritecollide(alien, bullets, False)
+
+            hashed = (time.perf_counter() - start) / frames * 1000
+
+            print("%6d  %7d  %17.2f  %16.2f" % (alien_count, bullet_count, brute, hashed))
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,273 @@
+"""
+Space Fight
+Starfield
+"""
+
+import random
+
+import pygame
+
+from assets import load_image
+
+try:
+
+    import numpy
+
+except ImportError:
+
+    numpy = None
+
+
+class Starfield(object):
+    """ The scrolling star background as one object. Star positions and
+    speeds are kept in arrays, moved in one step and drawn in one pass,
+    instead of being hundreds of separate sprites.
+
+    Args:
+            image_string (str): Star image.
+            layers (list): (count, min speed, max speed) for each parallax
+            layer. Speeds are pixels per frame along y (negative is up) and
+            are picked with random.randrange(min speed, max speed).
+            width (int): Width of the area the stars fill.
+            height (int): Height of the area the stars fill.
+
+    Attributes:
+            image (surface): Star image.
+            width (int): Width of the area the stars fill.
+            height (int): Height of the area the stars fill.
+            x (array): Star x positions.
+            y (array): Star y positions.
+            vely (array): Star y velocities.
+            last_y (array): Star y positions before the last update.
+            wrapped (array): Which stars wrapped around in the last update.
+            stamp (list): (x offset, y offset, color) of every lit pixel in
+            the star image, used to draw straight into the screen's pixels.
+
+    """
+
+    def __init__(self, image_string, layers, width, height):
+
+        self.image = load_image(image_string)
+        self.width = width
+        self.height = height
+
+        x = []
+        y = []
+        vely = []
+
+        for (count, min_speed, max_speed) in layers:
+
+            for i in range(count):
+
+                x.append(random.randrange(0, width))
+                y.append(random.randrange(0, height))
+                vely.append(random.randrange(min_speed, max_speed))
+
+        if numpy is not None:
+
+            self.x = numpy.array(x, dtype=numpy.int32)
+            self.y = numpy.array(y, dtype=numpy.int32)
+            self.vely = numpy.array(vely, dtype=numpy.int32)
+            self.wrapped = numpy.zeros(len(x), dtype=bool)
+
+        else:
+
+            self.x = x
+            self.y = y
+            self.vely = vely
+            self.wrapped = [False] * len(x)
+
+        self.last_y = self.y
+
+        colorkey = self.image.get_colorkey()
+        self.stamp = []
+
+        for stamp_x in range(self.image.get_width()):
+
+            for stamp_y in range(self.image.get_height()):
+
+                color = self.image.get_at((stamp_x, stamp_y))
+
+                if color != colorkey:
+
+                    self.stamp.append((stamp_x, stamp_y, color))
+
+    def __len__(self):
+
+        return len(self.x)
+
+    def update(self):
+        """ Move every star. Stars that go off the top of the screen start
+        again at the bottom.
+
+        """
+
+        star_height = self.image.get_height()
+
+        if numpy is not None:
+
+            self.last_y = self.y.copy()
+            self.y += self.vely
+            self.wrapped = self.y + star_height < 0
+            self.y[self.wrapped] = self.height
+
+        else:
+
+            self.last_y = list(self.y)
+            self.wrapped = [False] * len(self.y)
+
+            for i in range(len(self.y)):
+
+                self.y[i] += self.vely[i]
+
+                if self.y[i] + star_height < 0:
+
+                    self.y[i] = self.height
+                    self.wrapped[i] = True
+
+    def positions(self, y=None):
+        """ Return the stars' positions as a list of (x, y).
+
+        Args:
+                y (array): Y positions to use instead of the current ones.
+
+        """
+
+        if y is None:
+
+            y = self.y
+
+        if numpy is not None:
+
+            return list(zip(self.x.tolist(), y.tolist()))
+
+        return list(zip(self.x, y))
+
+    def between(self, alpha):
+        """ Return the stars' y positions part of the way from where they were
+        before the last update to where they are now. Stars that wrapped
+        around are put straight at their new position.
+
+        Args:
+                alpha (float): How far along (0 is before the update, 1 is
+                now.)
+
+        """
+
+        if alpha >= 1:
+
+            return self.y
+
+        if numpy is not None:
+
+            between = self.last_y + ((self.y - self.last_y) * alpha).astype(numpy.int32)
+
+            return numpy.where(self.wrapped, self.y, between)
+
+        return [y if wrapped else last_y + int((y - last_y) * alpha)
+                for (y, last_y, wrapped) in zip(self.y, self.last_y, self.wrapped)]
+
+    def rects(self):
+        """ Return the rect of every star.
+
+        """
+
+        (width, height) = self.image.get_size()
+
+        return [pygame.Rect(x, y, width, height) for (x, y) in self.positions()]
+
+    def dirty_rects(self):
+        """ Return the areas the stars covered before and after the last
+        update (one rect per star, two for a star that wrapped around.)
+
+        """
+
+        (width, height) = self.image.get_size()
+
+        if numpy is not None:
+
+            top = numpy.minimum(self.y, self.last_y)
+            tall = numpy.abs(self.y - self.last_y) + height
+            rects = [pygame.Rect(x, y, width, h)
+                     for (x, y, h) in zip(self.x.tolist(), top.tolist(), tall.tolist())]
+
+            for i in numpy.flatnonzero(self.wrapped).tolist():
+
+                rects[i] = pygame.Rect(int(self.x[i]), int(self.y[i]), width, height)
+                rects.append(pygame.Rect(int(self.x[i]), int(self.last_y[i]), width, height))
+
+            return rects
+
+        rects = []
+
+        for i in range(len(self.x)):
+
+            if self.wrapped[i]:
+
+                rects.append(pygame.Rect(self.x[i], self.y[i], width, height))
+                rects.append(pygame.Rect(self.x[i], self.last_y[i], width, height))
+
+            else:
+
+                rects.append(pygame.Rect(self.x[i], min(self.y[i], self.last_y[i]), width,
+                                         abs(self.y[i] - self.last_y[i]) + height))
+
+        return rects
+
+    def draw(self, screen, alpha=1):
+        """ Draw every star. With NumPy the star's pixels are written straight
+        into the screen; otherwise all stars go through one Surface.blits call.
+
+        Args:
+                screen (screen): Blit destination.
+                alpha (float): Draw the stars this far between their last two
+                positions (see between.)
+
+        """
+
+        y = self.between(alpha)
+
+        if numpy is not None and screen.get_bytesize() in (1, 2, 4):
+
+            self.draw_pixels(screen, y)
+
+        else:
+
+            self.draw_blits(screen, y)
+
+    def draw_blits(self, screen, y=None):
+        """ Draw every star with a single batched blit.
+
+        Args:
+                screen (screen): Blit destination.
+                y (array): Y positions to draw at instead of the current ones.
+
+        """
+
+        screen.blits([(self.image, position) for position in self.positions(y)], False)
+
+    def draw_pixels(self, screen, y=None):
+        """ Write the lit pixels of every star into the screen at once.
+
+        Args:
+                screen (screen): Blit destination.
+                y (array): Y positions to draw at instead of the current ones.
+
+        """
+
+        if y is None:
+
+            y = self.y
+
+        (width, height) = screen.get_size()
+        pixels = pygame.surfarray.pixels2d(screen)
+
+        for (stamp_x, stamp_y, color) in self.stamp:
+
+            stamp_xs = self.x + stamp_x
+            stamp_ys = y + stamp_y
+            inside = (stamp_xs >= 0) & (stamp_xs < width) & (stamp_ys >= 0) & (stamp_ys < height)
+
+            pixels[stamp_xs[inside], stamp_ys[inside]] = screen.map_rgb(color)
+
+        del pixels